@@ -2,6 +2,9 @@ import pandas as pd
 import re
 from typing import TypedDict, List, Callable, Dict, Optional, Union, Any
 from .autogen_agents import TriggerAgent,PlannerAgent,CriticAgent
+from tools.dataset_cache import DatasetCache
+from tools.data_preview import build_data_preview
+from config import PREVIEW_SAMPLE_ROWS, PREVIEW_TOKEN_BUDGET, PREVIEW_STRATIFY_COLUMN
 import autogen
 from autogen import Agent, ConversableAgent
 from autogen.agentchat.contrib.multimodal_conversable_agent import MultimodalConversableAgent
@@ -11,7 +14,7 @@ from autogen.agentchat.contrib.multimodal_conversable_agent import MultimodalCon
 
 
 #FUNKCJA CHATU GRUPOWEGO-WYMYŚLANIE PLANU
-def run_autogen_planning_phase(input_path: str,trigger_agent: TriggerAgent,planner_agent: PlannerAgent, critic_agent: CriticAgent, manager_agent_config:Dict,inspiration_prompt: str = "",active_policies: Optional[str] = None) -> Optional[str]:
+def run_autogen_planning_phase(input_path: str,trigger_agent: TriggerAgent,planner_agent: PlannerAgent, critic_agent: CriticAgent, manager_agent_config:Dict,inspiration_prompt: str = "",active_policies: Optional[str] = None, dataset_cache: Optional[DatasetCache] = None) -> Optional[str]:
     """
     Uruchamia fazę planowania z agentami AutoGen i zwraca finalny plan.
     """
@@ -20,8 +23,16 @@ def run_autogen_planning_phase(input_path: str,trigger_agent: TriggerAgent,plann
     print("="*80 + "\n")
 
     try:
-        df_summary = pd.read_csv(input_path, nrows=5)
-        data_preview = f"Oto podgląd danych:\n\nKolumny:\n{df_summary.columns.tolist()}\n\nPierwsze 5 wierszy:\n{df_summary.to_string()}"
+        # Zamiast pierwszych 5 wierszy: statystyki z całego pliku + losowa (warstwowana) próbka w budżecie tokenów
+        # Z pamięcią zbiorów statystyki pochodzą z profilu kolumn, a próbka - z pamięci podręcznej pod odciskiem danych
+        if dataset_cache:
+            data_preview = "Oto podgląd danych:\n\n" + dataset_cache.data_preview(
+                input_path, sample_rows=PREVIEW_SAMPLE_ROWS, token_budget=PREVIEW_TOKEN_BUDGET,
+                stratify_on=PREVIEW_STRATIFY_COLUMN)
+        else:
+            data_preview = "Oto podgląd danych:\n\n" + build_data_preview(
+                input_path, sample_rows=PREVIEW_SAMPLE_ROWS, token_budget=PREVIEW_TOKEN_BUDGET,
+                stratify_on=PREVIEW_STRATIFY_COLUMN)
         
         
         if active_policies:
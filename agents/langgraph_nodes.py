@@ -1,25 +1,50 @@
 import os
 import io
+import ast
 import sys
 import subprocess
+import shutil
 import tempfile
+import threading
 import traceback
+import time
 import uuid
 import json
+import random
 import re
 import matplotlib.pyplot as plt
-from typing import TypedDict, List, Callable, Dict, Optional, Union, Any
+from typing import TypedDict, List, Callable, Dict, Optional, Tuple, Union, Any
 import pandas as pd
 import langchain
 from langchain_google_vertexai import ChatVertexAI
 from langchain_anthropic import ChatAnthropic
 from .state import AgentWorkflowState
+from .routing import succeeded
 from prompts import LangchainAgentsPrompts
 from tools.utils import *
 from tools.langchain_tools import *
+from tools.artifacts import csv_has_quoted_newlines, detect_format, export_csv, read_artifact
+from tools.chunked_exec import defines_chunked_contract, run_chunked
+from tools.step_dag import entry_read_options, parse_steps, run_steps
+from tools.code_rules import check_code
+from tools.static_analysis import analyze_code, apply_fixers
+from tools.speculative import chosen_result, race
+from tools.error_fingerprint import fingerprint_error, detect_loop
+from tools.dtype_optimizer import SCOPE_FRAME, DtypeLayer
+from tools.column_projection import frame_projection, input_projection, push_projection
 from prompts import ArchitecturalRule, ArchitecturalRulesManager,ARCHITECTURAL_RULES
 from prompts_beta import PromptFactory
-from config import MAX_CORRECTION_ATTEMPTS, PROJECT_ID,LOCATION
+from config import MAX_CORRECTION_ATTEMPTS, PROJECT_ID,LOCATION, PROFILER_CHUNK_SIZE, PROFILER_MAX_WORKERS, MEMORY_SCOPE_GRANULARITY
+from config import SAMPLE_DRY_RUN, SAMPLE_DRY_RUN_ROWS, SAMPLE_DRY_RUN_MIN_BYTES, SAMPLE_DRY_RUN_WALL_TIME_S, SAMPLE_DIR
+from config import EXECUTION_MODE, CHUNKED_MIN_BYTES, CHUNKED_MAX_WORKERS, CHUNKED_ROWS_PER_CHUNK
+from config import STEP_EXECUTION, STEP_WORK_DIR, STEP_MAX_WORKERS
+from config import CODEGEN_CANDIDATES, CODEGEN_TEMPERATURES, CODEGEN_MODELS, CODEGEN_STATS_PATH
+from config import SPECULATIVE_FIX_CANDIDATES, SPECULATIVE_FIX_TEMPERATURES, SPECULATIVE_FIX_MODELS, LOOP_MAX_REPEATS
+from config import DTYPE_OPTIMIZATION, DTYPE_MIN_INT_BITS, DTYPE_CATEGORICAL_MAX_RATIO, COLUMN_PROJECTION
+from config import PERFORMANCE_RULES_MODE, PERFORMANCE_RULE_MODES
+from config import PROFILING_RATE, PROFILING_INTERVAL_S, PROFILING_TOP_N, RUNTIME_BUDGET_S
+from config import OPTIMIZER_SAMPLE_ROWS, OPTIMIZER_TIMING_RUNS, OPTIMIZER_MIN_SPEEDUP
+from config import EXECUTION_BACKEND, DUCKDB_MIN_BYTES, DUCKDB_MEMORY_LIMIT_BYTES, DUCKDB_TEMP_DIR, DUCKDB_THREADS
 from memory.memory_utils import *
 from memory.memory_models import *
 # --- Definicje węzłów LangGraph ---
@@ -28,6 +53,7 @@ from memory.memory_models import *
 CODE_ARTIFACT_MAP = {
     # Węzły odpowiedzialne za główny kod przetwarzania danych
     "code_generator": "generated_code",
+    "static_analyzer": "generated_code",
     "architectural_validator": "generated_code",
     "data_code_executor": "generated_code",
     
@@ -40,22 +66,411 @@ CODE_ARTIFACT_MAP = {
 }
 
 
+# Liczniki pętli naprawczych w jednym uruchomieniu (stan: `correction_loop_stats`)
+CORRECTION_LOOP_STATS = {"identical": 0, "oscillation": 0, "strategy_switches": 0, "early_escalations": 0, "attempts_saved": 0}
 
 
+def _with_execution_stats(execution_stats: List[Dict[str, Any]], node_name: str, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Dopisuje zużycie zasobów (czas zegarowy, czas CPU, szczytowe RSS) wykonania w piaskownicy do historii w stanie."""
+    entry = {"node": node_name, "ok": result["ok"], "error_type": result["error_type"],
+             "limit_exceeded": result["limit_exceeded"], **(result.get("usage") or {})}
+    dtype_report = (result.get("outputs") or {}).get("dtype_report")
+    if dtype_report and dtype_report["reads"]:
+        entry["dtype_saved_bytes"] = dtype_report["saved_bytes"]
+        print(f"  [TYPY] Optymalizacja typów: {dtype_report['bytes_before'] / 1024**2:.1f} MB -> "
+              f"{dtype_report['bytes_after'] / 1024**2:.1f} MB ({len(dtype_report['changes'])} kolumn zmienionych).")
+    print(f"  [SANDBOX] Zasoby: {entry}")
+    return execution_stats + [entry]
+
+
+def _dtype_scope(code: str, input_path: str, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Argumenty `SandboxPool.run` włączające warstwę optymalizacji typów. Ramka `input_df` jest wczytywana
+    tylko wtedy, gdy kod się do niej odwołuje - inaczej dane w pamięci byłyby podwojone - i tylko z kolumnami `columns`.
+    """
+    if not DTYPE_OPTIMIZATION:
+        return {}
+    scope: Dict[str, Any] = {"dtype_options": {"min_int_bits": DTYPE_MIN_INT_BITS,
+                                               "categorical_max_ratio": DTYPE_CATEGORICAL_MAX_RATIO}}
+    try:
+        uses_frame = any(isinstance(node, ast.Name) and node.id == SCOPE_FRAME for node in ast.walk(ast.parse(code)))
+    except SyntaxError:
+        uses_frame = False
+    if uses_frame:
+        scope["frames"] = {SCOPE_FRAME: {"path": input_path, "optimize": True, "columns": columns}}
+    return scope
+
+
+def _planned_dtype_changes(state: AgentWorkflowState) -> Dict[str, str]:
+    """Zmiany typów kolumn wejściowych, które wprowadzi `read_optimized` (ustalane na próbce danych, do promptu generatora)."""
+    if not DTYPE_OPTIMIZATION or _backend(state) == "duckdb":
+        return {}
+    layer = DtypeLayer(min_int_bits=DTYPE_MIN_INT_BITS, categorical_max_ratio=DTYPE_CATEGORICAL_MAX_RATIO)
+    layer.read(_validation_input_path(state))
+    return layer.summary()["changes"]
+
+
+def _choose_backend(input_path: str) -> str:
+    """Silnik kodu przetwarzającego: z konfiguracji albo (tryb "auto") DuckDB dla plików, które nie zmieszczą się w pandas."""
+    if EXECUTION_BACKEND != "auto":
+        return EXECUTION_BACKEND
+    if os.path.isdir(input_path):
+        size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(input_path) for name in names)
+    else:
+        size = os.path.getsize(input_path) if os.path.isfile(input_path) else 0
+    return "duckdb" if size >= DUCKDB_MIN_BYTES else "pandas"
+
+
+def _backend(state: AgentWorkflowState) -> str:
+    return state.get('execution_backend') or "pandas"
+
+
+def _input_signature(state: AgentWorkflowState) -> str:
+    """Dokładny hash treści `state['input_path']` (odcisk z schema_reader, w razie potrzeby uzupełniany o pełny hash)."""
+    return state['dataset_cache'].dataset_fingerprint(state['input_path'], exact=True).signature("content")
+
+
+def _execution_cache_key(state: AgentWorkflowState, code: str, inputs: Optional[List[str]] = None, **extra: Any) -> str:
+    """Klucz pamięci wykonań: kod, hash wejścia, dodatkowe sygnatury `inputs` i ustawienia konfiguracji zmieniające wynik kodu."""
+    settings = {"dtype_optimization": DTYPE_OPTIMIZATION, "dtype_min_int_bits": DTYPE_MIN_INT_BITS,
+                "dtype_categorical_max_ratio": DTYPE_CATEGORICAL_MAX_RATIO, "execution_mode": EXECUTION_MODE,
+                "execution_backend": EXECUTION_BACKEND, "backend": _backend(state), "column_projection": COLUMN_PROJECTION}
+    return state['execution_cache'].make_key(code, [_input_signature(state), *(inputs or [])], **settings, **extra)
+
+
+def _processing_kind(state: AgentWorkflowState) -> str:
+    """Rodzaj kodu przetwarzającego dla analizy statycznej (zakres nazw zależy od silnika)."""
+    return "duckdb" if _backend(state) == "duckdb" else "processing"
+
+
+def _execution_scope(state: AgentWorkflowState, code: str, input_path: str) -> Dict[str, Any]:
+    """Argumenty `SandboxPool.run` zależne od silnika: sesja DuckDB albo warstwa optymalizacji typów pandas."""
+    if _backend(state) == "duckdb":
+        return {"duckdb_options": {"memory_limit_bytes": DUCKDB_MEMORY_LIMIT_BYTES, "temp_dir": DUCKDB_TEMP_DIR,
+                                   "threads": DUCKDB_THREADS}}
+    return _dtype_scope(code, input_path, _input_projection(state, code))
+
+
+def _input_projection(state: AgentWorkflowState, code: str) -> Optional[List[str]]:
+    """
+    Kolumny wejścia, do których odwołuje się kod przetwarzający (None - wszystkie). Dotyczy silnika pandas;
+    DuckDB sam przenosi projekcję do odczytu pliku.
+    """
+    if not COLUMN_PROJECTION or _backend(state) != "pandas":
+        return None
+    return input_projection(code, state.get('available_columns'), frames=[SCOPE_FRAME])
+
+
+def _projected_code(state: AgentWorkflowState, code: str) -> str:
+    """Kod do wykonania z listą kolumn dopisaną do odczytów `input_path` (`usecols=`/`columns=`)."""
+    return push_projection(code, _input_projection(state, code))
+
+
+def _use_step_mode(state: AgentWorkflowState) -> bool:
+    """
+    Wykonanie krokowe: kod definiuje `STEPS` (błędny kontrakt kroków zgłasza ValueError trafiający do debuggera),
+    a `process_data` czyta dane samą ścieżką - korzenie DAG nie znają jego argumentów odczytu.
+    """
+    if not (STEP_EXECUTION and _backend(state) == "pandas" and parse_steps(state['generated_code']) is not None):
+        return False
+    read_options = entry_read_options(state['generated_code'])
+    if read_options:
+        print(f"  [KROKI] `process_data` czyta dane z argumentami {read_options} - wykonanie w całości zamiast krokami.")
+        return False
+    return True
+
+
+def _use_chunked_mode(state: AgentWorkflowState, input_path: str) -> bool:
+    """Tryb kawałkowy: kod definiuje fit_params/transform_chunk, wynik to Parquet, a wejście jest duże (lub tryb wymuszony)."""
+    if _backend(state) == "duckdb":
+        return False
+    if EXECUTION_MODE == "single" or not defines_chunked_contract(state['generated_code']):
+        return False
+    if detect_format(state['output_path']) != "parquet" or not os.path.isfile(input_path):
+        return False
+    if EXECUTION_MODE != "chunked" and os.path.getsize(input_path) < CHUNKED_MIN_BYTES:
+        return False
+    if detect_format(input_path) == "csv" and csv_has_quoted_newlines(input_path):
+        print("  [CHUNKED] Wejście CSV ma pola wieloliniowe w cudzysłowach - wykonanie w jednym procesie.")
+        return False
+    return True
+
+
+def _fix_session(state: AgentWorkflowState, error_message: str, code: Optional[str]) -> Dict[str, Any]:
+    """Trwająca sesja naprawcza (z historią prób i odcisków błędów) albo nowa, zaczynająca się od tego błędu."""
+    return state.get('pending_fix_session') or {"initial_error": error_message, "initial_code": code, "fix_attempts": []}
+
+
+def _static_analysis(state: AgentWorkflowState, code_key: str, kind: str, failing_node: str,
+                     known_columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Analiza statyczna kodu spod `code_key` wraz z poprawkami mechanicznymi. Zwraca aktualizację stanu:
+    poprawiony kod (jeśli coś poprawiono) oraz - dla błędów, których nie da się naprawić lokalnie - opis dla debuggera.
+    """
+    code = state.get(code_key) or ""
+    fixed, applied = apply_fixers(code, kind=kind, known_columns=known_columns)
+    update = {}
+    if applied:
+        print(f"  [ANALIZA STATYCZNA] Zastosowano poprawki mechaniczne: {', '.join(dict.fromkeys(applied))}")
+        update[code_key] = fixed
+    findings = analyze_code(fixed, kind=kind, known_columns=known_columns)
+    for finding in findings:
+        if finding.severity == "warning":
+            print(f"  [OSTRZEŻENIE] {finding}")
+    errors = [str(finding) for finding in findings if finding.severity == "error"]
+    if errors:
+        error_message = "Błąd Analizy Statycznej: " + " ".join(errors)
+        print(f"  [WERDYKT] ❌ {error_message}")
+        update.update({
+            "error_message": error_message,
+            "failing_node": failing_node,
+            "error_context_code": fixed,
+            "active_code_key": code_key,
+            "correction_attempts": state.get('correction_attempts', 0) + 1,
+            "pending_fix_session": _fix_session(state, error_message, fixed)
+        })
+    return update
+
+
+def _run_on_sample(state: AgentWorkflowState, code: str, input_path: str, output_path: str,
+                   cancel_event: Optional[threading.Event] = None) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Uruchamia kod przetwarzania na (próbce) danych z krótkim limitem czasu i sprawdza wynik.
+    Zwraca (opis błędu albo None, wynik piaskownicy).
+    """
+    if os.path.isdir(output_path):
+        shutil.rmtree(output_path)
+    elif os.path.exists(output_path):
+        os.remove(output_path)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    sandbox_pool = state['sandbox_pool']
+    result = sandbox_pool.run(
+        _projected_code(state, code),
+        variables={'input_path': input_path, 'output_path': output_path},
+        limits=sandbox_pool.limits.model_copy(update={"wall_time_s": SAMPLE_DRY_RUN_WALL_TIME_S}),
+        cancel_event=cancel_event,
+        **_execution_scope(state, code, input_path)
+    )
+    if not result['ok']:
+        return result['traceback'], result
+    # Podstawowe sprawdzenie wyniku: plik istnieje, ma kolumny i wiersze
+    if not os.path.exists(output_path):
+        return "DryRunError: kod zakończył się bez błędu, ale nie zapisał wyniku pod ścieżką `output_path`.", result
+    sample_output = read_artifact(output_path)
+    if sample_output.shape[1] == 0 or len(sample_output) == 0:
+        return (f"DryRunError: zapisany wynik jest pusty ({len(sample_output)} wierszy, "
+                f"{sample_output.shape[1]} kolumn), choć próbka wejściowa nie była pusta."), result
+    result['outputs']['shape'] = sample_output.shape
+    return None, result
+
+
+def _sample_dry_run(state: AgentWorkflowState, execution_stats: List[Dict[str, Any]]):
+    """
+    Próbne uruchomienie kodu na reprezentatywnej próbce danych wejściowych (sekundy zamiast minut).
+    Zwraca (opis błędu albo None, zaktualizowana historia wykonań).
+    """
+    sample_path = state['dataset_cache'].sample_path(state['input_path'], n_rows=SAMPLE_DRY_RUN_ROWS, sample_dir=SAMPLE_DIR)
+    sample_output_path = os.path.join(SAMPLE_DIR, "dry_run", os.path.basename(os.path.normpath(state['output_path'])))
+
+    print(f"  [DRY RUN] Uruchamiam kod na próbce {SAMPLE_DRY_RUN_ROWS} wierszy...")
+    error, result = _run_on_sample(state, state['generated_code'], sample_path, sample_output_path)
+    if result['stdout']:
+        print(result['stdout'])
+    execution_stats = _with_execution_stats(execution_stats, "data_code_executor (dry run)", result)
+
+    if error is not None:
+        return f"[PRÓBNE URUCHOMIENIE na próbce {SAMPLE_DRY_RUN_ROWS} wierszy danych wejściowych]\n" + error, execution_stats
+    rows, columns = result['outputs']['shape']
+    print(f"  [DRY RUN] Próba udana ({result['exec_s']:.2f} s, wynik: {rows} x {columns}).")
+    return None, execution_stats
+
+
+def _validation_input_path(state: AgentWorkflowState) -> str:
+    """Dane do szybkiego sprawdzenia poprawki: próbka dla dużych plików, w przeciwnym razie cały (lokalny) plik."""
+    dataset_cache = state['dataset_cache']
+    input_path = dataset_cache.local_path(state['input_path'])
+    if os.path.isfile(input_path) and os.path.getsize(input_path) >= SAMPLE_DRY_RUN_MIN_BYTES:
+        input_path = dataset_cache.sample_path(state['input_path'], n_rows=SAMPLE_DRY_RUN_ROWS, sample_dir=SAMPLE_DIR)
+    return input_path
+
+
+def _cached_fix(state: AgentWorkflowState) -> Optional[Dict[str, Any]]:
+    """
+    Poprawka z trwałego indeksu poprawek (odcisk błędu + fragment kodu), sprawdzona w piaskownicy na próbce danych.
+    Zwraca decyzję debuggera albo None, gdy indeks nie zna błędu lub poprawka nie przeszła próby.
+    """
+    fix_cache = state.get('fix_cache')
+    if fix_cache is None:
+        return None
+    hit = fix_cache.lookup(state['error_message'], state['error_context_code'])
+    if hit is None:
+        return None
+    print(f"  [INDEKS POPRAWEK] Znana poprawka dla tego błędu (pewność {hit['confidence']:.0%}). Sprawdzam ją na próbce...")
+    error = " ".join(str(v) for v in check_code(hit['corrected_code'], _backend(state))) or None
+    if error is None:
+        output_path = os.path.join(SAMPLE_DIR, "fix_cache", os.path.basename(os.path.normpath(state['output_path'])))
+        error, _ = _run_on_sample(state, hit['corrected_code'], _validation_input_path(state), output_path)
+    fix_cache.record_outcome(hit['key'], ok=error is None)
+    if error is not None:
+        print(f"  [INDEKS POPRAWEK] Poprawka odrzucona: {error.strip().splitlines()[-1][:200]}")
+        return None
+    analysis = f"Poprawka z indeksu poprawek (sprawdzona na próbce danych). {hit['analysis']}".strip()
+    return {"tool_choice": "propose_code_fix", "tool_args": {"analysis": analysis, "corrected_code": hit['corrected_code']},
+            "debugger_analysis": analysis}
+
+
+def _record_resolved_fixes(state: AgentWorkflowState):
+    """
+    Po udanym wykonaniu zapisuje w indeksie poprawki z bieżącej sesji naprawczej, które usunęły swój błąd
+    (kolejna próba nie dotyczyła już tego samego błędu).
+    """
+    fix_cache = state.get('fix_cache')
+    session = state.get('pending_fix_session') or {}
+    attempts = [a for a in session.get("fix_attempts", []) if a.get("code_key") == "generated_code" and a.get("failing_code")]
+    if fix_cache is None or not attempts:
+        return
+    digests = [fingerprint_error(a["error_message"], a["failing_code"]).digest for a in attempts]
+    for i, attempt in enumerate(attempts):
+        if digests[i] not in digests[i + 1:]:
+            fix_cache.store(attempt["error_message"], attempt["failing_code"], attempt["corrected_code"],
+                            attempt.get("debugger_analysis", ""))
+
+
+def _speculative_fix(state: AgentWorkflowState, prompt: str) -> Optional[Dict[str, Any]]:
+    """
+    Spekulacyjna naprawa kodu przetwarzania: K poprawek generowanych równolegle (różne temperatury/modele),
+    każda od razu sprawdzana w osobnej piaskownicy na próbce danych. Pierwsza poprawna wygrywa, pozostałe
+    są anulowane. Gdy żadna nie przejdzie próby, zwracana jest poprawka kandydata o najniższej temperaturze
+    (jak w szeregowej pętli naprawczej); None - gdy nie powstał żaden kandydat.
+    """
+    models = SPECULATIVE_FIX_MODELS or [state['config']['MAIN_AGENT']]
+    variants = [(models[i % len(models)], SPECULATIVE_FIX_TEMPERATURES[i % len(SPECULATIVE_FIX_TEMPERATURES)])
+                for i in range(SPECULATIVE_FIX_CANDIDATES)]
+    state['sandbox_pool'].ensure_size(len(variants))
+    input_path = _validation_input_path(state)
+    output_name = os.path.basename(os.path.normpath(state['output_path']))
+    known_columns = state.get('available_columns')
+
+    def make_task(index: int, model: str, temperature: float):
+        def task(cancel_event: threading.Event) -> Optional[Dict[str, Any]]:
+            llm = ChatVertexAI(model_name=model, temperature=temperature, project=PROJECT_ID, location=LOCATION)
+            response = llm.bind_tools([propose_code_fix], tool_choice="propose_code_fix").invoke(prompt)
+            if not response.tool_calls or cancel_event.is_set():
+                return None
+            args = dict(response.tool_calls[0]['args'])
+            code, _ = apply_fixers(args.get('corrected_code') or "", kind=_processing_kind(state), known_columns=known_columns)
+            args['corrected_code'] = code
+            static_errors = [str(f) for f in analyze_code(code, _processing_kind(state), known_columns) if f.severity == "error"]
+            static_errors += [str(v) for v in check_code(code, _backend(state))]
+            if static_errors:
+                return {"args": args, "error": " ".join(static_errors)}
+            output_path = os.path.join(SAMPLE_DIR, "speculative", str(index), output_name)
+            error, _ = _run_on_sample(state, code, input_path, output_path, cancel_event)
+            return {"args": args, "error": error}
+        return task
+
+    print(f"  [SPEKULACJA] Generuję i sprawdzam równolegle {len(variants)} poprawek: {variants}")
+    winner, results = race([make_task(i, model, temperature) for i, (model, temperature) in enumerate(variants)],
+                           accept=lambda r: r is not None and r["error"] is None)
+    for i, candidate in enumerate(results):
+        verdict = "brak wyniku (anulowany)" if candidate is None else "OK" if candidate["error"] is None else \
+            candidate["error"].strip().splitlines()[-1][:200]
+        print(f"  [SPEKULACJA] Kandydat {i} {variants[i]}: {verdict}")
+    chosen = chosen_result(winner, results)
+    if chosen is None:
+        return None
+    if winner is not None:
+        print(f"  [SPEKULACJA] Wybrano kandydata {winner} - poprawka przeszła próbę w piaskownicy.")
+    return {"tool_choice": "propose_code_fix", "tool_args": chosen["args"], "debugger_analysis": chosen["args"].get("analysis", "")}
+
+
+def _chat_model(model: str, temperature: float, max_tokens: int):
+    """Model czatu po nazwie: rodzina Claude przez API Anthropic, pozostałe przez Vertex AI."""
+    if model.startswith("claude"):
+        return ChatAnthropic(model_name=model, temperature=temperature, max_tokens=max_tokens)
+    return ChatVertexAI(model_name=model, temperature=temperature, max_tokens=max_tokens, project=PROJECT_ID, location=LOCATION)
+
+
+def _generate_candidates(state: AgentWorkflowState, prompt: str) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """
+    N kandydatów kodu przetwarzającego generowanych równolegle (różne modele/temperatury); każdy od razu przechodzi
+    poprawki mechaniczne, reguły architektury i próbę na próbce danych w osobnej piaskownicy. Pierwszy poprawny
+    wygrywa, pozostałe są anulowane. Bez poprawnego kandydata zwracany jest kod pierwszego kandydata, który powstał
+    (dalej trafia do zwykłej pętli naprawczej). Zwraca (kod albo None, statystyki kandydatów).
+    """
+    models = CODEGEN_MODELS or [state['config']['CODE_MODEL']]
+    variants = [(models[i % len(models)], CODEGEN_TEMPERATURES[i % len(CODEGEN_TEMPERATURES)]) for i in range(CODEGEN_CANDIDATES)]
+    state['sandbox_pool'].ensure_size(len(variants))
+    input_path = _validation_input_path(state)
+    output_name = os.path.basename(os.path.normpath(state['output_path']))
+    known_columns = state.get('available_columns')
+    kind, backend = _processing_kind(state), _backend(state)
+
+    def make_task(index: int, model: str, temperature: float):
+        def task(cancel_event: threading.Event) -> Optional[Dict[str, Any]]:
+            started = time.perf_counter()
+            response = _chat_model(model, temperature, max_tokens=4096).with_structured_output(GeneratedCode).invoke(prompt)
+            candidate = {"llm_s": time.perf_counter() - started}
+            if cancel_event.is_set():
+                return None
+            code, _ = apply_fixers(response.code or "", kind=kind, known_columns=known_columns)
+            errors = [str(f) for f in analyze_code(code, kind, known_columns) if f.severity == "error"]
+            errors += [str(v) for v in check_code(code, backend)]
+            error = " ".join(errors) or None
+            if error is None:
+                output_path = os.path.join(SAMPLE_DIR, "codegen", str(index), output_name)
+                error, _ = _run_on_sample(state, code, input_path, output_path, cancel_event)
+            return {**candidate, "code": code, "error": error, "total_s": time.perf_counter() - started}
+        return task
+
+    print(f"  [KANDYDACI] Generuję i sprawdzam równolegle {len(variants)} wersji kodu: {variants}")
+    winner, results = race([make_task(i, model, temperature) for i, (model, temperature) in enumerate(variants)],
+                           accept=lambda r: r is not None and r["error"] is None)
+    stats = []
+    for i, candidate in enumerate(results):
+        entry = {"run_id": state.get('run_id'), "candidate": i, "model": variants[i][0], "temperature": variants[i][1],
+                 "winner": i == winner, "cancelled": candidate is None}
+        if candidate is not None:
+            entry.update({"ok": candidate["error"] is None, "llm_s": round(candidate["llm_s"], 3),
+                          "total_s": round(candidate["total_s"], 3),
+                          "error": candidate["error"].strip().splitlines()[-1][:200] if candidate["error"] else None})
+        print(f"  [KANDYDACI] {entry}")
+        stats.append(entry)
+    # Historia między uruchomieniami - podstawa do strojenia liczby kandydatów i ich konfiguracji
+    os.makedirs(os.path.dirname(CODEGEN_STATS_PATH) or ".", exist_ok=True)
+    with open(CODEGEN_STATS_PATH, "a", encoding="utf-8") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in stats)
+    chosen = chosen_result(winner, results)
+    if winner is not None:
+        print(f"  [KANDYDACI] Wybrano kandydata {winner} - kod przeszedł reguły i próbę na próbce danych.")
+    return (chosen["code"] if chosen is not None else None), stats
+
 
 def schema_reader_node(state: AgentWorkflowState):
     print("--- WĘZEŁ: ANALIZATOR SCHEMATU DANYCH ---")
     print(f"DEBUG: Próbuję odczytać plik ze ścieżki: {state.get('input_path')}")
     try:
-        df_header = pd.read_csv(state['input_path'], nrows=0)
+        dataset_cache = state['dataset_cache']
         
-        #pamięć długotrwała, tworzenie sygnatury
+        #pamięć długotrwała, tworzenie sygnatury na podstawie odcisku treści (liczonego raz na uruchomienie)
         memory_client = state['memory_client']
-        dataset_signature = memory_client.create_dataset_signature(df_header)
+        fingerprint = dataset_cache.dataset_fingerprint(state['input_path'], exact=MEMORY_SCOPE_GRANULARITY == "content")
+        dataset_signature = memory_client.create_dataset_signature(fingerprint, granularity=MEMORY_SCOPE_GRANULARITY)
         print(f"INFO: Wygenerowano sygnaturę danych: {dataset_signature}")
         #--koniec--
+
+        # Profil kolumn z trwałego magazynu (przy powtórnym uruchomieniu na tych samych danych bez czytania pliku)
+        input_profile = dataset_cache.dataset_profile(state['input_path'], chunksize=PROFILER_CHUNK_SIZE, max_workers=PROFILER_MAX_WORKERS)
+        available_columns = list(input_profile["columns"])
+
+        # Silnik kodu przetwarzającego dobierany raz, przed generowaniem kodu (od niego zależą prompt i reguły)
+        execution_backend = _choose_backend(dataset_cache.local_path(state['input_path']))
+        print(f"INFO: Silnik wykonania kodu przetwarzającego: {execution_backend}")
         
-        return {"available_columns": df_header.columns.tolist(),"dataset_signature": dataset_signature}
+        return succeeded({"available_columns": available_columns, "dataset_signature": dataset_signature,
+                          "dataset_fingerprint": fingerprint.model_dump(), "input_profile": input_profile,
+                          "execution_backend": execution_backend})
     except Exception as e:
         return {"error_message": f"Błąd odczytu pliku: {e}", "failing_node": "schema_reader"}
 
@@ -63,31 +478,44 @@ def code_generator_node(state: AgentWorkflowState):
     """Generuje główny skrypt przetwarzający dane z użyciem structured output."""
     print("---  WĘZEŁ: GENERATOR KODU ---")
     try:
-        CODE_MODEL = state['config']['CODE_MODEL']
-        
-        # ZMIANA: Znacząco zwiększamy max_tokens, aby model miał miejsce na wygenerowanie pełnego kodu.
-        llm = ChatAnthropic(model_name=CODE_MODEL, temperature=0.0, max_tokens=4096)
-        
-        # Powiązanie LLM ze schematem Pydantic, aby wymusić poprawny format wyjściowy.
-        structured_llm = llm.with_structured_output(GeneratedCode)
-        
         prompt = PromptFactory.for_code_generator(
             plan=state['plan'], 
-            available_columns=state['available_columns']
+            available_columns=state['available_columns'],
+            output_format=detect_format(state['output_path']),
+            column_profile=state.get('input_profile'),
+            chunked_contract=EXECUTION_MODE != "single",
+            dtype_layer=DTYPE_OPTIMIZATION,
+            step_contract=STEP_EXECUTION,
+            backend=_backend(state),
+            dtype_changes=_planned_dtype_changes(state)
         )
         
-        # Wywołanie zwraca obiekt Pydantic, a nie surowy string.
-        response_object = structured_llm.invoke(prompt)
-        
-        # Używamy poprawnej i ujednoliconej nazwy pola: 'code'.
-        code = response_object.code
+        if CODEGEN_CANDIDATES > 1:
+            # Kilku kandydatów równolegle - pierwszy, który przejdzie reguły i próbę na próbce, zostaje wybrany
+            code, codegen_stats = _generate_candidates(state, prompt)
+            if code is None:
+                raise RuntimeError("żaden z kandydatów nie zwrócił kodu.")
+        else:
+            # ZMIANA: Znacząco zwiększamy max_tokens, aby model miał miejsce na wygenerowanie pełnego kodu.
+            CODE_MODEL = state['config']['CODE_MODEL']
+            llm = ChatAnthropic(model_name=CODE_MODEL, temperature=0.0, max_tokens=4096)
+
+            # Powiązanie LLM ze schematem Pydantic, aby wymusić poprawny format wyjściowy.
+            structured_llm = llm.with_structured_output(GeneratedCode)
+
+            # Wywołanie zwraca obiekt Pydantic, a nie surowy string.
+            response_object = structured_llm.invoke(prompt)
+
+            # Używamy poprawnej i ujednoliconej nazwy pola: 'code'.
+            code = response_object.code
+            codegen_stats = []
         
         print("\nAgent-Analityk wygenerował następujący kod:")
         print("--------------------------------------------------")
         print(code)
         print("--------------------------------------------------")
         
-        return {"generated_code": code,"active_code_key": "generated_code" }
+        return succeeded({"generated_code": code,"active_code_key": "generated_code", "codegen_stats": codegen_stats})
 
     except Exception as e:
         # Dodajemy obsługę błędu, aby dać więcej kontekstu, jeśli coś pójdzie nie tak.
@@ -102,6 +530,35 @@ def code_generator_node(state: AgentWorkflowState):
 
 
 
+def static_analyzer_node(state: AgentWorkflowState):
+    """Analiza statyczna kodu przed wykonaniem; trywialne błędy są poprawiane lokalnie, bez debuggera."""
+    print("--- WĘZEŁ: ANALIZA STATYCZNA KODU ---")
+    update = _static_analysis(state, "generated_code", _processing_kind(state), "static_analyzer", state.get('available_columns'))
+    if not update.get("error_message"):
+        print("  [WERDYKT] Analiza statyczna nie wykazała błędów.")
+        update = succeeded(update)
+    return update
+
+
+def _performance_violations(state: AgentWorkflowState, code: str) -> List[Any]:
+    """
+    Naruszenia reguł wydajności, które blokują kod (wg PERFORMANCE_RULES_MODE / PERFORMANCE_RULE_MODES); pozostałe
+    są wypisywane jako ostrzeżenia. Reguła blokuje najwyżej raz w przebiegu - jeśli przepisany kod nadal ją łamie,
+    wzorca najpewniej nie da się zwektoryzować i kod jest wykonywany (lepiej wolno niż eskalacja).
+    """
+    if _backend(state) != "pandas":
+        return []
+    already_blocked = set(state.get('performance_blocked') or [])
+    blocking = []
+    for violation in check_code(code, "performance"):
+        mode = PERFORMANCE_RULE_MODES.get(violation.rule_id, PERFORMANCE_RULES_MODE)
+        if mode == "block" and violation.rule_id not in already_blocked:
+            blocking.append(violation)
+        elif mode != "off":
+            print(f"  [WYDAJNOŚĆ] {violation}")
+    return blocking
+
+
 def architectural_validator_node(state: AgentWorkflowState):
     print("--- 🛡️ WĘZEŁ: STRAŻNIK ARCHITEKTURY 🛡️ ---")
     code_to_check = state.get('generated_code', '')
@@ -110,7 +567,12 @@ def architectural_validator_node(state: AgentWorkflowState):
         print(f"  [WERDYKT] ❌ {error_message}")
         return {"error_message": error_message, "failing_node": "architectural_validator", "error_context_code": "", "correction_attempts": state.get('correction_attempts', 0) + 1}
 
-    errors = [rule["error_message"] for rule in ARCHITECTURAL_RULES if rule["check"](code_to_check)]
+    # Jedno parsowanie do AST i jedno przejście wszystkich reguł; werdykt zapamiętany po hashu kodu
+    errors = [str(violation) for violation in check_code(code_to_check, _backend(state))]
+    # Wzorce wierszowe (apply axis=1, iterrows, pętle po wierszach, concat w pętli) - z gotowym zamiennikiem dla debuggera
+    performance = _performance_violations(state, code_to_check)
+    errors += [str(violation) for violation in performance]
+    performance_blocked = list(state.get('performance_blocked') or []) + sorted({v.rule_id for v in performance})
     
     if errors:
         error_message = "Błąd Walidacji Architektonicznej: " + " ".join(errors)
@@ -123,11 +585,12 @@ def architectural_validator_node(state: AgentWorkflowState):
             "fix_attempts": []
         }
         
-        return {"error_message": error_message, "failing_node": "architectural_validator", "error_context_code": code_to_check, "correction_attempts": state.get('correction_attempts', 0) + 1}
+        return {"error_message": error_message, "failing_node": "architectural_validator", "error_context_code": code_to_check, "correction_attempts": state.get('correction_attempts', 0) + 1,
+                "performance_blocked": performance_blocked}
     else:
         # <<< WAŻNY PRINT >>>
         print("  [WERDYKT] Kod jest zgodny z architekturą systemu.")
-        return {"error_message": None, "pending_fix_session": None}
+        return succeeded({"pending_fix_session": None})
 
     
 def data_code_executor_node(state: AgentWorkflowState):
@@ -135,73 +598,211 @@ def data_code_executor_node(state: AgentWorkflowState):
     Wykonuje finalny kod do przetwarzania danych.
     """
     print("--- WĘZEŁ: WYKONANIE KODU DANYCH  ---")
+    execution_stats = state.get("execution_stats") or []
+    code_update = {}
     try:
-        print("  [INFO] Uruchamiam ostatecznie zatwierdzony kod...")
-        
-        # Definiujemy środowisko wykonawcze tylko z niezbędnymi bibliotekami
-        exec_scope = {
-            'pd': pd,
-            'input_path': state['input_path'],
-            'output_path': state['output_path']
-        }
-        
-        exec(state['generated_code'], exec_scope)
-        
-        print("  [WYNIK] Kod wykonany pomyślnie.")
-        return {"error_message": None, "correction_attempts": 0}
+        # Po poprawce debuggera graf wraca prosto tutaj - trywialne błędy poprawiamy lokalnie, zanim cokolwiek uruchomimy
+        code_update = _static_analysis(state, "generated_code", _processing_kind(state), "data_code_executor", state.get('available_columns'))
+        if code_update.get("error_message"):
+            return code_update
+        state = {**state, **code_update}
+
+        # Obiekty gs:// są czytane z lokalnej kopii w pamięci podręcznej I/O
+        input_path = state['dataset_cache'].local_path(state['input_path'])
+
+        # Etap 0: ten sam kod na tych samych danych (np. ponowne uruchomienie po błędzie dalej w grafie)
+        # nie jest wykonywany drugi raz - wynik odtwarzamy z pamięci wykonań
+        execution_cache = state.get('execution_cache')
+        cache_key = input_signature = None
+        if execution_cache is not None and os.path.isfile(input_path):
+            input_signature = _input_signature(state)
+            cache_key = _execution_cache_key(state, state['generated_code'], output_name=os.path.basename(state['output_path']))
+            if execution_cache.get(cache_key) is not None and execution_cache.restore_artifact(cache_key, state['output_path']):
+                print("  [CACHE] Wynik tego kodu dla tych danych jest w pamięci wykonań - pomijam wykonanie.")
+                return succeeded({"correction_attempts": 0, "execution_stats": execution_stats,
+                                  "processed_data_signature": cache_key, **code_update})
+
+        # Etap 1: dla dużych danych najpierw próba na próbce - błędy wychodzą po sekundach, a nie po pełnym przebiegu.
+        # Po poprawce debuggera graf wraca prosto tutaj, więc reguły architektury sprawdzamy ponownie.
+        error_traceback = None
+        if SAMPLE_DRY_RUN and os.path.isfile(input_path) and os.path.getsize(input_path) >= SAMPLE_DRY_RUN_MIN_BYTES:
+            validation = architectural_validator_node(state)
+            if validation.get("error_message"):
+                return {**code_update, **validation}
+            error_traceback, execution_stats = _sample_dry_run(state, execution_stats)
+
+        # Etap 2: pełne dane
+        if error_traceback is None:
+            print("  [INFO] Uruchamiam ostatecznie zatwierdzony kod w piaskownicy...")
+            
+            if _use_chunked_mode(state, input_path):
+                # Transformacja lokalna dla wiersza: fit_params raz, transform_chunk równolegle na shardach
+                result = run_chunked(state['sandbox_pool'], state['generated_code'], input_path, state['output_path'],
+                                     max_workers=CHUNKED_MAX_WORKERS, chunksize=CHUNKED_ROWS_PER_CHUNK,
+                                     dtype_options=_dtype_scope(state['generated_code'], input_path).get("dtype_options"))
+            elif _use_step_mode(state):
+                # Kroki planu jako DAG: wyniki kroków w pamięci wykonań, wznowienie od pierwszego zmienionego kroku
+                result = run_steps(state['sandbox_pool'], state['generated_code'], input_path, state['output_path'],
+                                   work_dir=os.path.join(STEP_WORK_DIR, state['run_id']), cache=execution_cache,
+                                   input_signature=input_signature, max_workers=STEP_MAX_WORKERS,
+                                   dtype_options=_dtype_scope(state['generated_code'], input_path).get("dtype_options"))
+                cached = [step['name'] for step in result['outputs']['steps'] if step['cached']]
+                print(f"  [KROKI] Z pamięci: {cached or 'brak'}; wykonanie od kroku: {result['outputs']['resumed_from']}")
+            else:
+                # Katalog części z wcześniejszego przebiegu kawałkowego zablokowałby zapis pojedynczego pliku,
+                # a stary plik może być dowiązaniem do wpisu pamięci wykonań - nie wolno go nadpisać w miejscu
+                if os.path.isdir(state['output_path']):
+                    shutil.rmtree(state['output_path'])
+                elif os.path.exists(state['output_path']):
+                    os.remove(state['output_path'])
+                # Kod wykonuje się w osobnym procesie z puli; w zakresie są `pd`, ścieżki i warstwa typów danych
+                projection = _input_projection(state, state['generated_code'])
+                if projection is not None:
+                    print(f"  [PROJEKCJA] Wczytuję {len(projection)} z {len(state['available_columns'])} kolumn wejścia: {projection}")
+                # Część przebiegów (PROFILING_RATE) idzie pod profilerem próbkującym - najkosztowniejsze linie trafiają do stanu
+                profile_options = {"interval_s": PROFILING_INTERVAL_S, "top_n": PROFILING_TOP_N} if random.random() < PROFILING_RATE else None
+                result = state['sandbox_pool'].run(
+                    push_projection(state['generated_code'], projection),
+                    variables={'input_path': input_path, 'output_path': state['output_path']},
+                    profile_options=profile_options,
+                    **_execution_scope(state, state['generated_code'], input_path)
+                )
+            if result['stdout']:
+                print(result['stdout'])
+            print(f"  [SANDBOX] Czas wykonania: {result['exec_s'] or 0:.2f} s (z obsługą puli: {result['roundtrip_s']:.2f} s)")
+            execution_stats = _with_execution_stats(execution_stats, "data_code_executor", result)
+            
+            if result['ok']:
+                print("  [WYNIK] Kod wykonany pomyślnie.")
+                _record_resolved_fixes(state)
+                if cache_key is not None:
+                    execution_cache.put(cache_key, {"node": "data_code_executor", "exec_s": result['exec_s']},
+                                        artifact_path=state['output_path'])
+                hotspots = (result['outputs'].get('profile') or {}).get('hotspots')
+                for hotspot in hotspots or []:
+                    print(f"  [PROFIL] linia {hotspot['line']}: {hotspot['share']:.0%} czasu ({hotspot['self_s']} s), "
+                          f"pamięć {hotspot['mem_delta_bytes'] / 1024**2:+.1f} MB | {hotspot['code']}")
+                return succeeded({"correction_attempts": 0, "execution_stats": execution_stats,
+                                  "processed_data_signature": cache_key, "execution_runtime_s": result['exec_s'],
+                                  "profile_hotspots": hotspots, **code_update})
+            error_traceback = result['traceback']
         
     except Exception as e:
         error_traceback = traceback.format_exc()
-        print(f"  [BŁĄD] Wystąpił błąd. Przekazywanie do inteligentnego debuggera:\n{error_traceback}")
-        
-        #--pamięć długotrwała: zapis błędu, sesja tymczasowa
-        
-        pending_session = {
-            "initial_error": error_traceback,
-            "initial_code": state['generated_code'],
-            "fix_attempts": []  # Pusta lista na przyszłe próby naprawy
-        }
-        #--koniec--
-        
-        return {
-            "failing_node": "data_code_executor", 
-            "error_message": error_traceback, 
-            "error_context_code": state['generated_code'], 
-            "active_code_key": "generated_code",
-            "correction_attempts": state.get('correction_attempts', 0) + 1,
-            "pending_fix_session": pending_session
-        }
 
+    print(f"  [BŁĄD] Wystąpił błąd. Przekazywanie do inteligentnego debuggera:\n{error_traceback}")
+    
+    #--pamięć długotrwała: zapis błędu, sesja tymczasowa
     
+    pending_session = _fix_session(state, error_traceback, state['generated_code'])
+    #--koniec--
+    
+    return {
+        "failing_node": "data_code_executor", 
+        "error_message": error_traceback, 
+        "error_context_code": state['generated_code'], 
+        "active_code_key": "generated_code",
+        "correction_attempts": state.get('correction_attempts', 0) + 1,
+        "pending_fix_session": pending_session,
+        "execution_stats": execution_stats,
+        **code_update
+    }
+
+
 def universal_debugger_node(state: AgentWorkflowState):
     print(f"--- WĘZEŁ: INTELIGENTNY DEBUGGER (Błąd w: {state.get('failing_node')}) ---")
     failing_node_name = state.get('failing_node', 'unknown')
-    
-    
+
+    # Odcisk bieżącego błędu w sesji naprawczej: ten sam błąd po poprawce albo powrót do wcześniejszego to pętla
+    session = dict(_fix_session(state, state['error_message'], state.get('error_context_code')))
+    fingerprint = fingerprint_error(state['error_message'], state.get('error_context_code'))
+    session["error_fingerprints"] = session.get("error_fingerprints", []) + [fingerprint.digest]
+    loop = detect_loop(session["error_fingerprints"])
+    loop_stats = {**CORRECTION_LOOP_STATS, **(state.get('correction_loop_stats') or {})}
+    tracking = {"pending_fix_session": session, "correction_loop_stats": loop_stats}
+    if loop is not None:
+        loop_stats[loop] += 1
+        repeats = session["error_fingerprints"][:-1].count(fingerprint.digest)
+        print(f"  [PĘTLA] Błąd {fingerprint.exc_type} ({fingerprint.digest}) powtórzył się {repeats} raz(y): {loop}.")
+        if repeats >= LOOP_MAX_REPEATS:
+            # Kolejne próby tą samą drogą nic nie dadzą - eskalacja od razu, bez zużywania pozostałych prób
+            loop_stats["early_escalations"] += 1
+            loop_stats["attempts_saved"] += max(0, MAX_CORRECTION_ATTEMPTS - state.get('correction_attempts', 0))
+            print("  [PĘTLA] Przerywam pętlę naprawczą i eskaluję do człowieka.")
+            return {"error_message": f"Wykryto pętlę naprawczą ({loop}): błąd {fingerprint.exc_type} powraca mimo poprawek.\n"
+                                     f"{state['error_message']}", "tool_choice": None, **tracking}
+        loop_stats["strategy_switches"] += 1
+
+    # Szybka ścieżka: znane klasy błędów (brak modułu, brak pliku) są obsługiwane lokalnie, bez wywołania LLM
+    error_router = state.get('error_router')
+    route = error_router.classify(state['error_message'], state) if error_router is not None and loop is None else None
+    if route is not None and "llm_prompt" not in route:
+        print(f"  [DIAGNOZA] Szybka ścieżka '{route['route']}': narzędzie '{route['tool_choice']}' bez wywołania LLM.")
+        return {"tool_choice": route["tool_choice"], "tool_args": route["tool_args"], "debugger_analysis": route["debugger_analysis"], **tracking}
+
+    # Poprawka, która już raz usunęła ten sam błąd w tym samym miejscu kodu (także w poprzednich uruchomieniach)
+    if loop is None and CODE_ARTIFACT_MAP.get(failing_node_name) == "generated_code":
+        decision = _cached_fix(state)
+        if decision is not None:
+            print("  [DIAGNOZA] Poprawka z indeksu przeszła próbę - bez wywołania LLM.")
+            return {**decision, **tracking}
     
     MAIN_AGENT=state['config']['MAIN_AGENT']
-    # llm = ChatAnthropic(model_name=CODE_MODEL, temperature=0.0, max_tokens=2048)
-    llm = ChatVertexAI(model_name=MAIN_AGENT,temperature=0.0, project=PROJECT_ID, location=LOCATION)
-    tools = [propose_code_fix, request_package_installation, inspect_tool_code]
-    llm_with_tools = llm.bind_tools(tools)
+    if loop is not None:
+        # Zmiana strategii: inny model (z rodziny modelu generującego kod) i wyższa temperatura
+        print(f"  [PĘTLA] Zmiana strategii: model {state['config']['CODE_MODEL']} zamiast {MAIN_AGENT}.")
+        llm = ChatAnthropic(model_name=state['config']['CODE_MODEL'], temperature=0.5, max_tokens=8192)
+    else:
+        llm = ChatVertexAI(model_name=MAIN_AGENT,temperature=0.0, project=PROJECT_ID, location=LOCATION)
     
-    prompt = PromptFactory.for_universal_debugger(
-    failing_node=failing_node_name,
-    error_message=state['error_message'],
-    code_context=state['error_context_code'],
-    active_policies=state.get("active_policies")
-    )
+    # Zużycie zasobów ostatniego wykonania - przy przekroczeniu limitu debugger ma poprawić wydajność, a nie logikę
+    execution_stats = state.get("execution_stats") or []
+    last_execution = execution_stats[-1] if execution_stats and not execution_stats[-1]["ok"] else None
+
+    if route is not None and route["llm_prompt"] == "performance":
+        # Przekroczony limit zasobów: ukierunkowany prompt i jedno dozwolone narzędzie (poprawka kodu)
+        print(f"  [DIAGNOZA] Przekroczony limit zasobów ({route['error_type']}) - prompt optymalizacyjny.")
+        llm_with_tools = llm.bind_tools([propose_code_fix], tool_choice="propose_code_fix")
+        prompt = PromptFactory.for_performance_fix(
+            failing_node=failing_node_name,
+            error_message=state['error_message'],
+            code_context=state['error_context_code'],
+            resource_usage=last_execution
+        )
+    else:
+        tools = [propose_code_fix, request_package_installation, inspect_tool_code]
+        llm_with_tools = llm.bind_tools(tools)
+        prompt = PromptFactory.for_universal_debugger(
+        failing_node=failing_node_name,
+        error_message=state['error_message'],
+        code_context=state['error_context_code'],
+        active_policies=state.get("active_policies"),
+        resource_usage=last_execution
+        )
     
     error_context = f"Wadliwy Kontekst:\n```\n{state['error_context_code']}\n```\n\nBłąd:\n```\n{state['error_message']}\n```"
+    if loop is not None:
+        previous = "\n".join(f"- {attempt.get('debugger_analysis', '')[:300]}" for attempt in session.get("fix_attempts", []))
+        error_context += ("\n\nUWAGA: " + ("ten sam błąd powtórzył się po poprzedniej poprawce" if loop == "identical"
+                                          else "błąd powrócił po wcześniejszej zmianie (oscylacja)")
+                          + ". Nie powtarzaj wcześniejszych podejść - zastosuj zasadniczo inną strategię naprawy."
+                          + (f"\nWcześniejsze, nieskuteczne analizy:\n{previous}" if previous else ""))
+
+    # Tryb spekulacyjny dla kodu przetwarzania: K poprawek sprawdzanych równolegle zamiast K kolejnych iteracji pętli
+    if SPECULATIVE_FIX_CANDIDATES > 1 and CODE_ARTIFACT_MAP.get(failing_node_name) == "generated_code":
+        decision = _speculative_fix(state, prompt + error_context)
+        if decision is not None:
+            return {**decision, **tracking}
+
     response = llm_with_tools.invoke(prompt + error_context)
     if not response.tool_calls:
         print("  [BŁĄD DEBUGGERA] Agent nie wybrał żadnego narzędzia. Eskalacja.")
-        return {"error_message": "Debugger nie był w stanie podjąć decyzji.", "failing_node": "universal_debugger"}
+        return {"error_message": "Debugger nie był w stanie podjąć decyzji.", "failing_node": "universal_debugger", **tracking}
     chosen_tool = response.tool_calls[0]
     tool_name = chosen_tool['name']
     tool_args = chosen_tool['args']
     print(f"  [DIAGNOZA] Debugger wybrał narzędzie: '{tool_name}' z argumentami: {tool_args}")
-    return {"tool_choice": tool_name, "tool_args": tool_args, "debugger_analysis": tool_args.get("analysis", "")}
+    return {"tool_choice": tool_name, "tool_args": tool_args, "debugger_analysis": tool_args.get("analysis", ""), **tracking}
 
 
 def apply_code_fix_node(state: AgentWorkflowState):
@@ -239,6 +840,9 @@ def apply_code_fix_node(state: AgentWorkflowState):
     attempt_info = {
         "debugger_analysis": state.get("debugger_analysis", "Brak analizy."),
         "corrected_code": corrected_code,
+        "code_key": key_to_update,
+        "error_message": state.get("error_message"),
+        "failing_code": state.get("error_context_code"),
         "attempt_number": len(session.get("fix_attempts", [])) + 1
     }
     
@@ -271,35 +875,157 @@ def package_installer_node(state: AgentWorkflowState):
     success = install_package(package_name, upgrade=True)
     
     if success:
-        return {"package_to_install": None, "user_approval_status": None, "error_message": None}
+        # failing_node zostaje - router wraca do węzła, który zgłosił brak pakietu
+        return {"package_to_install": None, "user_approval_status": None, "error_message": None,
+                "tool_choice": None, "tool_args": None}
     else:
         return {"error_message": f"Operacja na pakiecie '{package_name}' nie powiodła się.", "failing_node": "package_installer"}
 
 
     
+def needs_optimization(state: AgentWorkflowState) -> bool:
+    """Czy pełny przebieg kodu przekroczył budżet czasu (kod optymalizujemy najwyżej raz w uruchomieniu)."""
+    runtime = state.get('execution_runtime_s')
+    return runtime is not None and runtime > RUNTIME_BUDGET_S and state.get('optimization_report') is None
+
+
+def _outputs_match(expected_path: str, actual_path: str) -> Optional[str]:
+    """Porównuje dwa wyniki przetwarzania (kolejność kolumn i wierszy bez znaczenia). Zwraca opis różnicy albo None."""
+    expected, actual = read_artifact(expected_path), read_artifact(actual_path)
+    if sorted(map(str, expected.columns)) != sorted(map(str, actual.columns)):
+        return f"inne kolumny: {sorted(map(str, expected.columns))} vs {sorted(map(str, actual.columns))}"
+    if len(expected) != len(actual):
+        return f"inna liczba wierszy: {len(expected)} vs {len(actual)}"
+    actual = actual[list(expected.columns)]
+    options = {"check_dtype": False, "check_categorical": False, "check_index_type": False, "rtol": 1e-6}
+    try:
+        pd.testing.assert_frame_equal(expected.reset_index(drop=True), actual.reset_index(drop=True), **options)
+        return None
+    except AssertionError:
+        pass
+    # Ta sama zawartość w innej kolejności wierszy
+    columns = list(expected.columns)
+    expected = expected.loc[expected.astype(str).sort_values(columns).index].reset_index(drop=True)
+    actual = actual.loc[actual.astype(str).sort_values(columns).index].reset_index(drop=True)
+    try:
+        pd.testing.assert_frame_equal(expected, actual, **options)
+        return None
+    except AssertionError as e:
+        return " ".join(str(e).split())[:300]
+
+
+def performance_optimizer_node(state: AgentWorkflowState):
+    """
+    Optymalizacja poprawnego, ale zbyt wolnego kodu przetwarzającego: LLM dostaje kod i profil linii z pełnego przebiegu.
+    Przepisany kod musi na próbce danych dać ten sam wynik co obecny i być co najmniej OPTIMIZER_MIN_SPEEDUP razy szybszy;
+    przyjmowany jest dopiero wtedy, gdy także na pełnych danych da wynik identyczny z już zapisanym. Wynik pełnego
+    przebiegu obecnego kodu pozostaje na miejscu, więc niepowodzenie niczego nie psuje.
+    """
+    print("--- WĘZEŁ: OPTYMALIZATOR WYDAJNOŚCI ---")
+    code, runtime_s = state['generated_code'], state['execution_runtime_s']
+    report: Dict[str, Any] = {"accepted": False, "runtime_s": runtime_s, "budget_s": RUNTIME_BUDGET_S}
+    print(f"  [OPTYMALIZACJA] Pełny przebieg trwał {runtime_s:.1f} s (budżet: {RUNTIME_BUDGET_S} s). Proszę o szybszą wersję kodu...")
+    try:
+        prompt = PromptFactory.for_performance_optimizer(code, state.get('profile_hotspots'), runtime_s, RUNTIME_BUDGET_S,
+                                                         backend=_backend(state))
+        llm = ChatAnthropic(model_name=state['config']['CODE_MODEL'], temperature=0.0, max_tokens=4096)
+        candidate, _ = apply_fixers(llm.with_structured_output(GeneratedCode).invoke(prompt).code or "",
+                                    kind=_processing_kind(state), known_columns=state.get('available_columns'))
+        errors = [str(f) for f in analyze_code(candidate, _processing_kind(state), state.get('available_columns')) if f.severity == "error"]
+        errors += [str(v) for v in check_code(candidate, _backend(state))]
+        if errors:
+            report["reason"] = "analiza statyczna: " + " ".join(errors)
+            print(f"  [OPTYMALIZACJA] Odrzucono: {report['reason']}")
+            return {"optimization_report": report}
+
+        # Ta sama próbka dla obu wersji; pomiary na przemian, liczy się najlepszy czas każdej wersji
+        sample_path = state['dataset_cache'].sample_path(state['input_path'], n_rows=OPTIMIZER_SAMPLE_ROWS, sample_dir=SAMPLE_DIR)
+        output_name = os.path.basename(os.path.normpath(state['output_path']))
+        versions = {"original": code, "candidate": candidate}
+        timings: Dict[str, List[float]] = {name: [] for name in versions}
+        for _ in range(OPTIMIZER_TIMING_RUNS):
+            for name, version in versions.items():
+                error, result = _run_on_sample(state, version, sample_path, os.path.join(SAMPLE_DIR, "optimizer", name, output_name))
+                if error is not None:
+                    report["reason"] = f"wersja '{name}' nie działa na próbce: {error.strip().splitlines()[-1][:200]}"
+                    print(f"  [OPTYMALIZACJA] Odrzucono: {report['reason']}")
+                    return {"optimization_report": report}
+                timings[name].append(result['exec_s'])
+        difference = _outputs_match(os.path.join(SAMPLE_DIR, "optimizer", "original", output_name),
+                                    os.path.join(SAMPLE_DIR, "optimizer", "candidate", output_name))
+        original_s, candidate_s = min(timings["original"]), min(timings["candidate"])
+        report.update({"sample_rows": OPTIMIZER_SAMPLE_ROWS, "original_sample_s": round(original_s, 3),
+                       "candidate_sample_s": round(candidate_s, 3), "speedup": round(original_s / max(candidate_s, 1e-9), 2)})
+        if difference is not None:
+            report["reason"] = f"inny wynik na próbce: {difference}"
+        elif report["speedup"] < OPTIMIZER_MIN_SPEEDUP:
+            report["reason"] = f"przyspieszenie {report['speedup']}x poniżej progu {OPTIMIZER_MIN_SPEEDUP}x"
+        if report.get("reason"):
+            print(f"  [OPTYMALIZACJA] Odrzucono: {report['reason']}")
+            return {"optimization_report": report}
+
+        # Próbka to za mało: przepisany kod musi dać ten sam wynik na pełnych danych (zapis obok obecnego wyniku)
+        print(f"  [OPTYMALIZACJA] Na próbce: ten sam wynik, {report['speedup']}x szybciej ({original_s:.2f} s -> {candidate_s:.2f} s). "
+              f"Sprawdzam przepisany kod na pełnych danych...")
+        input_path = state['dataset_cache'].local_path(state['input_path'])
+        full_output_path = os.path.join(os.path.dirname(state['output_path']), ".optimizer", output_name)
+        if os.path.isdir(full_output_path):
+            shutil.rmtree(full_output_path)
+        elif os.path.exists(full_output_path):
+            os.remove(full_output_path)
+        os.makedirs(os.path.dirname(full_output_path), exist_ok=True)
+        result = state['sandbox_pool'].run(
+            _projected_code(state, candidate),
+            variables={'input_path': input_path, 'output_path': full_output_path},
+            **_execution_scope(state, candidate, input_path)
+        )
+        if not result['ok']:
+            report["reason"] = f"błąd na pełnych danych: {result['traceback'].strip().splitlines()[-1][:200]}"
+        else:
+            report["full_runtime_s"] = round(result['exec_s'], 3)
+            difference = _outputs_match(state['output_path'], full_output_path)
+            if difference is not None:
+                report["reason"] = f"inny wynik na pełnych danych: {difference}"
+        if report.get("reason"):
+            print(f"  [OPTYMALIZACJA] Odrzucono: {report['reason']}")
+            return {"optimization_report": report}
+    except Exception as e:
+        report["reason"] = f"{type(e).__name__}: {e}"
+        print(f"  [OPTYMALIZACJA] Optymalizacja nie powiodła się: {report['reason']}")
+        return {"optimization_report": report}
+
+    report["accepted"] = True
+    print(f"  [OPTYMALIZACJA] Przyjęto przepisany kod: ten sam wynik na pełnych danych w {report['full_runtime_s']} s "
+          f"(wcześniej {runtime_s:.1f} s).")
+    # W pamięci wykonań ląduje wynik wyprodukowany przez sam przepisany kod
+    execution_cache = state.get('execution_cache')
+    if execution_cache is not None and os.path.isfile(input_path):
+        cache_key = _execution_cache_key(state, candidate, output_name=os.path.basename(state['output_path']))
+        execution_cache.put(cache_key, {"node": "performance_optimizer", "exec_s": result['exec_s']}, artifact_path=full_output_path)
+    if os.path.isdir(full_output_path):
+        shutil.rmtree(full_output_path)
+    else:
+        os.remove(full_output_path)
+    return {"generated_code": candidate, "optimization_report": report}
+
+
 def summary_analyst_node(state: AgentWorkflowState) -> Dict[str, str]:
     """
     Agent, którego jedynym zadaniem jest analiza i stworzenie podsumowania tekstowego w HTML.
     """
     print("--- WĘZEŁ: ANALITYK PODSUMOWANIA ---")
     try:
-        # Krok 1: Przygotuj dane wejściowe dla promptu
-        df_original = pd.read_csv(state['input_path'])
-        df_processed = pd.read_csv(state['output_path'])
-
-        original_info_buf = io.StringIO()
-        df_original.info(buf=original_info_buf)
-        processed_info_buf = io.StringIO()
-        df_processed.info(buf=processed_info_buf)
-
-        original_summary = f"Podsumowanie danych ORYGINALNYCH:\n{df_original.describe().to_string()}\n{original_info_buf.getvalue()}"
-        processed_summary = f"Podsumowanie danych PRZETWORZONYCH:\n{df_processed.describe().to_string()}\n{processed_info_buf.getvalue()}"
+        # Krok 1: Przygotuj dane wejściowe dla promptu.
+        # Profile pochodzą z magazynu profili; brakujące liczy strumieniowy profiler (pamięć nie zależy od rozmiaru danych).
+        dataset_cache = state['dataset_cache']
+        original_profile = state.get('input_profile') or dataset_cache.dataset_profile(state['input_path'], chunksize=PROFILER_CHUNK_SIZE, max_workers=PROFILER_MAX_WORKERS)
+        processed_profile = dataset_cache.dataset_profile(state['output_path'], chunksize=PROFILER_CHUNK_SIZE, max_workers=PROFILER_MAX_WORKERS)
 
         # === POPRAWKA: Użycie dedykowanego promptu ===
         prompt = PromptFactory.for_summary_analyst(
         plan=state['plan'],
-        original_summary=original_summary,
-        processed_summary=processed_summary
+        original_profile=original_profile,
+        processed_profile=processed_profile
         )
         
         llm = ChatAnthropic(model_name=state['config']['CODE_MODEL'], temperature=0.0, max_tokens=1024)
@@ -307,7 +1033,7 @@ def summary_analyst_node(state: AgentWorkflowState) -> Dict[str, str]:
         response = structured_llm.invoke(prompt)
         
         print("  [INFO] Analityk wygenerował podsumowanie HTML.")
-        return {"summary_html": response.summary_html}
+        return succeeded({"summary_html": response.summary_html})
         
     except Exception as e:
         error_msg = f"Błąd w analityku podsumowania: {traceback.format_exc()}"
@@ -326,13 +1052,16 @@ def plot_generator_node(state: AgentWorkflowState) -> Dict[str, str]:
     """
     print("--- WĘZEŁ: GENERATOR WIZUALIZACJI ---")
     try:
-        # --- NOWY KROK: POBIERZ AKTUALNE KOLUMNY Z PRZETWORZONEGO PLIKU ---
-        df_processed_cols = pd.read_csv(state['output_path'], nrows=0).columns.tolist()
+        # --- NOWY KROK: POBIERZ AKTUALNE KOLUMNY I ICH PROFIL Z PRZETWORZONEGO PLIKU ---
+        # Profil został już policzony przez analityka podsumowania, więc tu trafia z pamięci podręcznej
+        processed_profile = state['dataset_cache'].dataset_profile(state['output_path'], chunksize=PROFILER_CHUNK_SIZE, max_workers=PROFILER_MAX_WORKERS)
+        df_processed_cols = list(processed_profile["columns"])
 
         # Przekaż aktualne kolumny do promptu, aby agent wiedział, na czym pracuje
         prompt = PromptFactory.for_plot_generator(
         plan=state['plan'],
-        available_columns=df_processed_cols
+        available_columns=df_processed_cols,
+        column_profile=processed_profile
         )
         
         MAIN_AGENT = state['config']['MAIN_AGENT']
@@ -343,7 +1072,7 @@ def plot_generator_node(state: AgentWorkflowState) -> Dict[str, str]:
         cleaned_code = extract_python_code(response.code)
         
         print("  [INFO] Generator stworzył kod do wizualizacji.")
-        return {"plot_generation_code": cleaned_code,"active_code_key": "plot_generation_code"}
+        return succeeded({"plot_generation_code": cleaned_code,"active_code_key": "plot_generation_code"})
         
 
     except Exception as e:
@@ -369,24 +1098,73 @@ def report_composer_node(state: AgentWorkflowState) -> Dict[str, Any]:
         if not summary_html or not plot_code:
             raise ValueError("Brak podsumowania lub kodu do generowania wykresów w stanie.")
 
-        # 1. Przygotuj środowisko wykonawcze dla kodu z wykresami
-        exec_scope = {
-            'pd': pd,
-            'plt': plt,
-            'df_original': pd.read_csv(state['input_path']),
-            'df_processed': pd.read_csv(state['output_path']),
-            'figures_to_embed': []
+        dataset_cache = state['dataset_cache']
+
+        # Kod wykresów przechodzi tę samą analizę statyczną co kod przetwarzania (kolumny: wejście + wynik)
+        known_columns = list(state.get('available_columns') or []) + dataset_cache.get_columns(state['output_path'])
+        code_update = _static_analysis(state, "plot_generation_code", "plot", "report_composer_node", known_columns)
+        if code_update.get("error_message"):
+            return code_update
+        plot_code = code_update.get("plot_generation_code", plot_code)
+
+        # 1. Przygotuj środowisko wykonawcze dla kodu z wykresami (ramki wczytuje proces-piaskownica,
+        #    tylko z kolumnami, do których odwołuje się kod wykresów)
+        frames = {
+            'df_original': {'path': dataset_cache.local_path(state['input_path'])},
+            'df_processed': {'path': state['output_path']},
         }
+        if COLUMN_PROJECTION:
+            frame_columns = {'df_original': state.get('available_columns'),
+                             'df_processed': dataset_cache.get_columns(state['output_path'])}
+            for name, columns in frame_columns.items():
+                frames[name]['columns'] = frame_projection(plot_code, name, columns)
+                if frames[name]['columns'] is not None:
+                    print(f"  [PROJEKCJA] {name}: {len(frames[name]['columns'])} z {len(columns)} kolumn: {frames[name]['columns']}")
+
+        # Wykresy zależą od kodu, danych wejściowych i wyniku przetwarzania (jego sygnaturą jest klucz wykonania)
+        execution_cache = state.get('execution_cache')
+        cache_key, cached = None, None
+        if execution_cache is not None and state.get('processed_data_signature') and os.path.isfile(frames['df_original']['path']):
+            cache_key = _execution_cache_key(state, plot_code, [state['processed_data_signature']], node="report_composer")
+            cached = execution_cache.get(cache_key)
 
-        # 2. Wykonaj kod od agenta, aby wygenerować obiekty figur
-        exec(plot_code, exec_scope)
-        figures = exec_scope['figures_to_embed']
-        print(f"  [INFO] Wykonano kod i wygenerowano {len(figures)} wykres(y).")
+        execution_stats = state.get("execution_stats") or []
+        if cached is not None:
+            figures = cached['figures_html']
+            print(f"  [CACHE] {len(figures)} wykres(y) odtworzone z pamięci wykonań - pomijam wykonanie kodu.")
+        else:
+            # 2. Wykonaj kod od agenta w piaskownicy; figury wracają już jako tagi <img> z base64
+            result = state['sandbox_pool'].run(
+                plot_code,
+                variables={'figures_to_embed': []},
+                frames=frames,
+                render_figures=True,
+                imports={'pd': 'pandas', 'plt': 'matplotlib.pyplot'}
+            )
+            if result['stdout']:
+                print(result['stdout'])
+            execution_stats = _with_execution_stats(execution_stats, "report_composer_node", result)
+            if not result['ok']:
+                error_msg = f"Błąd w kompozytorze raportu: {result['traceback']}"
+                print(f"  [BŁĄD] {error_msg}")
+                return {
+                    "error_message": error_msg,
+                    "failing_node": "report_composer_node",
+                    "error_context_code": plot_code,
+                    "active_code_key": "plot_generation_code",
+                    "correction_attempts": state.get("correction_attempts", 0) + 1,
+                    "execution_stats": execution_stats,
+                    **code_update
+                }
+            figures = result['outputs']['figures_html']
+            print(f"  [INFO] Wykonano kod i wygenerowano {len(figures)} wykres(y) w {result['exec_s']:.2f} s.")
+            if cache_key is not None:
+                execution_cache.put(cache_key, {"node": "report_composer", "figures_html": figures})
 
-        # 3. Skonwertuj figury na tagi <img> z base64
+        # 3. Złóż tagi <img> z nagłówkami
         figures_html = ""
-        for i, fig in enumerate(figures):
-            figures_html += f"<h3>Wykres {i+1}</h3>{embed_plot_to_html(fig)}"
+        for i, figure_html in enumerate(figures):
+            figures_html += f"<h3>Wykres {i+1}</h3>{figure_html}"
 
         # 4. Złóż finalny raport HTML
         final_html = f"""
@@ -418,7 +1196,12 @@ def report_composer_node(state: AgentWorkflowState) -> Dict[str, Any]:
             f.write(final_html)
             
         print(f"✅ Raport został pomyślnie wygenerowany w {state['report_output_path']}")
-        return {}
+
+        # 6. Opcjonalny, końcowy eksport danych przetworzonych do CSV
+        if state.get('processed_csv_path'):
+            export_csv(state['output_path'], state['processed_csv_path'])
+            print(f"  [INFO] Wyeksportowano dane przetworzone do CSV: {state['processed_csv_path']}")
+        return succeeded({"execution_stats": execution_stats, **code_update})
 
     except Exception as e:
         error_msg = f"Błąd w kompozytorze raportu: {traceback.format_exc()}"
@@ -0,0 +1,77 @@
+from typing import Any, Callable, Dict, Optional
+from .state import AgentWorkflowState
+
+
+# =================================================================================
+# Routing grafu LangGraph. Wszystkie krawędzie warunkowe przechodzą przez jeden router:
+# błąd -> debugger (albo eskalacja po wyczerpaniu prób), decyzja debuggera -> narzędzie,
+# zakończona naprawa -> powrót do węzła, w którym wystąpił błąd (`failing_node`),
+# w pozostałych przypadkach -> "continue". Węzeł, który zakończył się sukcesem, kasuje
+# `failing_node` (`succeeded()`), inaczej router po udanej naprawie wracałby do niego w kółko.
+# =================================================================================
+
+# Domyślna mapa krawędzi warunkowych ("continue" podmieniany przy każdym węźle na jego następnika)
+CONDITIONAL_ROUTING_MAP = {
+    "continue": "data_code_executor",
+    "universal_debugger": "universal_debugger",
+    "human_escalation": "human_escalation",
+}
+# Wartości `failing_node` ustawiane przez węzły -> węzeł grafu, do którego wraca się po poprawce
+REPAIR_TARGETS = {
+    "schema_reader": "schema_reader",
+    "code_generator": "code_generator",
+    "static_analyzer": "static_analyzer",
+    "architectural_validator": "architectural_validator",
+    "data_code_executor": "data_code_executor",
+    "summary_analyst_node": "summary_analyst",
+    "plot_generator_node": "plot_generator",
+    "report_composer_node": "report_composer",
+}
+# Krawędzie po krokach naprawczych (apply_code_fix, package_installer)
+REPAIR_ROUTING_MAP = {**CONDITIONAL_ROUTING_MAP, **REPAIR_TARGETS}
+
+
+def succeeded(update: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Aktualizacja stanu po udanym kroku: bez błędu i bez śladu naprawy, więc router kontynuuje główną ścieżkę."""
+    return {**(update or {}), "error_message": None, "failing_node": None, "error_context_code": None}
+
+
+def make_master_router(max_correction_attempts: int) -> Callable[[AgentWorkflowState], str]:
+    """Centralny router grafu z limitem prób naprawy `max_correction_attempts`."""
+
+    def master_router(state: AgentWorkflowState) -> str:
+        """
+        Centralny router, który zarządza całym przepływem grafu.
+        Zastępuje wszystkie poprzednie, rozproszone funkcje routingu.
+        """
+        print(f"DEBUG ROUTER: Stan wejściowy: error='{state.get('error_message') is not None}', tool='{state.get('tool_choice')}', failing='{state.get('failing_node')}'")
+
+        # Scenariusz 1: Wystąpił błąd
+        if state.get("error_message"):
+            if state.get("correction_attempts", 0) >= max_correction_attempts:
+                print("ROUTER: Przekroczono limit prób. Eskalacja do człowieka.")
+                return "human_escalation"
+            print("ROUTER: Wykryto błąd. Przechodzenie do debuggera.")
+            return "universal_debugger"
+
+        # Scenariusz 2: Debugger wybrał narzędzie
+        if tool_choice := state.get("tool_choice"):
+            print(f"ROUTER: Debugger wybrał narzędzie '{tool_choice}'.")
+            if tool_choice == "propose_code_fix":
+                return "apply_code_fix"
+            if tool_choice == "request_package_installation":
+                return "human_approval"
+            return "human_escalation"  # Domyślna akcja dla nieznanego narzędzia
+
+        # Scenariusz 3: Trwa proces naprawczy (failing_node jest ustawiony, ale error_message jest już czysty).
+        # Router nie zmienia stanu - failing_node kasuje węzeł, który po powrocie zakończy się sukcesem.
+        if failing_node := state.get("failing_node"):
+            print(f"ROUTER: Zakończono próbę naprawy. Powrót do węzła '{failing_node}'.")
+            return failing_node
+
+        # Jeśli żaden z powyższych warunków nie jest spełniony, oznacza to, że graf ma kontynuować "szczęśliwą ścieżkę".
+        # W tym wypadku zwracamy specjalny sygnał, a decyzję podejmie sama krawędź.
+        print("ROUTER: Brak błędów i akcji naprawczych. Kontynuacja głównej ścieżki.")
+        return "continue"
+
+    return master_router
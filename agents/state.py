@@ -1,5 +1,10 @@
 from typing import TypedDict, List, Callable, Dict, Optional, Union, Any
 from memory.memory_bank_client import MemoryBankClient
+from tools.dataset_cache import DatasetCache
+from tools.sandbox import SandboxPool
+from tools.execution_cache import ExecutionCache
+from tools.error_router import ErrorRouter
+from tools.fix_cache import FixCache
 
 #Zmienne przekazywane do grafu LangChian
 class AgentWorkflowState(TypedDict):
@@ -16,11 +21,28 @@ class AgentWorkflowState(TypedDict):
     # --- Pola pamięci ---
     run_id: str
     dataset_signature: str
+    dataset_fingerprint: Optional[Dict[str, Any]] # Odcisk zbioru (schemat, próbki, dokładny hash treści)
+    input_profile: Optional[Dict[str, Any]] # Profil kolumn danych wejściowych (z trwałego magazynu profili)
     error_record_id: Optional[str]
     memory_client: MemoryBankClient
     pending_fix_session: Optional[Dict[str, Any]]
+    correction_loop_stats: Optional[Dict[str, int]] # Wykryte pętle naprawcze, zmiany strategii i wczesne eskalacje
     generated_code: str # Dla głównego kodu
     summary_html: str # Wynik z summary_analyst
     plot_generation_code: str # Wynik z plot_generator
     escalation_report_path: Optional[str]
-    active_code_key: Optional[str]
\ No newline at end of file
+    active_code_key: Optional[str]
+    dataset_cache: DatasetCache # Współdzielona pamięć podręczna zbiorów danych dla całego uruchomienia
+    sandbox_pool: SandboxPool # Pula procesów-piaskownic wykonujących kod generowany przez LLM
+    execution_stats: List[Dict[str, Any]] # Zużycie zasobów kolejnych wykonań w piaskownicy (czas, CPU, szczytowe RSS)
+    execution_cache: Optional[ExecutionCache] # Pamięć wyników wykonań adresowana treścią (kod + dane + wersje bibliotek)
+    processed_data_signature: Optional[str] # Klucz wykonania, które wytworzyło dane przetworzone (sygnatura wyniku)
+    error_router: Optional[ErrorRouter] # Szybka ścieżka dla znanych klas błędów (bez wywołania LLM w debuggerze)
+    execution_runtime_s: Optional[float] # Czas pełnego przebiegu kodu przetwarzającego (None - wynik z pamięci wykonań)
+    profile_hotspots: Optional[List[Dict[str, Any]]] # Najkosztowniejsze linie kodu z profilu: linia, czas własny i skumulowany, przyrost pamięci
+    optimization_report: Optional[Dict[str, Any]] # Wynik węzła optymalizatora: przyjęty/odrzucony, przyspieszenie, powód
+    performance_blocked: Optional[List[str]] # Reguły wydajności, które już raz zablokowały kod (kolejne naruszenie - tylko ostrzeżenie)
+    codegen_stats: Optional[List[Dict[str, Any]]] # Kandydaci kodu z ostatniego generowania: model, temperatura, czasy, wynik
+    execution_backend: Optional[str] # Silnik kodu przetwarzającego: "pandas" albo "duckdb" (dane większe niż pamięć)
+    fix_cache: Optional[FixCache] # Trwały indeks poprawek: odcisk błędu + fragment kodu -> łatka, która go usunęła
+    processed_csv_path: Optional[str] # Opcjonalny, końcowy eksport danych przetworzonych do CSV
\ No newline at end of file
@@ -40,10 +40,104 @@ LANGCHAIN_API_KEY = get_secret(PROJECT_ID,"LANGCHAIN_API_KEY")
 ANTHROPIC_API_KEY=get_secret(PROJECT_ID,"ANTHROPIC_API_KEY")
 
 MEMORY_ENGINE_DISPLAY_NAME="memory-gamma-way"
+MEMORY_SCOPE_GRANULARITY="content" # granulacja sygnatury zbioru w pamięci: "content", "sampled" lub "schema"
 
 INPUT_FILE_PATH = "gs://super_model/data/structural_data/synthetic_fraud_dataset.csv"
 
 MAX_CORRECTION_ATTEMPTS=5
+LOOP_MAX_REPEATS=2 # powtórzenie tego samego błędu: 1. raz - zmiana strategii/modelu, przy tylu powtórzeniach - eskalacja
+
+#---profilowanie danych------
+PROFILER_CHUNK_SIZE=100_000 # liczba wierszy w jednym kawałku czytanym przez profiler
+PROFILER_MAX_WORKERS=None # None = liczba rdzeni; 1 = profilowanie sekwencyjne
+PROFILE_STORE_PATH=".cache/profiles.sqlite" # trwały magazyn profili kolumn (klucz: odcisk zbioru)
+
+#---podgląd danych dla planowania------
+PREVIEW_SAMPLE_ROWS=20 # liczba wierszy reprezentatywnej próbki
+PREVIEW_TOKEN_BUDGET=2000 # maksymalny rozmiar podglądu w tokenach
+PREVIEW_STRATIFY_COLUMN=None # kolumna warstwowania próbki; None = wykrycie po nazwie (np. etykieta fraudu)
+
+#---artefakty pośrednie------
+INTERMEDIATE_FORMAT="parquet" # format przekazania danych przetworzonych: "parquet", "arrow" lub "csv"
+PROCESSED_OUTPUT_PATH=f"reports/processed_data.{INTERMEDIATE_FORMAT}"
+PROCESSED_CSV_EXPORT_PATH="reports/processed_data.csv" # None = bez końcowego eksportu do CSV
+
+#---piaskownice wykonujące wygenerowany kod------
+SANDBOX_POOL_SIZE=2 # liczba wstępnie rozgrzanych procesów
+SANDBOX_MAX_JOBS_PER_WORKER=20 # proces jest wymieniany po tylu zadaniach
+SANDBOX_MAX_RSS_BYTES=4 * 1024**3 # ... albo gdy jego pamięć (RSS) przekroczy ten próg
+SANDBOX_WALL_TIME_LIMIT_S=900 # limit czasu zegarowego jednego wykonania (TimeoutError)
+SANDBOX_CPU_TIME_LIMIT_S=1800 # limit czasu procesora jednego wykonania (CpuTimeLimitExceeded)
+SANDBOX_MEMORY_LIMIT_BYTES=8 * 1024**3 # limit pamięci jednego wykonania (MemoryLimitExceeded)
+
+#---próbne uruchomienie na próbce danych------
+SAMPLE_DRY_RUN=True # najpierw uruchamiaj kod na próbce, a dopiero potem na pełnych danych
+SAMPLE_DRY_RUN_ROWS=10_000 # rozmiar reprezentatywnej próbki
+SAMPLE_DRY_RUN_MIN_BYTES=64 * 1024**2 # mniejsze pliki są uruchamiane od razu w całości
+SAMPLE_DRY_RUN_WALL_TIME_S=120 # limit czasu próby na próbce
+SAMPLE_DIR=".cache/samples" # trwałe próbki (klucz: odcisk treści) i wyniki prób
+
+#---tryb wykonania kodu przetwarzającego------
+EXECUTION_MODE="auto" # "single" = zawsze jeden proces; "chunked" = tryb kawałkowy, gdy kod go wspiera; "auto" = kawałkowy dla dużych plików
+CHUNKED_MIN_BYTES=512 * 1024**2 # w trybie "auto" mniejsze pliki są przetwarzane w jednym procesie
+CHUNKED_MAX_WORKERS=None # None = liczba rdzeni
+CHUNKED_ROWS_PER_CHUNK=250_000 # liczba wierszy w jednym kawałku przekazywanym do transform_chunk
+STEP_EXECUTION=True # kod z listą `STEPS` jest wykonywany krok po kroku (DAG), z wynikami kroków w pamięci wykonań
+STEP_WORK_DIR=".cache/steps" # robocze pliki Parquet kroków (podkatalog na uruchomienie)
+STEP_MAX_WORKERS=None # równoległość kroków niezależnych; None = liczba rdzeni
+
+#---równoległe generowanie kandydatów kodu------
+CODEGEN_CANDIDATES=1 # liczba wersji kodu generowanych i sprawdzanych równolegle; 1 = pojedyncze wywołanie modelu
+CODEGEN_TEMPERATURES=[0.0, 0.3, 0.7] # temperatury przydzielane kolejnym kandydatom
+CODEGEN_MODELS=None # None = CODE_MODEL; lista modeli (Claude lub Vertex AI) jest przydzielana kandydatom po kolei
+CODEGEN_STATS_PATH=".cache/codegen_stats.jsonl" # czasy i wyniki kandydatów ze wszystkich uruchomień
+
+#---silnik wykonania kodu przetwarzającego------
+EXECUTION_BACKEND="auto" # "pandas"; "duckdb" = przetwarzanie poza pamięcią ze zrzutem na dysk; "auto" = duckdb dla dużych plików
+DUCKDB_MIN_BYTES=SANDBOX_MEMORY_LIMIT_BYTES // 4 # w trybie "auto": pandas potrzebuje kilkukrotności rozmiaru pliku w pamięci
+DUCKDB_MEMORY_LIMIT_BYTES=SANDBOX_MEMORY_LIMIT_BYTES // 2 # powyżej tego progu DuckDB zrzuca dane pośrednie na dysk
+DUCKDB_TEMP_DIR=".cache/duckdb_spill" # katalog zrzutu (powinien być na szybkim dysku lokalnym)
+DUCKDB_THREADS=None # None = liczba rdzeni
+
+#---spekulacyjna naprawa kodu------
+SPECULATIVE_FIX_CANDIDATES=1 # liczba poprawek generowanych i sprawdzanych równolegle; 1 = szeregowa pętla naprawcza
+SPECULATIVE_FIX_TEMPERATURES=[0.0, 0.4, 0.8] # temperatury przydzielane kolejnym kandydatom
+SPECULATIVE_FIX_MODELS=None # None = MAIN_AGENT; lista modeli jest przydzielana kandydatom po kolei
+
+#---optymalizacja typów danych w zakresie wykonania------
+DTYPE_OPTIMIZATION=True # `read_optimized(path)` i (na żądanie) ramka `input_df` w zakresie wygenerowanego kodu
+DTYPE_MIN_INT_BITS=32 # najwęższy typ całkowity po zawężeniu (węższe typy łatwo przepełnić w arytmetyce)
+DTYPE_CATEGORICAL_MAX_RATIO=0.5 # tekst -> category, gdy liczba unikalnych wartości <= ułamek liczby wierszy
+
+#---reguły wydajności kodu pandas (wzorce wierszowe)------
+PERFORMANCE_RULES_MODE="warn" # "block" = debugger przepisuje kod przed wykonaniem; "warn" = tylko ostrzeżenie; "off"
+PERFORMANCE_RULE_MODES={} # tryb dla pojedynczych reguł, np. {"PERF_ITERROWS": "warn"}
+
+#---profilowanie wykonania i automatyczna optymalizacja kodu------
+PROFILING_RATE=0.05 # odsetek pełnych przebiegów wykonywanych pod profilerem próbkującym linie kodu; 0 = wyłączone
+PROFILING_INTERVAL_S=0.01 # odstęp między próbkami stosu (narzut rośnie przy krótszym odstępie)
+PROFILING_TOP_N=10 # liczba najkosztowniejszych linii zapisywanych w stanie
+RUNTIME_BUDGET_S=300 # pełny przebieg dłuższy niż budżet uruchamia węzeł optymalizatora
+OPTIMIZER_SAMPLE_ROWS=100_000 # próbka do porównania wyniku i czasu wersji oryginalnej i przepisanej
+OPTIMIZER_TIMING_RUNS=2 # liczba pomiarów czasu każdej wersji (liczy się najlepszy)
+OPTIMIZER_MIN_SPEEDUP=1.2 # przepisany kod musi być co najmniej tyle razy szybszy na próbce
+
+#---projekcja kolumn------
+COLUMN_PROJECTION=True # odczyty wejścia i ramki wykresów wczytują tylko kolumny, do których odwołuje się kod (analiza AST)
+
+#---indeks sprawdzonych poprawek (między uruchomieniami)------
+FIX_CACHE_PATH=".cache/fixes.sqlite" # klucz: odcisk błędu + hash fragmentu kodu wokół wadliwej linii
+FIX_CACHE_REGION_LINES=3 # liczba linii kontekstu po obu stronach wadliwej linii w kluczu
+FIX_CACHE_MIN_CONFIDENCE=0.8 # minimalny odsetek udanych użyć wpisu, aby poprawka była stosowana bez LLM
+
+#---pamięć wyników wykonań wygenerowanego kodu------
+EXECUTION_CACHE_DIR=".cache/executions" # klucz: znormalizowany kod + odciski danych + wersje bibliotek
+EXECUTION_CACHE_MAX_BYTES=50 * 1024**3 # limit LRU (artefakty są dowiązaniami twardymi, gdy to możliwe)
+
+#---lokalna pamięć podręczna obiektów gs://------
+OBJECT_CACHE_DIR=".cache/objects"
+OBJECT_CACHE_MAX_BYTES=20 * 1024**3 # limit LRU
+STORAGE_EMULATOR_ROOT=os.environ.get("STORAGE_EMULATOR_ROOT") # katalog lokalny zastępujący bucket (testy/offline)
 
 
 
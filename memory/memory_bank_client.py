@@ -1,10 +1,9 @@
 import json
-import hashlib
-import pandas as pd
 from typing import Dict, List, Optional
 import vertexai
 from vertexai import agent_engines
 from .memory_models import MemoryRecord
+from tools.fingerprint import DatasetFingerprint
 
 
 class MemoryBankClient:
@@ -24,10 +23,12 @@ class MemoryBankClient:
     
     
     
-    def create_dataset_signature(self, df_preview: pd.DataFrame) -> str:
-        """Tworzy unikalny identyfikator dla zbioru danych."""
-        s = "".join(df_preview.columns) + str(df_preview.shape)
-        return hashlib.md5(s.encode()).hexdigest()
+    def create_dataset_signature(self, fingerprint: DatasetFingerprint, granularity: str = "content") -> str:
+        """
+        Tworzy identyfikator zbioru danych na podstawie odcisku treści.
+        `granularity`: 'content' (dokładna treść), 'sampled' (próbkowane bloki) lub 'schema' (tylko schemat).
+        """
+        return fingerprint.signature(granularity)
 
     def add_memory(self, record: MemoryRecord):
         """Zapisuje ustrukturyzowane wspomnienie w Agent Engine."""
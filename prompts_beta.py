@@ -1,5 +1,8 @@
 from pydantic import BaseModel, Field
 from typing import TypedDict, List, Callable, Dict, Optional, Union, Any
+from functools import partial
+from tools.column_profiler import format_profile, format_column_brief
+from tools.code_rules import DEFAULT_RULES, PERFORMANCE_RULES, RULE_SETS, rule_violated
 
 # =================================================================================
 # sekcja 1: DYREKTYWY SYSTEMOWE (PERSONY NADRZĘDNE)
@@ -124,22 +127,88 @@ PLAN_AKCEPTOWANY_PRZEJSCIE_DO_IMPLEMENTACJI
 # --- Prompty dla agentów LangGraph (Faza Wykonania) ---
 
     @staticmethod
-    def for_code_generator(plan: str, available_columns: List[str]) -> str:
-        """Prompt dla agenta generującego główny skrypt przetwarzający."""
+    def for_code_generator(plan: str, available_columns: List[str], output_format: str = "csv",
+                           column_profile: Optional[Dict[str, Any]] = None, chunked_contract: bool = False,
+                           dtype_layer: bool = False, step_contract: bool = False, backend: str = "pandas",
+                           dtype_changes: Optional[Dict[str, str]] = None) -> str:
+        """
+        Prompt dla agenta generującego główny skrypt przetwarzający (`backend`: 'pandas' albo 'duckdb').
+        `dtype_changes` to zmiany typów kolumn wprowadzane przez `read_optimized` ({kolumna: "int64 -> int32"}).
+        """
         context = {
             "business_plan": plan,
             "available_data_columns": ", ".join(available_columns),
-            "architectural_rules": ArchitecturalRulesManager.get_rules_as_string()
+            "architectural_rules": ArchitecturalRulesManager.get_rules_as_string(backend)
         }
+        if column_profile:
+            context["column_profile"] = format_column_brief(column_profile)
+        output_writers = {
+            "parquet": "`df.to_parquet(output_path, index=False)`",
+            "arrow": "`df.reset_index(drop=True).to_feather(output_path)`",
+            "csv": "`df.to_csv(output_path, index=False)`",
+        }
+        rules = [
+            f"Wynikową ramkę zapisz pod ścieżką `output_path` w formacie '{output_format}', używając {output_writers.get(output_format, output_writers['csv'])}."
+        ]
+        if backend == "duckdb":
+            # Zbiór większy niż pamięć: cała transformacja w DuckDB, wynik zapisywany strumieniowo
+            rules = [
+                "Dane są większe niż pamięć operacyjna - przetwarzaj je w DuckDB (SQL albo API relacyjne), NIE w pandas. "
+                "W zakresie dostępne są: `con` (połączenie DuckDB z limitem pamięci i zrzutem na dysk), `duckdb` oraz "
+                "`read_input(path)` zwracająca relację nad plikiem wejściowym (bez wczytywania go do pamięci).",
+                "Relację możesz przekształcać metodami (`filter`, `project`, `aggregate`, `order`) albo w SQL: `con.sql(\"SELECT ... FROM rel\")`, "
+                "gdzie `rel` to zmienna Pythona z relacją.",
+                f"Wynik zapisz wywołaniem `write_result(relacja_lub_sql, output_path)` - format ('{output_format}') wynika ze ścieżki.",
+            ]
+            config = PromptConfig(
+                persona="Jesteś wykonawcą zadania w ramach dyrektywy 'Nexus'.",
+                task="Na podstawie planu biznesowego i dostępnych danych, napisz kompletny i zgodny z architekturą skrypt w Pythonie, który przetwarza dane w DuckDB.",
+                rules=rules,
+                output_format="Twoja odpowiedź musi zawierać **TYLKO i WYŁĄCZNIE** surowy kod Pythona. Nie umieszczaj go w blokach markdown (` ```python`)."
+            )
+            return PromptFactory._build_prompt(SYSTEM_PROMPT_ENGINEER, config, context)
+        if dtype_layer:
+            rule = (
+                "Do wczytywania danych używaj `read_optimized(path, **kwargs)` (dostępna w zakresie, przyjmuje argumenty `pd.read_csv`, np. `usecols`) "
+                "zamiast `pd.read_csv` - zwraca ramkę z oszczędnymi typami: zawężone liczby całkowite, `float32` tam, gdzie to bezstratne, "
+                "`category` dla tekstów o małej kardynalności i nullable `boolean` przy brakach; daty pozostają tekstem (parsuj je sam). "
+                "Możesz też użyć gotowej ramki `input_df` (dane z `input_path`). "
+                "Pamiętaj o tych typach: przed wstawieniem nowej wartości do kolumny `category` (np. w `fillna`) zrzutuj ją na `str`."
+            )
+            if dtype_changes:
+                changes = "; ".join(f"`{column}`: {change}" for column, change in dtype_changes.items())
+                rule += f" Zmiany typów kolumn wejściowych (ustalone na próbce danych): {changes}."
+            rules.append(rule)
+        if step_contract:
+            rules.append(
+                "Podziel logikę na funkcje kroków - po jednej na każdy numerowany krok planu: `def step_<n>_<nazwa>(df: pd.DataFrame) -> pd.DataFrame`. "
+                "Na najwyższym poziomie zdefiniuj literał `STEPS` - listę kroków w kolejności planu: "
+                "`{\"name\": \"step_1_...\", \"depends_on\": [...], \"reads\": [kolumny czytane], \"writes\": [kolumny tworzone lub zmieniane]}`. "
+                "Brak `depends_on` oznacza zależność od poprzedniego kroku. Kroki niezależne mogą zależeć od tego samego kroku, ale wtedy "
+                "nie mogą zmieniać liczby wierszy i muszą zapisywać rozłączne kolumny. `process_data` ma wczytać dane samą ścieżką, bez dodatkowych "
+                "argumentów odczytu (parsowanie dat czy rzutowanie typów umieść w pierwszym kroku), wywołać kroki w kolejności `STEPS` "
+                "i zapisać wynik - system może też wykonywać kroki osobno i ponownie używać wyników kroków, które się nie zmieniły."
+            )
+        if chunked_contract:
+            rules.append(
+                "Jeśli WSZYSTKIE transformacje są lokalne dla wiersza (wynik wiersza zależy tylko od tego wiersza i statystyk globalnych, "
+                "bez sortowania, grupowania, deduplikacji ani łączenia wierszy), zdefiniuj dodatkowo na najwyższym poziomie: "
+                "`fit_params(input_path: str) -> dict` (liczy statystyki globalne, np. mediany do imputacji czy granice IQR, czytając tylko potrzebne kolumny) "
+                "oraz `transform_chunk(chunk: pd.DataFrame, params: dict) -> pd.DataFrame` (przetwarza fragment danych, używając wyłącznie `params`). "
+                "`process_data` ma wtedy jedynie wywołać `fit_params`, wczytać dane, zastosować `transform_chunk` i zapisać wynik - system może uruchomić "
+                "`transform_chunk` równolegle na fragmentach pliku. Jeśli transformacje nie są lokalne, NIE definiuj tych funkcji."
+            )
         config = PromptConfig(
             persona="Jesteś wykonawcą zadania w ramach dyrektywy 'Nexus'.",
             task="Na podstawie planu biznesowego i dostępnych danych, napisz kompletny, samowystarczalny i zgodny z architekturą skrypt w Pythonie do przetwarzania danych. [cite: 77]",
+            rules=rules,
             output_format="Twoja odpowiedź musi zawierać **TYLKO i WYŁĄCZNIE** surowy kod Pythona. Nie umieszczaj go w blokach markdown (` ```python`)."
         )
         return PromptFactory._build_prompt(SYSTEM_PROMPT_ENGINEER, config, context)
 
     @staticmethod
-    def for_universal_debugger(failing_node: str, error_message: str, code_context: str, active_policies: Optional[str] = None) -> str:
+    def for_universal_debugger(failing_node: str, error_message: str, code_context: str, active_policies: Optional[str] = None,
+                               resource_usage: Optional[Dict[str, Any]] = None) -> str:
         """Prompt dla agenta-debuggera."""
         context = {
             "failing_node": failing_node,
@@ -147,6 +216,8 @@ PLAN_AKCEPTOWANY_PRZEJSCIE_DO_IMPLEMENTACJI
             "faulty_code": code_context,
             "active_system_policies": active_policies or "Brak"
         }
+        if resource_usage:
+            context["resource_usage"] = resource_usage
         config = PromptConfig(
             persona="Jesteś 'Głównym Inżynierem Jakości Kodu' działającym w ramach dyrektywy 'Nexus'. [cite: 78]",
             task="Twoim zadaniem jest zdiagnozowanie przyczyny błędu i wybranie **jednego, najlepszego narzędzia** do jego naprawy. Twoja analiza musi być precyzyjna, a proponowane rozwiązanie kompletne i ostateczne.",
@@ -154,6 +225,7 @@ PLAN_AKCEPTOWANY_PRZEJSCIE_DO_IMPLEMENTACJI
                 "Przeanalizuj `failing_node`, aby zrozumieć kontekst błędu (główny skrypt, generator wykresów, etc.). [cite: 80, 81, 82, 83]",
                 "Jeśli błąd to `ModuleNotFoundError` lub `ImportError`, użyj narzędzia `request_package_installation`. [cite: 87]",
                 "Dla wszystkich innych błędów w kodzie (np. `SyntaxError`, `KeyError`, `AttributeError`), użyj narzędzia `propose_code_fix`. [cite: 88]",
+                "Błędy `TimeoutError`, `MemoryLimitExceeded` i `CpuTimeLimitExceeded` oznaczają przekroczenie limitów zasobów, a nie błąd logiki. Zaproponuj poprawkę WYDAJNOŚCIOWĄ zachowującą wynik: operacje wektorowe zamiast `apply`/pętli po wierszach, wczytywanie tylko potrzebnych kolumn, mniejsze typy danych (`category`, `float32`), unikanie kopii ramek. Uwzględnij `resource_usage`.",
                 "Jeśli podejrzewasz, że błąd leży w wewnętrznym narzędziu systemowym, użyj `inspect_tool_code`, aby zbadać jego kod źródłowy przed podjęciem finalnej decyzji. [cite: 86]",
                 "`active_system_policies` to dyrektywy o najwyższym priorytecie. Zastosuj się do nich bezwzględnie."
             ],
@@ -162,12 +234,61 @@ PLAN_AKCEPTOWANY_PRZEJSCIE_DO_IMPLEMENTACJI
         return PromptFactory._build_prompt(SYSTEM_PROMPT_ENGINEER, config, context)
 
     @staticmethod
-    def for_plot_generator(plan: str, available_columns: List[str]) -> str:
+    def for_performance_fix(failing_node: str, error_message: str, code_context: str,
+                            resource_usage: Optional[Dict[str, Any]] = None) -> str:
+        """Ukierunkowany prompt dla przekroczenia limitów zasobów (czas, pamięć, CPU) - od razu poprawka wydajnościowa."""
+        context = {
+            "failing_node": failing_node,
+            "error_traceback": error_message,
+            "slow_code": code_context,
+            "resource_usage": resource_usage or "Brak danych"
+        }
+        config = PromptConfig(
+            persona="Jesteś 'Inżynierem Wydajności' działającym w ramach dyrektywy 'Nexus'.",
+            task="Kod przekroczył limit zasobów piaskownicy. Przepisz go tak, aby dawał **identyczny wynik** przy znacznie mniejszym zużyciu czasu i pamięci.",
+            rules=[
+                "Nie zmieniaj logiki transformacji, nazw ani typów kolumn wynikowych - zmieniasz wyłącznie sposób obliczeń.",
+                "Zastąp `apply`/`iterrows`/pętle po wierszach operacjami wektorowymi (`np.where`, `Series.str`, `Series.dt`, `groupby().transform`).",
+                "Wczytuj tylko potrzebne kolumny (`usecols`/`columns`), stosuj mniejsze typy (`category`, `float32`, `int32`) i unikaj zbędnych kopii ramek.",
+                "Zachowaj wymaganą strukturę skryptu (funkcja `process_data(input_path, output_path)` i wywołanie końcowe).",
+                "Uwzględnij `resource_usage`: przy przekroczeniu pamięci priorytetem jest szczytowe RSS, przy przekroczeniu czasu - liczba operacji."
+            ],
+            output_format="Musisz wywołać narzędzie `propose_code_fix` z kompletnym, poprawionym kodem. Nie odpowiadaj w formie czystego tekstu."
+        )
+        return PromptFactory._build_prompt(SYSTEM_PROMPT_ENGINEER, config, context)
+
+    @staticmethod
+    def for_performance_optimizer(code: str, hotspots: Optional[List[Dict[str, Any]]], runtime_s: float, budget_s: float,
+                                  backend: str = "pandas") -> str:
+        """Prompt dla optymalizatora poprawnego, ale zbyt wolnego kodu - na podstawie profilu linii z pełnego przebiegu."""
+        context = {
+            "slow_code": code,
+            "runtime": f"{runtime_s:.1f} s (budżet: {budget_s:.0f} s)",
+            "hotspots": hotspots or "Brak profilu - oceń koszt operacji samodzielnie",
+            "architectural_rules": ArchitecturalRulesManager.get_rules_as_string(backend)
+        }
+        config = PromptConfig(
+            persona="Jesteś 'Inżynierem Wydajności' działającym w ramach dyrektywy 'Nexus'.",
+            task="Kod działa poprawnie, ale przekroczył budżet czasu. Przepisz go tak, aby dawał **identyczny wynik** (te same kolumny, wiersze i wartości) w znacznie krótszym czasie.",
+            rules=[
+                "`hotspots` to najkosztowniejsze linie z profilu pełnego przebiegu: `line` (numer linii), `self_s` (czas samej linii), `cum_s` (czas z wywołaniami), `share` (udział w czasie), `mem_delta_bytes` (przyrost pamięci). Skup się na liniach o największym `share`.",
+                "Nie zmieniaj logiki transformacji, nazw, kolejności ani typów kolumn wynikowych - zmieniasz wyłącznie sposób obliczeń. Wynik zostanie porównany z wynikiem obecnego kodu na próbce danych, a przepisany kod zostanie przyjęty tylko wtedy, gdy będzie identyczny i szybszy.",
+                "Typowe źródła kosztu: `apply`/`iterrows`/pętle po wierszach (zastąp operacjami wektorowymi), wielokrotne `pd.concat`, zbędne kopie ramek, wczytywanie nieużywanych kolumn, operacje tekstowe na typie `object` zamiast `category`.",
+                "Zachowaj wymaganą strukturę skryptu (funkcja `process_data(input_path, output_path)` i wywołanie końcowe)."
+            ],
+            output_format="Twoja odpowiedź musi zawierać **TYLKO i WYŁĄCZNIE** surowy kod Pythona. Nie umieszczaj go w blokach markdown (` ```python`)."
+        )
+        return PromptFactory._build_prompt(SYSTEM_PROMPT_ENGINEER, config, context)
+
+    @staticmethod
+    def for_plot_generator(plan: str, available_columns: List[str], column_profile: Optional[Dict[str, Any]] = None) -> str:
         """Prompt dla agenta generującego kod do wizualizacji."""
         context = {
             "plan_to_illustrate": plan,
             "available_columns_in_df_processed": ", ".join(available_columns)
         }
+        if column_profile:
+            context["df_processed_column_profile"] = format_column_brief(column_profile)
         config = PromptConfig(
             persona="Jesteś ekspertem od wizualizacji danych w Pythonie, działającym w ramach dyrektywy 'Nexus'. [cite: 98]",
             task="Napisz fragment kodu w Pythonie, który generuje wizualizacje ilustrujące zrealizowany plan transformacji danych.",
@@ -185,12 +306,12 @@ PLAN_AKCEPTOWANY_PRZEJSCIE_DO_IMPLEMENTACJI
         return PromptFactory._build_prompt(SYSTEM_PROMPT_ENGINEER, config, context)
 
     @staticmethod
-    def for_summary_analyst(plan: str, original_summary: str, processed_summary: str) -> str:
-        """Prompt dla agenta tworzącego podsumowanie w HTML."""
+    def for_summary_analyst(plan: str, original_profile: Dict[str, Any], processed_profile: Dict[str, Any]) -> str:
+        """Prompt dla agenta tworzącego podsumowanie w HTML (profile kolumn z magazynu profili)."""
         context = {
             "executed_transformation_plan": plan,
-            "data_summary_before": original_summary,
-            "data_summary_after": processed_summary
+            "data_summary_before": format_profile(original_profile, "Podsumowanie danych ORYGINALNYCH:"),
+            "data_summary_after": format_profile(processed_profile, "Podsumowanie danych PRZETWORZONYCH:")
         }
         config = PromptConfig(
             persona="Jesteś analitykiem danych piszącym zwięzłe, menedżerskie podsumowania. [cite: 93]",
@@ -251,15 +372,17 @@ PLAN_AKCEPTOWANY_PRZEJSCIE_DO_IMPLEMENTACJI
 class ArchitecturalRule(TypedDict):
     id: str; description: str; check: Callable[[str], bool]; error_message: str
 
+# Reguły sprawdzane są na AST w jednym przejściu (tools/code_rules.py); tutaj tylko ich opisy dla promptów
 ARCHITECTURAL_RULES: List[ArchitecturalRule] = [
-    {"id": "NO_MAIN_BLOCK", "description": "Żadnego bloku `if __name__ == '__main__':`.", "check": lambda code: bool(re.search(r'if\s+__name__\s*==\s*["\']__main__["\']\s*:', code)), "error_message": "Wykryto niedozwolony blok `if __name__ == '__main__':`."},
-    {"id": "NO_ARGPARSE", "description": "Żadnego `argparse` ani `sys.argv`.", "check": lambda code: bool(re.search(r'import\s+argparse', code)), "error_message": "Wykryto niedozwolony import modułu `argparse`."},
-    {"id": "SINGLE_FUNCTION_LOGIC", "description": "Cała logika musi być w funkcji `process_data(input_path: str, output_path: str)`.", "check": lambda code: "def process_data(input_path: str, output_path: str)" not in code, "error_message": "Brak wymaganej definicji funkcji `process_data(input_path: str, output_path: str)`."},
-    {"id": "ENDS_WITH_CALL", "description": "Skrypt musi kończyć się **dokładnie jedną linią** w formacie: `process_data(input_path, output_path)  # noqa: F821`. Komentarz `# noqa: F821` jest **obowiązkowy**.", "check": lambda code: not re.search(r'^\s*process_data\(input_path,\s*output_path\)\s*#\s*noqa:\s*F821\s*$', [line for line in code.strip().split('\n') if line.strip()][-1]), "error_message": "Skrypt nie kończy się wymaganym wywołaniem `process_data(input_path, output_path)  # noqa: F821`."},
+    {"id": rule.id, "description": rule.description, "check": partial(rule_violated, rule.id), "error_message": rule.error_message}
+    for rule in DEFAULT_RULES
 ]
 
 class ArchitecturalRulesManager:
     @staticmethod
-    def get_rules_as_string() -> str:
-        rules_text = "\n".join(f"        - {rule['description']}" for rule in ARCHITECTURAL_RULES)
+    def get_rules_as_string(backend: str = "pandas") -> str:
+        rules_text = "\n".join(f"        - {rule.description}" for rule in RULE_SETS[backend])
+        if backend == "pandas":
+            performance_text = "\n".join(f"        - {rule.description}" for rule in PERFORMANCE_RULES)
+            rules_text += f"\n    **Wymagania Wydajnościowe (kod wektorowy):**\n{performance_text}"
         return f"<ARCHITECTURAL_RULES>\n    **Krytyczne Wymagania Dotyczące Struktury Kodu:**\n{rules_text}\n</ARCHITECTURAL_RULES>"
\ No newline at end of file
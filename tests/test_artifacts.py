@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+from tools.artifacts import (detect_format, export_csv, iter_artifact_batches, read_artifact, read_artifact_columns,
+                             read_artifact_schema, write_artifact)
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({"id": range(1000), "group": [f"g{i % 4}" for i in range(1000)],
+                         "value": [i * 0.5 for i in range(1000)]})
+
+
+@pytest.mark.parametrize("name, fmt", [("out.parquet", "parquet"), ("out.arrow", "arrow"), ("out.csv", "csv")])
+def test_round_trip_and_format_detection(frame, tmp_path, name, fmt):
+    path = write_artifact(frame, str(tmp_path / name))
+
+    assert detect_format(path) == fmt
+    pd.testing.assert_frame_equal(read_artifact(path), frame)
+    assert read_artifact_columns(path) == ["id", "group", "value"]
+    pd.testing.assert_frame_equal(read_artifact(path, columns=["value"]), frame[["value"]])
+
+
+def test_format_detected_by_content_not_extension(frame, tmp_path):
+    path = write_artifact(frame, str(tmp_path / "processed.csv"), fmt="parquet")
+
+    assert detect_format(path) == "parquet"
+    assert detect_format(str(tmp_path / "missing.feather")) == "arrow"
+
+
+def test_parts_and_partitions_read_as_one_dataset(frame, tmp_path):
+    parts = write_artifact(frame, str(tmp_path / "parts"), fmt="parquet", n_parts=4)
+    assert detect_format(parts) == "parquet"
+    pd.testing.assert_frame_equal(read_artifact(parts), frame)
+
+    partitioned = write_artifact(frame, str(tmp_path / "partitioned"), fmt="parquet", partition_cols=["group"])
+    result = read_artifact(partitioned).sort_values("id").reset_index(drop=True)
+    assert result["id"].tolist() == frame["id"].tolist()
+    assert result["group"].astype(str).tolist() == frame["group"].tolist()
+
+
+def test_overwriting_directory_artifact_removes_old_parts(frame, tmp_path):
+    path = str(tmp_path / "parts")
+    write_artifact(frame, path, fmt="parquet", n_parts=4)
+    write_artifact(frame.head(10), path, fmt="parquet", n_parts=2)
+
+    assert len(read_artifact(path)) == 10
+
+
+def test_streaming_batches_and_csv_export(frame, tmp_path):
+    path = write_artifact(frame, str(tmp_path / "out.parquet"))
+
+    batches = list(iter_artifact_batches(path, batch_size=300, columns=["id"]))
+    assert [len(b) for b in batches] == [300, 300, 300, 100]
+    assert read_artifact_schema(path)["value"] == "double"
+
+    csv_path = export_csv(path, str(tmp_path / "export.csv"))
+    pd.testing.assert_frame_equal(pd.read_csv(csv_path), frame)
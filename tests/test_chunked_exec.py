@@ -0,0 +1,112 @@
+import os
+
+import pandas as pd
+import pytest
+
+from tools.artifacts import csv_byte_ranges, csv_has_quoted_newlines, iter_csv_byte_range
+from tools.chunked_exec import defines_chunked_contract, plan_shards, run_chunked, strip_entry_call
+from tools.sandbox import SandboxPool
+
+
+def _write_csv(path, body: str) -> str:
+    path.write_text("id,text\n" + body)
+    return str(path)
+
+
+def _read_ranges(path: str, n_ranges: int) -> pd.DataFrame:
+    parts = [chunk for start, end in csv_byte_ranges(path, n_ranges)
+             for chunk in iter_csv_byte_range(path, start, end, ["id", "text"], chunksize=7)]
+    return pd.concat(parts, ignore_index=True)
+
+
+@pytest.mark.parametrize("n_ranges", [1, 3, 8, 50])
+def test_byte_ranges_cover_every_row_exactly_once(tmp_path, n_ranges):
+    path = _write_csv(tmp_path / "data.csv", "".join(f'{i},"tekst, z przecinkiem {i}"\n' for i in range(200)))
+
+    pd.testing.assert_frame_equal(_read_ranges(path, n_ranges), pd.read_csv(path))
+
+
+def test_multiline_quoted_field_across_shard_boundary(tmp_path):
+    rows = [f"{i},zwykły wiersz {i}\n" for i in range(40)]
+    long_note = '"pierwsza linia\n' + "\n".join(f"linia {k}" for k in range(40)) + '\nostatnia"'
+    rows[20] = f"20,{long_note}\n"
+    path = _write_csv(tmp_path / "data.csv", "".join(rows))
+
+    # Granica przedziału wypada w środku pola wieloliniowego - podział po liniach rozciąłby rekord
+    with open(path, "rb") as f:
+        data = f.read()
+    field = (data.index(b'"pierwsza'), data.index(b'ostatnia"'))
+    assert any(field[0] < start < field[1] for start, _ in csv_byte_ranges(path, 4))
+
+    assert csv_has_quoted_newlines(path)
+    assert csv_has_quoted_newlines(path, block_size=16)
+    with pytest.raises(ValueError):
+        plan_shards(path, 4)
+
+
+def test_escaped_quotes_without_newlines_allow_sharding(tmp_path):
+    path = _write_csv(tmp_path / "data.csv", "".join(f'{i},"cytat ""{i}"" w polu"\n' for i in range(100)))
+
+    assert not csv_has_quoted_newlines(path, block_size=16)
+    assert len(plan_shards(path, 4)) == 4
+    pd.testing.assert_frame_equal(_read_ranges(path, 4), pd.read_csv(path))
+
+
+CHUNKED_SCRIPT = """import pandas as pd
+def fit_params(input_path):
+    return {"median": float(pd.read_csv(input_path)["value"].median())}
+def transform_chunk(chunk, params):
+    chunk = chunk.assign(value=chunk["value"].fillna(params["median"]))
+    return chunk[chunk["value"] >= 0]
+def process_data(input_path, output_path):
+    df = pd.read_csv(input_path)
+    transform_chunk(df, fit_params(input_path)).to_parquet(output_path, index=False)
+process_data(input_path, output_path)  # noqa: F821
+"""
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with SandboxPool(size=2) as pool:
+        yield pool
+
+
+def test_chunked_run_matches_single_process_result(pool, tmp_path):
+    values = [float(i % 50) - 5 if i % 13 else None for i in range(3000)]
+    path = tmp_path / "data.csv"
+    pd.DataFrame({"id": range(3000), "value": values}).to_csv(path, index=False)
+    output = str(tmp_path / "out.parquet")
+
+    result = run_chunked(pool, CHUNKED_SCRIPT, str(path), output, max_workers=2, chunksize=250)
+    assert result["ok"], result["traceback"]
+
+    expected_dir = tmp_path / "single"
+    expected_dir.mkdir()
+    single = pool.run(CHUNKED_SCRIPT, variables={"input_path": str(path), "output_path": str(expected_dir / "out.parquet")})
+    assert single["ok"], single["traceback"]
+    expected = pd.read_parquet(expected_dir / "out.parquet")
+    chunked = pd.read_parquet(output).sort_values("id").reset_index(drop=True)
+    pd.testing.assert_frame_equal(chunked, expected.reset_index(drop=True), check_dtype=False)
+    assert result["outputs"]["rows_in"] == 3000
+    assert result["outputs"]["rows_out"] == len(expected)
+
+
+def test_failing_shard_reports_error_and_leaves_no_output(pool, tmp_path):
+    path = tmp_path / "data.csv"
+    pd.DataFrame({"id": range(100), "value": range(100)}).to_csv(path, index=False)
+    code = CHUNKED_SCRIPT.replace('chunk = chunk.assign', 'chunk = chunk.assign(missing=chunk["brak"]).assign')
+    output = str(tmp_path / "out.parquet")
+
+    result = run_chunked(pool, code, str(path), output, max_workers=2, chunksize=10)
+    assert not result["ok"]
+    assert result["error_type"] == "KeyError"
+    assert result["traceback"].startswith("[TRYB KAWAŁKOWY: shard")
+    assert not os.path.exists(output) and not os.path.exists(output + ".tmp")
+
+
+def test_contract_detection_and_entry_call_removal():
+    assert defines_chunked_contract(CHUNKED_SCRIPT)
+    assert not defines_chunked_contract(CHUNKED_SCRIPT.replace("def fit_params", "def fit"))
+    stripped = strip_entry_call(CHUNKED_SCRIPT)
+    assert "def process_data" in stripped
+    assert "process_data(input_path, output_path)  # noqa" not in stripped
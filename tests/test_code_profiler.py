@@ -0,0 +1,47 @@
+import time
+
+from tools.code_profiler import SamplingProfiler
+from tools.sandbox import SandboxPool
+
+
+CODE = """import time
+def process_data(input_path, output_path):
+    time.sleep(0.05)
+    busy_until = time.perf_counter() + 0.4
+    while time.perf_counter() < busy_until:
+        pass
+process_data(input_path, output_path)
+"""
+
+
+def test_hot_line_gets_most_self_time():
+    with SamplingProfiler(interval_s=0.005) as profiler:
+        exec(compile(CODE, "<string>", "exec"), {"input_path": "", "output_path": ""})
+
+    top = profiler.hotspots(CODE, top_n=3)
+    assert top[0]["line"] in (5, 6)
+    assert top[0]["code"].startswith(("while", "pass"))
+    # Wywołanie funkcji jest na stosie przez cały czas - czas skumulowany, nie własny
+    assert profiler.cum_s[7] >= sum(profiler.self_s.values()) * 0.9
+    assert sum(h["share"] for h in top) <= 1.0
+
+
+def test_code_outside_profiled_file_is_not_attributed():
+    with SamplingProfiler(interval_s=0.005) as profiler:
+        time.sleep(0.1)
+
+    assert profiler.samples == 0
+    assert profiler.total_s > 0
+    assert profiler.hotspots(CODE) == []
+
+
+def test_sandbox_reports_hotspots():
+    with SandboxPool(size=1) as pool:
+        result = pool.run(CODE, variables={"input_path": "", "output_path": ""},
+                          profile_options={"interval_s": 0.005, "top_n": 2})
+
+    profile = result["outputs"]["profile"]
+    assert result["ok"], result["traceback"]
+    assert len(profile["hotspots"]) <= 2
+    assert profile["hotspots"][0]["line"] in (5, 6)
+    assert profile["samples"] > 0 and profile["interval_s"] == 0.005
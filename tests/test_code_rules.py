@@ -0,0 +1,138 @@
+import ast
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import tools.code_rules as code_rules_module
+from tools.code_rules import check_code, rule_violated, run_rules, vectorized_expression
+
+
+VALID = """import pandas as pd
+def process_data(input_path: str, output_path: str):
+    pd.read_csv(input_path).to_csv(output_path, index=False)
+process_data(input_path, output_path)  # noqa: F821
+"""
+ENTRY_CALL = "process_data(input_path, output_path)  # noqa: F821\n"
+
+
+def _rule_ids(code: str, backend: str = "pandas"):
+    return [v.rule_id for v in check_code(code, backend)]
+
+
+def test_valid_script_passes_default_rules():
+    assert check_code(VALID) == []
+
+
+@pytest.mark.parametrize("code, rule_id", [
+    (VALID + "if __name__ == '__main__':\n    pass\n" + ENTRY_CALL, "NO_MAIN_BLOCK"),
+    ("import argparse\n" + VALID, "NO_ARGPARSE"),
+    ("import sys\nx = sys.argv\n" + VALID, "NO_ARGPARSE"),
+    (VALID.replace("input_path: str, output_path: str", "path: str"), "SINGLE_FUNCTION_LOGIC"),
+    (VALID.replace("output_path: str)", "output_path: int)"), "SINGLE_FUNCTION_LOGIC"),
+    (VALID.replace("def process_data", "def run"), "SINGLE_FUNCTION_LOGIC"),
+    (VALID.replace("  # noqa: F821", ""), "ENDS_WITH_CALL"),
+    (VALID + "x = 1\n", "ENDS_WITH_CALL"),
+])
+def test_default_rules_report_violations(code, rule_id):
+    assert rule_id in _rule_ids(code)
+
+
+def test_duplicate_entry_call_reported_at_its_line():
+    code = VALID.replace("def process_data", ENTRY_CALL + "def process_data")
+    violations = [v for v in check_code(code) if v.rule_id == "ENDS_WITH_CALL"]
+
+    assert [v.line for v in violations] == [2]
+
+
+def test_syntax_error_is_single_violation():
+    violations = run_rules("def process_data(:\n")
+    assert [v.rule_id for v in violations] == ["SYNTAX"]
+    assert rule_violated("NO_MAIN_BLOCK", "def process_data(:\n")
+
+
+def test_duckdb_rules_require_write_and_forbid_materialization():
+    code = """def process_data(input_path: str, output_path: str):
+    rel = read_input(input_path)
+    write_result(rel.filter('a > 1'), output_path)
+    preview = rel.limit(5).df()
+process_data(input_path, output_path)  # noqa: F821
+"""
+    assert check_code(code, "duckdb") == []
+    # Zestaw pandas nie zna reguł DuckDB
+    assert check_code(VALID, "pandas") == []
+
+    materialized = code.replace("rel.filter('a > 1')", "rel.df()")
+    assert "DUCKDB_NO_MATERIALIZATION" in _rule_ids(materialized, "duckdb")
+    assert set(_rule_ids(VALID, "duckdb")) == {"DUCKDB_NO_MATERIALIZATION", "DUCKDB_WRITE_RESULT"}
+
+
+def test_verdicts_are_cached_per_backend(monkeypatch):
+    calls = []
+    original = code_rules_module.run_rules
+    monkeypatch.setattr(code_rules_module, "run_rules", lambda code, rules: calls.append(rules) or original(code, rules))
+    code = VALID.replace("index=False", "index=True")
+
+    first = check_code(code)
+    first.append("zmiana kopii")
+    assert check_code(code) == []
+    check_code(code, "duckdb")
+    assert len(calls) == 2
+
+
+def test_rule_violated_matches_rule_id():
+    assert rule_violated("NO_ARGPARSE", "import argparse\n" + VALID)
+    assert not rule_violated("NO_MAIN_BLOCK", "import argparse\n" + VALID)
+
+
+FRAME = pd.DataFrame({"a": [1, 5, 9, 12], "b": [3, 3, 10, 11], "flag": [True, False, True, False]},
+                     index=[10, 20, 30, 40])
+
+
+def _vectorize(source: str):
+    return vectorized_expression(ast.parse(source, mode="eval").body, ast.parse("df", mode="eval").body)
+
+
+@pytest.mark.parametrize("source", [
+    "lambda row: row['a'] * 2 + row.b",
+    "lambda row: 0 < row.a <= row['b'] < 11",
+    "lambda row: row.a > 4 and not row.flag",
+    "lambda row: row.a if row.b > 5 or row.flag else -row.a",
+    "lambda row: row.name * 2",
+    "lambda row: row.a if row.name > 15 else 0",
+])
+def test_vectorized_expression_matches_apply(source):
+    expression = _vectorize(source)
+    assert expression is not None
+
+    expected = FRAME.apply(eval(source), axis=1)
+    result = eval(expression, {"df": FRAME, "np": np})
+    np.testing.assert_array_equal(np.asarray(result), expected.to_numpy())
+
+
+def test_row_name_maps_to_index_not_column():
+    assert _vectorize("lambda row: row.name") == "df.index"
+    assert _vectorize("lambda row: row['name']") == "df['name']"
+
+
+def test_chained_comparison_is_split_into_terms():
+    assert _vectorize("lambda r: 0 < r.a < 10") == "(0 < df['a']) & (df['a'] < 10)"
+
+
+@pytest.mark.parametrize("source", [
+    "lambda row: row.a in [1, 5]",
+    "lambda row: row.a is None",
+    "lambda row: row.values.sum()",
+    "lambda row: row.size",
+    "lambda row: len(row.a)",
+    "lambda row, other: row.a",
+])
+def test_unsupported_lambdas_have_no_expression(source):
+    assert _vectorize(source) is None
+
+
+def test_apply_axis1_suggestion_uses_assignment_target():
+    code = "df['c'] = df.apply(lambda row: row.a if 0 < row.b < 5 else row.name, axis=1)\n"
+    violation = next(v for v in check_code(code, "performance") if v.rule_id == "PERF_APPLY_AXIS1")
+
+    assert violation.suggestion == "`df['c'] = np.where((0 < df['b']) & (df['b'] < 5), df['a'], df.index)`"
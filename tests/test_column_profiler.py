@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.column_profiler import HyperLogLog, TDigest, TableProfile, format_profile, profile_chunks, profile_file
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(1)
+    amount = rng.normal(50, 10, 20_000)
+    amount[::97] = np.nan
+    return pd.DataFrame({"amount": amount, "city": rng.choice([f"c{i}" for i in range(300)], 20_000),
+                         "count": rng.integers(0, 1000, 20_000)})
+
+
+def test_chunked_profile_matches_pandas(frame):
+    profile = profile_chunks(frame[i:i + 3000] for i in range(0, len(frame), 3000)).to_dict()
+    amount = profile["columns"]["amount"]
+
+    assert profile["row_count"] == len(frame)
+    assert amount["null_count"] == frame["amount"].isna().sum()
+    assert amount["mean"] == pytest.approx(frame["amount"].mean())
+    assert amount["std"] == pytest.approx(frame["amount"].std())
+    assert amount["min"] == frame["amount"].min() and amount["max"] == frame["amount"].max()
+    for q, value in amount["quantiles"].items():
+        assert value == pytest.approx(frame["amount"].quantile(q), rel=0.02)
+    assert profile["columns"]["city"]["distinct_approx"] == pytest.approx(300, rel=0.05)
+    assert profile["columns"]["city"]["min"] == "c0"
+
+
+def test_merge_in_any_order_gives_same_statistics(frame):
+    def parts():
+        # Łączenie przejmuje szkice łączonego profilu - każda kolejność dostaje świeże części
+        return [profile_chunks([frame[i:i + 5000]]) for i in range(0, len(frame), 5000)]
+
+    forward, backward = TableProfile(), TableProfile()
+    for part in parts():
+        forward.merge(part)
+    for part in reversed(parts()):
+        backward.merge(part)
+
+    a, b = forward.to_dict()["columns"]["count"], backward.to_dict()["columns"]["count"]
+    assert a["mean"] == pytest.approx(b["mean"]) and a["std"] == pytest.approx(b["std"])
+    assert a["distinct_approx"] == b["distinct_approx"]
+    assert a["count"] == b["count"] == len(frame)
+
+
+def test_parallel_file_profile_matches_sequential(frame, tmp_path):
+    path = str(tmp_path / "data.csv")
+    frame.to_csv(path, index=False)
+
+    sequential = profile_file(path, chunksize=4000, max_workers=1).to_dict()
+    parallel = profile_file(path, chunksize=4000, max_workers=3).to_dict()
+
+    assert list(parallel["columns"]) == ["amount", "city", "count"]
+    assert parallel["row_count"] == sequential["row_count"] == len(frame)
+    for name in ("amount", "count"):
+        assert parallel["columns"][name]["mean"] == pytest.approx(sequential["columns"][name]["mean"])
+        assert parallel["columns"][name]["null_count"] == sequential["columns"][name]["null_count"]
+    assert "Liczba wierszy: 20000, liczba kolumn: 3" in format_profile(parallel, "Profil")
+
+
+def test_sketches_handle_edge_cases():
+    digest = TDigest()
+    assert digest.quantile(0.5) is None
+    digest.update(np.array([7.0]))
+    assert digest.quantile(0.9) == 7.0
+
+    hll = HyperLogLog()
+    hll.update(pd.Series([], dtype=object))
+    assert hll.estimate() == 0
+
+    profile = profile_chunks([pd.DataFrame({"a": [None, None]}), pd.DataFrame({"a": [1, 2]})]).to_dict()
+    assert profile["columns"]["a"]["null_rate"] == 0.5
+    assert profile["columns"]["a"]["count"] == 2
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.column_projection import frame_projection, input_projection, push_projection
+
+
+COLUMNS = ["a", "b", "c", "d"]
+
+DROP_DUPLICATES = """import pandas as pd
+def process_data(input_path: str, output_path: str):
+    df = pd.read_csv(input_path)
+    df = df.drop_duplicates()
+    df[['a', 'b']].to_csv(output_path, index=False)
+process_data(input_path, output_path)  # noqa: F821
+"""
+
+DROPNA = """import pandas as pd
+def process_data(input_path: str, output_path: str):
+    df = pd.read_csv(input_path)
+    df = df.dropna()
+    df[['a', 'b']].to_csv(output_path, index=False)
+process_data(input_path, output_path)  # noqa: F821
+"""
+
+DUPLICATED_MASK = """import pandas as pd
+def process_data(input_path: str, output_path: str):
+    df = pd.read_csv(input_path)
+    df = df[~df.duplicated()]
+    df[['a', 'b']].to_csv(output_path, index=False)
+process_data(input_path, output_path)  # noqa: F821
+"""
+
+MERGE_WITHOUT_KEYS = """import pandas as pd
+def process_data(input_path: str, output_path: str):
+    df = pd.read_csv(input_path)
+    df = df.merge(df.head(3))
+    df[['a', 'b']].to_csv(output_path, index=False)
+process_data(input_path, output_path)  # noqa: F821
+"""
+
+SUBSET_DEDUPLICATION = """import pandas as pd
+def process_data(input_path: str, output_path: str):
+    df = pd.read_csv(input_path)
+    df = df.drop_duplicates(subset=['a'])
+    df = df.dropna(subset=['b'])
+    df = df[~df.duplicated(['a', 'b'])]
+    df[['a', 'b']].to_csv(output_path, index=False)
+process_data(input_path, output_path)  # noqa: F821
+"""
+
+AGGREGATION = """import pandas as pd
+def process_data(input_path: str, output_path: str):
+    df = pd.read_csv(input_path)
+    df = df[df['b'] > 0]
+    out = df.groupby('a').agg(total=('b', 'sum'))
+    out.reset_index().to_csv(output_path, index=False)
+process_data(input_path, output_path)  # noqa: F821
+"""
+
+
+@pytest.fixture
+def input_csv(tmp_path):
+    """Wiersze różniące się tylko kolumnami `c`/`d` (duplikaty i braki poza kolumnami używanymi przez kod)."""
+    df = pd.DataFrame({
+        "a": [1, 1, 2, 2, 3, 3],
+        "b": [1.0, 1.0, 2.0, np.nan, 3.0, 3.0],
+        "c": ["x", "y", "x", "x", None, "z"],
+        "d": [1, 2, 3, 3, 5, np.nan],
+    })
+    path = tmp_path / "input.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def _run(code: str, input_path: str, output_path: str) -> pd.DataFrame:
+    exec(code, {"input_path": input_path, "output_path": output_path})
+    return pd.read_csv(output_path)
+
+
+def _assert_same_output(code: str, input_path: str, tmp_path) -> None:
+    projected = push_projection(code, input_projection(code, COLUMNS))
+    full_output = _run(code, input_path, str(tmp_path / "full.csv"))
+    projected_output = _run(projected, input_path, str(tmp_path / "projected.csv"))
+    pd.testing.assert_frame_equal(full_output, projected_output)
+
+
+@pytest.mark.parametrize("code", [DROP_DUPLICATES, DROPNA, DUPLICATED_MASK, MERGE_WITHOUT_KEYS])
+def test_row_selection_over_all_columns_disables_projection(code, input_csv, tmp_path):
+    assert input_projection(code, COLUMNS) is None
+    _assert_same_output(code, input_csv, tmp_path)
+
+
+@pytest.mark.parametrize("code, expected", [(SUBSET_DEDUPLICATION, ["a", "b"]), (AGGREGATION, ["a", "b"])])
+def test_projected_read_gives_identical_output(code, expected, input_csv, tmp_path):
+    assert input_projection(code, COLUMNS) == expected
+    assert "usecols=['a', 'b']" in push_projection(code, expected)
+    _assert_same_output(code, input_csv, tmp_path)
+
+
+def test_plot_frame_projection_respects_row_dependent_methods():
+    assert frame_projection("x = df_processed.dropna()\ny = x['a'].sum()", "df_processed", COLUMNS) is None
+    assert frame_projection("x = df_processed.drop_duplicates()\ny = x['a'].sum()", "df_processed", COLUMNS) is None
+    assert frame_projection("x = df_processed.dropna(subset=['a'])\ny = x['a'].sum()", "df_processed", COLUMNS) == ["a"]
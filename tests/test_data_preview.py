@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import tools.data_preview as data_preview
+from tools.artifacts import detect_format
+from tools.data_preview import build_data_preview, write_sample_file
+from tools.dataset_cache import DatasetCache
+from tools.io_layer import CachedObjectStore
+from tools.profile_store import ProfileStore
+
+
+@pytest.fixture
+def input_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "amount": rng.normal(100, 20, 5000).round(2),
+        "merchant": rng.choice(["a", "b", "c"], 5000),
+        "is_fraud": (rng.random(5000) < 0.02).astype(int),
+    })
+    path = tmp_path / "input.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def _dataset_cache(tmp_path, run_id: str) -> DatasetCache:
+    return DatasetCache(run_id, object_store=CachedObjectStore(cache_dir=str(tmp_path / "objects")),
+                        profile_store=ProfileStore(str(tmp_path / "profiles.sqlite")))
+
+
+def test_cached_preview_matches_single_pass_preview(input_csv, tmp_path):
+    cache = _dataset_cache(tmp_path, "run-1")
+    preview = cache.data_preview(input_csv, sample_rows=10, token_budget=5000, sample_dir=str(tmp_path / "samples"))
+
+    assert preview == build_data_preview(input_csv, sample_rows=10, token_budget=5000)
+    assert "warstwowana po 'is_fraud'" in preview
+
+
+def test_next_run_builds_preview_without_reading_data(input_csv, tmp_path, monkeypatch):
+    sample_dir = str(tmp_path / "samples")
+    first = _dataset_cache(tmp_path, "run-1").data_preview(input_csv, sample_rows=10, token_budget=5000, sample_dir=sample_dir)
+
+    def no_data_reads(*args, **kwargs):
+        raise AssertionError("podgląd nie powinien czytać danych")
+    monkeypatch.setattr(data_preview, "iter_artifact_batches", no_data_reads)
+    monkeypatch.setattr("tools.dataset_cache.profile_file", no_data_reads)
+
+    second = _dataset_cache(tmp_path, "run-2").data_preview(input_csv, sample_rows=10, token_budget=5000, sample_dir=sample_dir)
+    assert second == first
+
+
+def test_sample_file_keeps_format_columns_and_rare_classes(input_csv, tmp_path):
+    out = write_sample_file(input_csv, str(tmp_path / "sample" / "input.csv"), n_rows=200)
+    full, sample = pd.read_csv(input_csv), pd.read_csv(out)
+
+    assert list(sample.columns) == list(full.columns)
+    assert len(sample) == 200
+    assert sample["is_fraud"].sum() > 0
+    # Próbka składa się z wierszy pliku źródłowego
+    assert len(sample.merge(full.drop_duplicates(), how="inner")) == len(sample)
+
+    parquet = str(tmp_path / "input.parquet")
+    full.to_parquet(parquet, index=False)
+    parquet_sample = write_sample_file(parquet, str(tmp_path / "sample" / "input.parquet"), n_rows=50)
+    assert detect_format(parquet_sample) == "parquet"
+    assert dict(pd.read_parquet(parquet_sample).dtypes) == dict(full.dtypes)
+
+
+def test_sample_path_is_built_once_per_data_version(input_csv, tmp_path, monkeypatch):
+    sample_dir = str(tmp_path / "samples")
+    cache = _dataset_cache(tmp_path, "run-1")
+    first = cache.sample_path(input_csv, n_rows=100, sample_dir=sample_dir)
+
+    def no_rebuild(*args, **kwargs):
+        raise AssertionError("próbka tej wersji danych już istnieje")
+    monkeypatch.setattr("tools.dataset_cache.write_sample_file", no_rebuild)
+    assert _dataset_cache(tmp_path, "run-2").sample_path(input_csv, n_rows=100, sample_dir=sample_dir) == first
+
+    monkeypatch.undo()
+    pd.read_csv(input_csv).head(3000).to_csv(input_csv, index=False)
+    second = _dataset_cache(tmp_path, "run-3").sample_path(input_csv, n_rows=100, sample_dir=sample_dir)
+    assert second != first and len(pd.read_csv(second)) == 100
@@ -0,0 +1,102 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+import tools.dataset_cache as dataset_cache_module
+from tools.artifacts import write_artifact
+from tools.dataset_cache import DatasetCache
+from tools.io_layer import CachedObjectStore
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DatasetCache("run", object_store=CachedObjectStore(cache_dir=str(tmp_path / "objects")))
+
+
+@pytest.fixture
+def input_csv(tmp_path):
+    path = tmp_path / "input.csv"
+    pd.DataFrame({"a": range(100), "b": [f"x{i % 7}" for i in range(100)]}).to_csv(path, index=False)
+    return str(path)
+
+
+def _count_reads(monkeypatch):
+    calls = []
+    original = dataset_cache_module.read_artifact
+
+    def counting(path, columns=None):
+        calls.append(columns)
+        return original(path, columns=columns)
+    monkeypatch.setattr(dataset_cache_module, "read_artifact", counting)
+    return calls
+
+
+def test_file_is_parsed_once_and_views_are_shared(cache, input_csv, monkeypatch):
+    reads = _count_reads(monkeypatch)
+
+    first = cache.get_frame(input_csv)
+    second = cache.get_frame(input_csv, columns=["b"])
+    assert reads == [None]
+    assert cache.stats == {"hits": 1, "misses": 1}
+    assert second.columns.tolist() == ["b"]
+
+    # Nowa kolumna w widoku nie zmienia ramki współdzielonej
+    first["c"] = 1
+    assert "c" not in cache.get_frame(input_csv).columns
+
+
+def test_modified_file_is_reloaded(cache, input_csv, monkeypatch):
+    reads = _count_reads(monkeypatch)
+    assert len(cache.get_frame(input_csv)) == 100
+
+    pd.DataFrame({"a": [1, 2], "b": ["y", "z"]}).to_csv(input_csv, index=False)
+    stat = os.stat(input_csv)
+    os.utime(input_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert cache.get_frame(input_csv)["b"].tolist() == ["y", "z"]
+    assert len(reads) == 2
+    assert len(cache._frames) == 1
+
+
+def test_columnar_artifact_loads_only_requested_columns(cache, tmp_path, monkeypatch):
+    path = str(tmp_path / "data.parquet")
+    write_artifact(pd.DataFrame({"a": [1, 2], "b": [3, 4], "c": [5, 6]}), path)
+    reads = _count_reads(monkeypatch)
+
+    assert cache.get_frame(path, columns=["c"]).columns.tolist() == ["c"]
+    assert cache.get_frame(path, columns=["a", "c"]).columns.tolist() == ["a", "c"]
+    # Dociągnięta tylko brakująca kolumna; kolejność kolumn jak w pliku
+    assert reads == [["c"], ["a"]]
+    assert cache.get_frame(path).columns.tolist() == ["a", "b", "c"]
+
+
+def test_columns_and_head_do_not_load_the_frame(cache, input_csv, monkeypatch):
+    reads = _count_reads(monkeypatch)
+
+    assert cache.get_columns(input_csv) == ["a", "b"]
+    assert cache.head(input_csv, 3)["a"].tolist() == [0, 1, 2]
+    assert reads == []
+
+
+def test_concurrent_readers_parse_file_once(cache, input_csv, monkeypatch):
+    reads = _count_reads(monkeypatch)
+    frames = []
+    threads = [threading.Thread(target=lambda: frames.append(cache.get_frame(input_csv))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(reads) == 1
+    assert all(len(frame) == 100 for frame in frames)
+
+
+def test_invalidate_drops_cached_frames(cache, input_csv, monkeypatch):
+    reads = _count_reads(monkeypatch)
+    cache.get_frame(input_csv)
+    cache.invalidate(input_csv)
+    cache.get_frame(input_csv)
+
+    assert len(reads) == 2
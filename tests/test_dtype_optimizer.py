@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from tools.artifacts import write_artifact
+from tools.dtype_optimizer import DtypeLayer, optimize_frame
+
+
+def test_whole_number_floats_stay_float():
+    df = pd.DataFrame({"count": [1.0, 2.0, np.nan, 4.0], "ratio": [0.1, 0.2, 0.3, np.nan]})
+    optimized, report = optimize_frame(df)
+
+    assert optimized["count"].dtype == np.float32
+    assert optimized["ratio"].dtype == np.float64  # float32 zgubiłby precyzję
+    assert (optimized["count"] / 2).tolist()[:2] == [0.5, 1.0]
+    assert report["changes"] == {"count": "float64 -> float32"}
+
+
+def test_date_strings_stay_strings():
+    df = pd.DataFrame({"date": ["2024-01-05", "2024-02-10", None, "2024-03-15"] * 10})
+    optimized, _ = optimize_frame(df)
+
+    assert optimized["date"].str.slice(0, 4).dropna().eq("2024").all()
+    assert pd.to_datetime(optimized["date"]).dt.month.dropna().tolist()[:2] == [1, 2]
+
+
+def test_integers_are_narrowed_and_repeated_texts_become_category(tmp_path):
+    path = tmp_path / "input.csv"
+    pd.DataFrame({"id": range(100), "merchant": ["a", "b"] * 50, "flag": [True, None] * 50}).to_csv(path, index=False)
+    layer = DtypeLayer(min_int_bits=32)
+    df = layer.read(str(path))
+
+    assert df["id"].dtype == np.int32
+    assert df["merchant"].dtype == "category"
+    assert df["flag"].dtype == "boolean"
+    assert layer.summary()["changes"] == {"id": "int64 -> int32", "merchant": "object -> category", "flag": "object -> boolean"}
+
+
+def test_caller_frame_is_not_modified_and_savings_are_reported():
+    df = pd.DataFrame({"id": np.arange(1000, dtype=np.int64), "city": ["Kraków", "Gdańsk"] * 500})
+    optimized, report = optimize_frame(df, min_int_bits=16)
+
+    assert df["id"].dtype == np.int64 and df["city"].dtype == object
+    assert optimized["id"].dtype == np.int16
+    assert report["saved_bytes"] == report["bytes_before"] - report["bytes_after"] > 0
+
+
+def test_unsafe_columns_keep_their_types():
+    df = pd.DataFrame({"big": [0, 2**40], "mixed": ["a", 1], "unique": ["x", "y"], "empty": [None, None]})
+    optimized, report = optimize_frame(df, categorical_max_ratio=0.4)
+
+    assert optimized["big"].dtype == np.int64
+    assert report["changes"] == {}
+
+
+def test_columnar_artifact_read_with_projection(tmp_path):
+    path = write_artifact(pd.DataFrame({"a": np.arange(10), "b": ["x"] * 10, "c": np.zeros(10)}),
+                          str(tmp_path / "input.parquet"))
+    layer = DtypeLayer()
+    df = layer.read(path, columns=["a", "b"])
+
+    assert df.columns.tolist() == ["a", "b"]
+    assert df["a"].dtype == np.int32
+    assert layer.summary()["reads"] == 1
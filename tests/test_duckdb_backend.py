@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+
+from tools.artifacts import read_artifact, write_artifact
+from tools.code_rules import check_code
+from tools.duckdb_backend import DuckDBSession
+from tools.sandbox import SandboxPool
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({"merchant": [f"m{i % 3}" for i in range(300)], "amount": [float(i) for i in range(300)]})
+
+
+@pytest.fixture
+def session(tmp_path):
+    session = DuckDBSession(memory_limit_bytes=256 * 1024**2, temp_dir=str(tmp_path / "spill"), threads=2)
+    yield session
+    session.close()
+
+
+def _totals(df: pd.DataFrame) -> dict:
+    return df.set_index("merchant")["total"].to_dict()
+
+
+def test_csv_input_and_parquet_output(session, frame, tmp_path):
+    path = tmp_path / "input.csv"
+    frame.to_csv(path, index=False)
+    relation = session.read_input(str(path)).aggregate("merchant, sum(amount) AS total", "merchant")
+    output = session.write_result(relation, str(tmp_path / "wyniki" / "out.parquet"))
+
+    assert _totals(read_artifact(output)) == _totals(frame.groupby("merchant", as_index=False)["amount"].sum()
+                                                     .rename(columns={"amount": "total"}))
+    assert session.con.execute("SELECT current_setting('threads')").fetchone()[0] == 2
+
+
+def test_parquet_directory_input_and_sql_result_as_csv(session, frame, tmp_path):
+    parts = write_artifact(frame, str(tmp_path / "parts"), fmt="parquet", n_parts=3)
+    session.con.register("input_rel", session.read_input(parts))
+    output = session.write_result("SELECT count(*) AS n FROM input_rel WHERE amount >= 100", str(tmp_path / "out.csv"))
+
+    assert pd.read_csv(output)["n"].tolist() == [200]
+
+
+def test_generated_duckdb_script_runs_in_sandbox(frame, tmp_path):
+    code = """def process_data(input_path: str, output_path: str):
+    rel = read_input(input_path)
+    write_result(rel.filter('amount >= 150').project('merchant, amount * 2 AS doubled'), output_path)
+process_data(input_path, output_path)  # noqa: F821
+"""
+    assert check_code(code, "duckdb") == []
+    path = tmp_path / "input.csv"
+    frame.to_csv(path, index=False)
+    output = str(tmp_path / "out.parquet")
+
+    with SandboxPool(size=1) as pool:
+        result = pool.run(code, variables={"input_path": str(path), "output_path": output},
+                          duckdb_options={"memory_limit_bytes": 128 * 1024**2, "temp_dir": str(tmp_path / "spill")})
+
+    assert result["ok"], result["traceback"]
+    assert sorted(read_artifact(output)["doubled"]) == [2 * a for a in range(150, 300)]
@@ -0,0 +1,60 @@
+import pytest
+
+from tools.error_fingerprint import detect_loop, failing_line, fingerprint_error, normalize_message
+
+
+CODE = """import pandas as pd
+def process_data(input_path: str, output_path: str):
+    df = pd.read_csv(input_path)
+    df['ratio'] = df['amount'] / df['count']
+    df.to_csv(output_path, index=False)
+process_data(input_path, output_path)  # noqa: F821
+"""
+
+
+def _traceback(line: int, message: str) -> str:
+    return ("Traceback (most recent call last):\n"
+            '  File "/srv/app/executor.py", line 120, in run\n'
+            f'  File "<string>", line {line}, in process_data\n'
+            f"{message}\n")
+
+
+def test_volatile_values_are_normalized():
+    assert normalize_message("Unable to allocate 1.5 GiB for /tmp/run_17/data.csv at 0x7f3a") \
+        == "Unable to allocate N GiB for <ścieżka> at 0x?"
+
+
+def test_same_error_on_shifted_line_has_same_fingerprint():
+    shifted = CODE.replace("    df = pd.read_csv", "    # wczytanie\n    df = pd.read_csv")
+    first = fingerprint_error(_traceback(4, "KeyError: 'count'"), CODE)
+    second = fingerprint_error(_traceback(5, "KeyError: 'count'"), shifted)
+
+    assert first.exc_type == "KeyError"
+    assert first.location == "df['ratio'] = df['amount'] / df['count']"
+    assert first.digest == second.digest
+    assert fingerprint_error(_traceback(4, "KeyError: 'amount'"), CODE).digest != first.digest
+
+
+def test_failing_line_uses_last_generated_frame_or_static_marker():
+    assert failing_line(_traceback(4, "ValueError: x")) == 4
+    assert failing_line("Błąd Analizy Statycznej: [linia 7] Nieznana kolumna") == 7
+    assert failing_line("") is None
+
+
+def test_system_messages_use_prefix_as_type():
+    fingerprint = fingerprint_error("Błąd Walidacji Architektonicznej: brak wywołania process_data")
+    assert fingerprint.exc_type == "Błąd Walidacji Architektonicznej"
+    assert fingerprint.location == "-"
+
+
+@pytest.mark.parametrize("history, expected", [
+    ([], None),
+    (["a"], None),
+    (["a", "b"], None),
+    (["a", "a"], "identical"),
+    (["a", "b", "a"], "oscillation"),
+    (["a", "b", "c", "b"], "oscillation"),
+    (["a", "b", "c"], None),
+])
+def test_detect_loop(history, expected):
+    assert detect_loop(history) == expected
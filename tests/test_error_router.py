@@ -0,0 +1,79 @@
+import re
+
+import pytest
+
+from tools.error_router import ErrorRouter
+
+
+SCRIPT = """import pandas as pd
+def process_data(input_path: str, output_path: str):
+    \"\"\"Czyszczenie danych.\"\"\"
+    df = pd.read_csv('dane/transakcje.csv')
+    df.to_csv(output_path, index=False)
+process_data(input_path, output_path)  # noqa: F821
+"""
+
+
+@pytest.fixture
+def state(tmp_path):
+    return {"active_code_key": "generated_code", "error_context_code": SCRIPT,
+            "output_path": str(tmp_path / "wyniki" / "out.csv")}
+
+
+def test_missing_module_maps_import_to_pip_package(state):
+    decision = ErrorRouter().classify("ModuleNotFoundError: No module named 'sklearn.linear_model'", state)
+
+    assert decision["route"] == "MISSING_MODULE"
+    assert decision["tool_choice"] == "request_package_installation"
+    assert decision["tool_args"]["package_name"] == "scikit-learn"
+
+
+def test_hardcoded_input_path_is_replaced(state):
+    error = "FileNotFoundError: [Errno 2] No such file or directory: 'dane/transakcje.csv'"
+    decision = ErrorRouter().classify(error, state)
+
+    fixed = decision["tool_args"]["corrected_code"]
+    assert decision["route"] == "FILE_NOT_FOUND"
+    assert "df = pd.read_csv(input_path)" in fixed
+    compile(fixed, "<string>", "exec")
+
+
+def test_missing_output_directory_is_created_after_docstring(state):
+    error = f"FileNotFoundError: [Errno 2] No such file or directory: '{state['output_path']}'"
+    fixed = ErrorRouter().classify(error, state)["tool_args"]["corrected_code"].splitlines()
+
+    assert fixed[2].strip().startswith('"""')
+    assert fixed[3] == "    import os"
+    assert fixed[4] == "    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)"
+
+
+def test_file_errors_outside_generated_code_fall_back_to_llm(state):
+    router = ErrorRouter()
+    error = "FileNotFoundError: [Errno 2] No such file or directory: 'dane/transakcje.csv'"
+
+    assert router.classify(error, {**state, "active_code_key": "plot_generation_code"}) is None
+    assert router.classify(error.replace("transakcje", "inne"), state) is None
+    assert router.classify("KeyError: 'amount'", state) is None
+    assert router.metrics()["fallback_llm"] == 3
+
+
+def test_resource_limits_get_targeted_prompt_and_metrics(state):
+    router = ErrorRouter()
+    router.classify("ModuleNotFoundError: No module named 'yaml'", state)
+    decision = router.classify("MemoryLimitExceeded: przekroczono limit pamięci", state)
+    router.classify("ValueError: zła wartość", state)
+
+    assert decision == {"llm_prompt": "performance", "error_type": "MemoryLimitExceeded", "route": "RESOURCE_LIMIT"}
+    metrics = router.metrics()
+    assert (metrics["fast_path"], metrics["targeted_llm"], metrics["fallback_llm"]) == (1, 1, 1)
+    assert metrics["by_route"] == {"MISSING_MODULE": 1, "RESOURCE_LIMIT": 1}
+    assert metrics["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_registered_route_can_take_precedence(state):
+    router = ErrorRouter()
+    router.register({"id": "CUSTOM", "pattern": re.compile(r"No module named '(\w+)'"),
+                     "handler": lambda match, state: {"llm_prompt": "custom"}}, first=True)
+
+    assert router.classify("ModuleNotFoundError: No module named 'yaml'", state)["route"] == "CUSTOM"
+    assert ErrorRouter().metrics()["hit_rate"] is None
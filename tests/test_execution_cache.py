@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+from tools.execution_cache import ExecutionCache
+from tools.fingerprint import compute_fingerprint
+
+
+CODE = """import pandas as pd
+def process_data(input_path, output_path):
+    pd.read_csv(input_path).to_csv(output_path, index=False)
+process_data(input_path, output_path)  # noqa: F821
+"""
+SETTINGS = {"dtype_optimization": True, "dtype_min_int_bits": 32, "execution_mode": "auto",
+            "execution_backend": "auto", "column_projection": True}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExecutionCache(cache_dir=str(tmp_path / "executions"))
+
+
+def _input_key(cache, path, code=CODE, **settings):
+    signature = compute_fingerprint(path, exact=True).signature("content")
+    return cache.make_key(code, [signature], **{**SETTINGS, **settings})
+
+
+def _write(path, text: str) -> str:
+    with open(path, "w") as f:
+        f.write(text)
+    return str(path)
+
+
+def _store_result(cache, key, tmp_path, text="a\n1\n"):
+    artifact = _write(tmp_path / f"out-{key[:8]}.csv", text)
+    cache.put(key, {"node": "data_code_executor"}, artifact_path=artifact)
+
+
+def test_identical_rerun_is_a_hit(cache, tmp_path):
+    path = _write(tmp_path / "in.csv", "a\n1\n2\n")
+    key = _input_key(cache, path)
+    _store_result(cache, key, tmp_path)
+
+    # Inny zapis tego samego kodu (komentarze, formatowanie) daje ten sam klucz
+    reformatted = CODE.replace("def process_data", "# krok 1\ndef process_data")
+    assert _input_key(cache, path, code=reformatted) == key
+    assert cache.get(key)["node"] == "data_code_executor"
+
+
+def test_changed_input_is_a_miss(cache, tmp_path):
+    path = _write(tmp_path / "in.csv", "a\n1\n2\n")
+    key = _input_key(cache, path)
+    _store_result(cache, key, tmp_path)
+
+    # Ten sam rozmiar, inna treść
+    _write(path, "a\n1\n3\n")
+    changed = _input_key(cache, path)
+    assert changed != key
+    assert cache.get(changed) is None
+
+
+@pytest.mark.parametrize("setting", [{"dtype_optimization": False}, {"dtype_min_int_bits": 64},
+                                     {"execution_mode": "single"}, {"execution_backend": "duckdb"},
+                                     {"column_projection": False}])
+def test_changed_config_is_a_miss(cache, tmp_path, setting):
+    path = _write(tmp_path / "in.csv", "a\n1\n2\n")
+    _store_result(cache, _input_key(cache, path), tmp_path)
+
+    assert cache.get(_input_key(cache, path, **setting)) is None
+
+
+def test_restore_artifact_file_and_directory(cache, tmp_path):
+    _store_result(cache, "file", tmp_path, text="a\n42\n")
+    target = str(tmp_path / "restored" / "out.csv")
+    assert cache.restore_artifact("file", target)
+    assert open(target).read() == "a\n42\n"
+
+    parts = tmp_path / "parts"
+    os.makedirs(parts)
+    _write(parts / "part-0.parquet", "p0")
+    _write(parts / "part-1.parquet", "p1")
+    cache.put("dir", artifact_path=str(parts))
+    target_dir = str(tmp_path / "restored_dir")
+    os.makedirs(target_dir)
+    _write(os.path.join(target_dir, "old.parquet"), "old")
+    assert cache.restore_artifact("dir", target_dir)
+    assert sorted(os.listdir(target_dir)) == ["part-0.parquet", "part-1.parquet"]
+
+    cache.put("payload-only", {"figures_html": []})
+    assert not cache.restore_artifact("payload-only", str(tmp_path / "none.csv"))
+
+
+def test_lru_evicts_least_recently_used_entry(tmp_path):
+    cache = ExecutionCache(cache_dir=str(tmp_path / "executions"), max_bytes=2500)
+    for key in ("first", "second"):
+        _store_result(cache, key, tmp_path, text="x" * 1000)
+    os.utime(os.path.join(cache.cache_dir, "second"), (1, 1))
+    os.utime(os.path.join(cache.cache_dir, "first"), (2, 2))
+
+    _store_result(cache, "third", tmp_path, text="x" * 1000)
+    assert cache.get("second") is None
+    assert cache.get("first") is not None and cache.get("third") is not None
+    assert cache.stats["evictions"] == 1
@@ -0,0 +1,114 @@
+import base64
+import hashlib
+import os
+
+import pytest
+
+from tools.dataset_cache import DatasetCache
+from tools.fingerprint import compute_fingerprint
+from tools.io_layer import CachedObjectStore, LocalBucketBackend
+
+
+BLOCK_SIZE = 64
+
+
+def _write_csv(path, rows: int, value: int = 0) -> str:
+    with open(path, "w") as f:
+        f.write("a,b\n")
+        f.writelines(f"{i},{value}\n" for i in range(rows))
+    return str(path)
+
+
+def _rewrite_middle(path: str):
+    """Zmienia bajt w środku pliku (poza próbkowanymi blokami), zachowując rozmiar."""
+    with open(path, "r+b") as f:
+        data = bytearray(f.read())
+        middle = len(data) // 2 + 3
+        data[middle] = ord("7") if data[middle] != ord("7") else ord("8")
+        f.seek(0)
+        f.write(data)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CachedObjectStore(cache_dir=str(tmp_path / "cache"), block_size=BLOCK_SIZE, metadata_ttl=0)
+
+
+def test_exact_mode_returns_content_and_schema_hashes(tmp_path, store):
+    path = _write_csv(tmp_path / "data.csv", 500)
+    fingerprint = compute_fingerprint(path, object_store=store, exact=True, block_size=BLOCK_SIZE, sample_blocks=4)
+
+    expected = hashlib.blake2b(open(path, "rb").read(), digest_size=16).hexdigest()
+    assert fingerprint.signature("content") == expected
+    assert fingerprint.signature("schema") == fingerprint.schema_hash
+    assert fingerprint.columns == ["a", "b"]
+    # Próbkowane bloki liczone w tym samym przebiegu co w trybie próbkowanym
+    sampled = compute_fingerprint(path, object_store=store, block_size=BLOCK_SIZE, sample_blocks=4)
+    assert fingerprint.signature("sampled") == sampled.signature("sampled")
+
+
+def test_sampled_mode_never_substitutes_sample_for_content(tmp_path, store):
+    path = _write_csv(tmp_path / "data.csv", 500)
+    fingerprint = compute_fingerprint(path, object_store=store, block_size=BLOCK_SIZE, sample_blocks=4)
+
+    assert fingerprint.content_hash is None
+    with pytest.raises(ValueError):
+        fingerprint.signature("content")
+    with pytest.raises(ValueError):
+        fingerprint.signature("sample")
+
+
+def test_content_change_outside_sampled_blocks(tmp_path, store):
+    path = _write_csv(tmp_path / "data.csv", 2000)
+    before = compute_fingerprint(path, object_store=store, exact=True, block_size=BLOCK_SIZE, sample_blocks=4)
+    _rewrite_middle(path)
+    after = compute_fingerprint(path, object_store=store, exact=True, block_size=BLOCK_SIZE, sample_blocks=4)
+
+    # Próbka tej zmiany nie widzi, dokładny hash - tak; schemat bez zmian
+    assert after.signature("sampled") == before.signature("sampled")
+    assert after.signature("content") != before.signature("content")
+    assert after.signature("schema") == before.signature("schema")
+
+
+def test_schema_hash_depends_only_on_columns_and_types(tmp_path, store):
+    first = compute_fingerprint(_write_csv(tmp_path / "a.csv", 100, value=1), object_store=store)
+    second = compute_fingerprint(_write_csv(tmp_path / "b.csv", 300, value=2), object_store=store)
+    (tmp_path / "c.csv").write_text("a,c\n1,2\n")
+    other = compute_fingerprint(str(tmp_path / "c.csv"), object_store=store)
+
+    assert first.signature("schema") == second.signature("schema")
+    assert first.signature("sampled") != second.signature("sampled")
+    assert other.signature("schema") != first.signature("schema")
+
+
+def test_remote_md5_gives_content_hash_without_reading_whole_object(tmp_path):
+    class Md5Backend(LocalBucketBackend):
+        def info(self, path):
+            info = super().info(path)
+            data = open(self._local(path), "rb").read()
+            return {**info, "md5": base64.b64encode(hashlib.md5(data).digest()).decode()}
+
+        def download(self, path, local_path):
+            raise AssertionError("obiekt nie powinien być pobierany w całości")
+
+    root = tmp_path / "root"
+    os.makedirs(root / "bucket")
+    local = _write_csv(root / "bucket" / "data.csv", 1000)
+    store = CachedObjectStore(cache_dir=str(tmp_path / "cache"), block_size=BLOCK_SIZE,
+                              backend=Md5Backend(str(root)), metadata_ttl=0)
+
+    fingerprint = compute_fingerprint("gs://bucket/data.csv", object_store=store, exact=True, block_size=BLOCK_SIZE)
+    assert fingerprint.signature("content") == hashlib.md5(open(local, "rb").read()).hexdigest()
+
+
+def test_dataset_cache_upgrades_sampled_fingerprint_on_demand(tmp_path, store):
+    path = _write_csv(tmp_path / "data.csv", 500)
+    cache = DatasetCache("run", object_store=store)
+
+    sampled = cache.dataset_fingerprint(path)
+    assert sampled.content_hash is None
+    exact = cache.dataset_fingerprint(path, exact=True)
+    assert exact.content_hash is not None
+    # Dokładny odcisk zastępuje próbkowany i jest używany przez kolejne wywołania
+    assert cache.dataset_fingerprint(path) is exact
+    assert cache.dataset_fingerprint(path, exact=True) is exact
@@ -0,0 +1,67 @@
+import pytest
+
+from tools.fix_cache import FixCache, apply_patch, make_patch
+
+
+FAILING = """import pandas as pd
+def process_data(input_path: str, output_path: str):
+    df = pd.read_csv(input_path)
+    df['ratio'] = df['amount'] / df['count']
+    df.to_csv(output_path, index=False)
+process_data(input_path, output_path)  # noqa: F821
+"""
+FIXED = FAILING.replace("df['count']", "df['cnt']")
+ERROR = ('Traceback (most recent call last):\n  File "<string>", line 4, in process_data\n'
+         "KeyError: 'count'\n")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FixCache(str(tmp_path / "fixes.sqlite"))
+
+
+def test_patch_applies_to_code_shifted_elsewhere():
+    hunks = make_patch(FAILING, FIXED)
+    shifted = "# nagłówek\n# drugi komentarz\n" + FAILING
+
+    assert apply_patch(FAILING, hunks) == FIXED
+    assert apply_patch(shifted, hunks) == "# nagłówek\n# drugi komentarz\n" + FIXED
+    assert apply_patch(FAILING.replace("df['amount']", "df['value']"), hunks) is None
+
+
+def test_stored_fix_is_found_across_instances(cache, tmp_path):
+    cache.store(ERROR, FAILING, FIXED, analysis="Kolumna nazywa się `cnt`.")
+
+    hit = FixCache(str(tmp_path / "fixes.sqlite")).lookup(ERROR, FAILING)
+    assert hit["corrected_code"] == FIXED
+    assert hit["analysis"] == "Kolumna nazywa się `cnt`."
+    assert hit["confidence"] == 1.0
+    assert cache.lookup(ERROR.replace("'count'", "'amount'"), FAILING) is None
+    assert cache.stats["misses"] == 1
+
+
+def test_rejections_lower_confidence_below_threshold(cache):
+    cache.store(ERROR, FAILING, FIXED)
+    key = cache.lookup(ERROR, FAILING)["key"]
+    cache.record_outcome(key, ok=False)
+
+    assert cache.lookup(ERROR, FAILING) is None
+    assert cache.stats["low_confidence"] == 1
+    # Ta sama łatka zapisana ponownie podnosi licznik sukcesów: 2 / (2 + 1) < 0.8
+    cache.store(ERROR, FAILING, FIXED)
+    assert cache.lookup(ERROR, FAILING) is None
+    for _ in range(3):
+        cache.store(ERROR, FAILING, FIXED)
+    assert cache.lookup(ERROR, FAILING)["confidence"] == pytest.approx(5 / 6)
+
+
+def test_different_patch_replaces_entry_and_invalidate_clears(cache):
+    cache.store(ERROR, FAILING, FIXED)
+    other = FAILING.replace("df['count']", "df['count'].fillna(1)")
+    cache.store(ERROR, FAILING, other)
+    assert cache.lookup(ERROR, FAILING)["corrected_code"] == other
+
+    cache.invalidate()
+    assert cache.lookup(ERROR, FAILING) is None
+    cache.store(ERROR, FAILING, FAILING)
+    assert cache.stats["stores"] == 2
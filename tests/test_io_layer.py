@@ -0,0 +1,159 @@
+import os
+
+import pandas as pd
+import pytest
+
+from tools.io_layer import CachedObjectStore, LocalBucketBackend
+
+
+BLOCK_SIZE = 64
+
+
+class CountingBackend(LocalBucketBackend):
+    """LocalBucketBackend zapamiętujący każde żądanie zakresowe i pobranie całego obiektu."""
+
+    def __init__(self, root: str):
+        super().__init__(root)
+        self.range_requests = []
+        self.downloads = []
+
+    def read_range(self, path, start, end):
+        self.range_requests.append((path, start, end))
+        return super().read_range(path, start, end)
+
+    def download(self, path, local_path):
+        self.downloads.append(path)
+        super().download(path, local_path)
+
+
+def _write_object(root, key: str, data: bytes) -> str:
+    local = os.path.join(root, "bucket", key)
+    os.makedirs(os.path.dirname(local), exist_ok=True)
+    with open(local, "wb") as f:
+        f.write(data)
+    return f"gs://bucket/{key}"
+
+
+@pytest.fixture
+def bucket(tmp_path):
+    return str(tmp_path / "bucket_root")
+
+
+@pytest.fixture
+def backend(bucket):
+    return CountingBackend(bucket)
+
+
+@pytest.fixture
+def store(tmp_path, backend):
+    return CachedObjectStore(cache_dir=str(tmp_path / "cache"), block_size=BLOCK_SIZE, readahead_blocks=2,
+                             backend=backend, metadata_ttl=0)
+
+
+def test_range_read_spanning_blocks_returns_exact_bytes(store, backend, bucket):
+    data = bytes(range(256)) * 4
+    path = _write_object(bucket, "data.bin", data)
+
+    assert store.read_range(path, 10, 100) == data[10:110]
+    assert store.read_range(path, 1000, 100) == data[1000:]
+    assert store.read_range(path, len(data), 10) == b""
+    assert backend.downloads == []
+
+
+def test_readahead_fetches_following_blocks_in_one_request(store, backend, bucket):
+    data = os.urandom(BLOCK_SIZE * 10)
+    path = _write_object(bucket, "data.bin", data)
+
+    assert store.read_range(path, 0, 10) == data[:10]
+    assert backend.range_requests == [(path, 0, 3 * BLOCK_SIZE)]
+
+    # Bloki 1-2 przyszły z wyprzedzeniem - kolejne odczyty nie pytają backendu
+    assert store.read_range(path, BLOCK_SIZE, 2 * BLOCK_SIZE) == data[BLOCK_SIZE:3 * BLOCK_SIZE]
+    assert len(backend.range_requests) == 1
+    assert store.stats["hits"] == 1
+
+    # Readahead nie wychodzi poza koniec obiektu
+    store.read_range(path, 9 * BLOCK_SIZE, 10)
+    assert backend.range_requests[-1] == (path, 9 * BLOCK_SIZE, 10 * BLOCK_SIZE)
+
+
+def test_block_writes_leave_no_partial_files(store, bucket):
+    path = _write_object(bucket, "data.bin", os.urandom(BLOCK_SIZE * 5))
+    store.read_range(path, 0, 10)
+
+    for dirpath, _, filenames in os.walk(store.cache_dir):
+        assert not [name for name in filenames if name.endswith(".part")]
+        if os.path.basename(dirpath) == "blocks":
+            assert sorted(filenames) == ["0", "1", "2"]
+
+
+def test_new_object_version_invalidates_cached_data(store, backend, bucket):
+    path = _write_object(bucket, "data.csv", b"a,b\n1,2\n")
+    assert store.read_range(path, 0, 100) == b"a,b\n1,2\n"
+    old_local = store.local_path(path)
+
+    local = os.path.join(bucket, "bucket", "data.csv")
+    with open(local, "wb") as f:
+        f.write(b"a,b\n3,4\n5,6\n")
+    stat = os.stat(local)
+    os.utime(local, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert store.read_range(path, 0, 100) == b"a,b\n3,4\n5,6\n"
+    new_local = store.local_path(path)
+    assert new_local != old_local
+    assert open(new_local, "rb").read() == b"a,b\n3,4\n5,6\n"
+    assert len(backend.downloads) == 2
+
+
+def test_metadata_is_reused_within_ttl(tmp_path, backend, bucket):
+    store = CachedObjectStore(cache_dir=str(tmp_path / "cache"), block_size=BLOCK_SIZE, backend=backend, metadata_ttl=3600)
+    path = _write_object(bucket, "data.csv", b"a\n1\n")
+    version = store.version(path)
+
+    local = os.path.join(bucket, "bucket", "data.csv")
+    with open(local, "wb") as f:
+        f.write(b"a\n1\n2\n")
+    assert store.version(path) == version
+
+
+def test_lru_evicts_least_recently_used_entries(tmp_path, backend, bucket):
+    store = CachedObjectStore(cache_dir=str(tmp_path / "cache"), max_bytes=250, block_size=BLOCK_SIZE,
+                              backend=backend, metadata_ttl=0)
+    paths = [_write_object(bucket, f"part{i}.bin", os.urandom(100)) for i in range(3)]
+
+    first, second = store.local_path(paths[0]), store.local_path(paths[1])
+    # Pierwszy wpis był użyty później niż drugi
+    os.utime(os.path.dirname(second), (1, 1))
+    os.utime(os.path.dirname(first), (2, 2))
+
+    third = store.local_path(paths[2])
+    assert os.path.exists(first) and os.path.exists(third)
+    assert not os.path.exists(second)
+    assert store.stats["evictions"] == 1
+
+    # Wpis usunięty przez LRU jest pobierany ponownie
+    assert store.local_path(paths[1]) == second
+    assert backend.downloads.count(paths[1]) == 2
+
+
+def test_full_copy_replaces_blocks(store, backend, bucket):
+    data = os.urandom(BLOCK_SIZE * 4)
+    path = _write_object(bucket, "data.bin", data)
+    store.read_range(path, 0, 10)
+    entry_dir = os.path.dirname(store.local_path(path))
+
+    assert not os.path.exists(os.path.join(entry_dir, "blocks"))
+    requests = len(backend.range_requests)
+    assert store.read_range(path, BLOCK_SIZE * 3, BLOCK_SIZE) == data[BLOCK_SIZE * 3:]
+    assert len(backend.range_requests) == requests
+
+
+def test_csv_preview_reads_only_file_head(store, backend, bucket):
+    rows = "\n".join(f"{i},{i * 2}" for i in range(1000))
+    path = _write_object(bucket, "data.csv", f"a,b\n{rows}\n".encode())
+
+    assert store.read_csv_header(path) == ["a", "b"]
+    preview = store.read_csv_preview(path, 5)
+    pd.testing.assert_frame_equal(preview, pd.DataFrame({"a": range(5), "b": range(0, 10, 2)}))
+    assert backend.downloads == []
+    assert sum(end - start for _, start, end in backend.range_requests) < len(rows)
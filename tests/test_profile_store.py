@@ -0,0 +1,69 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import tools.profile_store as profile_store_module
+from tools.column_profiler import profile_chunks
+from tools.dataset_cache import DatasetCache
+from tools.io_layer import CachedObjectStore
+from tools.profile_store import ProfileStore
+
+
+@pytest.fixture
+def profile():
+    frame = pd.DataFrame({"amount": np.arange(100, dtype=np.float64), "when": pd.date_range("2024-01-01", periods=100)})
+    return profile_chunks([frame]).to_dict()
+
+
+def test_profile_round_trip_keeps_numbers_and_quantile_keys(tmp_path, profile):
+    store = ProfileStore(str(tmp_path / "profiles.sqlite"))
+    store.put("sig", "data.csv", profile)
+
+    restored = ProfileStore(str(tmp_path / "profiles.sqlite")).get("sig")
+    assert restored["row_count"] == 100
+    assert restored["columns"]["amount"]["quantiles"].keys() == {0.25, 0.5, 0.75}
+    assert restored["columns"]["amount"]["mean"] == pytest.approx(49.5)
+    # Znaczniki czasu (spoza JSON) zapisane jako tekst
+    assert restored["columns"]["when"]["min"].startswith("2024-01-01")
+
+
+def test_missing_signature_and_invalidation(tmp_path, profile):
+    store = ProfileStore(str(tmp_path / "profiles.sqlite"))
+    assert store.get("none") is None
+    store.put("a", "a.csv", profile)
+    store.put("b", "b.csv", profile)
+
+    store.invalidate("a")
+    assert store.get("a") is None and store.get("b") is not None
+    store.invalidate()
+    assert store.get("b") is None
+    assert store.stats == {"hits": 1, "misses": 3}
+
+
+def test_profiles_from_older_schema_version_are_ignored(tmp_path, profile, monkeypatch):
+    path = str(tmp_path / "profiles.sqlite")
+    ProfileStore(path).put("sig", "data.csv", profile)
+    monkeypatch.setattr(profile_store_module, "PROFILE_SCHEMA_VERSION", profile_store_module.PROFILE_SCHEMA_VERSION + 1)
+
+    assert ProfileStore(path).get("sig") is None
+
+
+def test_dataset_cache_reuses_profile_across_runs_until_data_changes(tmp_path, monkeypatch):
+    data = tmp_path / "data.csv"
+    pd.DataFrame({"a": range(50)}).to_csv(data, index=False)
+    objects = CachedObjectStore(cache_dir=str(tmp_path / "objects"))
+    store = ProfileStore(str(tmp_path / "profiles.sqlite"))
+    first = DatasetCache("run-1", object_store=objects, profile_store=store).dataset_profile(str(data), max_workers=1)
+
+    calls = []
+    monkeypatch.setattr("tools.dataset_cache.profile_file", lambda *a, **k: calls.append(a) or profile_chunks([]))
+    assert DatasetCache("run-2", object_store=objects, profile_store=store).dataset_profile(str(data)) == first
+    assert calls == []
+
+    pd.DataFrame({"a": range(51)}).to_csv(data, index=False)
+    DatasetCache("run-3", object_store=objects, profile_store=store).dataset_profile(str(data))
+    assert len(calls) == 1
+    with sqlite3.connect(store.db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0] == 2
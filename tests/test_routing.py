@@ -0,0 +1,99 @@
+from typing import Any, Dict, List, Optional, TypedDict
+
+from langgraph.graph import END, StateGraph
+
+from agents.routing import CONDITIONAL_ROUTING_MAP, REPAIR_ROUTING_MAP, make_master_router, succeeded
+
+
+class RoutingState(TypedDict, total=False):
+    error_message: Optional[str]
+    failing_node: Optional[str]
+    error_context_code: Optional[str]
+    tool_choice: Optional[str]
+    tool_args: Optional[Dict[str, Any]]
+    correction_attempts: int
+    generated_code: str
+    visited: List[str]
+
+
+def _visit(state, name: str) -> List[str]:
+    return [*state.get("visited", []), name]
+
+
+def _build_graph(executor_failures: int, max_attempts: int = 3):
+    """Graf o tym samym okablowaniu co w main.ipynb, z węzłami zastąpionymi prostymi funkcjami."""
+    runs = {"executor": 0}
+
+    def executor(state):
+        runs["executor"] += 1
+        if runs["executor"] <= executor_failures:
+            return {"error_message": "KeyError: 'kolumna'", "failing_node": "data_code_executor",
+                    "error_context_code": state["generated_code"],
+                    "correction_attempts": state.get("correction_attempts", 0) + 1,
+                    "visited": _visit(state, "data_code_executor")}
+        return succeeded({"visited": _visit(state, "data_code_executor")})
+
+    def debugger(state):
+        return {"error_message": None, "tool_choice": "propose_code_fix",
+                "tool_args": {"corrected_code": "print('ok')"}, "visited": _visit(state, "universal_debugger")}
+
+    def apply_code_fix(state):
+        return {"generated_code": state["tool_args"]["corrected_code"], "error_message": None,
+                "tool_choice": None, "tool_args": None, "visited": _visit(state, "apply_code_fix")}
+
+    def step(name):
+        return lambda state: {"visited": _visit(state, name)}
+
+    router = make_master_router(max_attempts)
+    workflow = StateGraph(RoutingState)
+    workflow.add_node("data_code_executor", executor)
+    workflow.add_node("universal_debugger", debugger)
+    workflow.add_node("apply_code_fix", apply_code_fix)
+    for name in ("summary_analyst", "human_escalation"):
+        workflow.add_node(name, step(name))
+    workflow.set_entry_point("data_code_executor")
+
+    workflow.add_conditional_edges("data_code_executor", router, {**CONDITIONAL_ROUTING_MAP, "continue": "summary_analyst"})
+    workflow.add_conditional_edges("apply_code_fix", router,
+                                   {key: target for key, target in REPAIR_ROUTING_MAP.items()
+                                    if target in ("data_code_executor", "universal_debugger", "human_escalation")})
+    workflow.add_conditional_edges("universal_debugger", router, {
+        "apply_code_fix": "apply_code_fix",
+        "human_approval": "human_escalation",
+        "human_escalation": "human_escalation",
+        "universal_debugger": "human_escalation",
+    })
+    workflow.add_edge("summary_analyst", END)
+    workflow.add_edge("human_escalation", END)
+    return workflow.compile(), runs
+
+
+def test_repair_then_successful_rerun_continues_main_path():
+    app, runs = _build_graph(executor_failures=1)
+    final = app.invoke({"generated_code": "df['kolumna']", "correction_attempts": 0, "visited": []},
+                       {"recursion_limit": 20})
+
+    assert final["visited"] == ["data_code_executor", "universal_debugger", "apply_code_fix",
+                                "data_code_executor", "summary_analyst"]
+    assert runs["executor"] == 2
+    assert final["failing_node"] is None
+    assert final["error_context_code"] is None
+
+
+def test_repeated_failures_escalate_after_attempt_limit():
+    app, runs = _build_graph(executor_failures=10, max_attempts=2)
+    final = app.invoke({"generated_code": "df['kolumna']", "correction_attempts": 0, "visited": []},
+                       {"recursion_limit": 30})
+
+    assert final["visited"][-1] == "human_escalation"
+    assert runs["executor"] == 2
+
+
+def test_router_returns_to_failing_node_without_mutating_state():
+    router = make_master_router(3)
+    state = {"error_message": None, "tool_choice": None, "failing_node": "static_analyzer"}
+
+    assert router(state) == "static_analyzer"
+    assert state["failing_node"] == "static_analyzer"
+    assert router({**state, **succeeded()}) == "continue"
+    assert REPAIR_ROUTING_MAP["summary_analyst_node"] == "summary_analyst"
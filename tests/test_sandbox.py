@@ -0,0 +1,127 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from tools.sandbox import ExecutionLimits, SandboxPool
+
+
+@pytest.fixture
+def pool():
+    with SandboxPool(size=1) as pool:
+        yield pool
+
+
+def test_wall_time_limit_starts_after_worker_is_ready(pool):
+    # Pierwsze zadanie czeka na start procesu (importy z forkservera) - ten czas nie wlicza się do limitu
+    result = pool.run("import time\ntime.sleep(0.6)\nx = 1", collect=["x"], limits=ExecutionLimits(wall_time_s=1.0))
+
+    assert result["ok"], result["traceback"]
+    assert result["outputs"]["x"] == 1
+    assert pool.metrics()["startup_s"]["count"] == 1
+
+
+def test_wall_time_breach_kills_and_replaces_worker(pool):
+    result = pool.run("import time\ntime.sleep(30)", limits=ExecutionLimits(wall_time_s=0.5))
+
+    assert not result["ok"]
+    assert result["error_type"] == "TimeoutError"
+    assert result["limit_exceeded"] == "wall_time"
+    assert pool.stats["recycled_by_limit"] == 1
+    assert pool.run("y = 2", collect=["y"])["outputs"]["y"] == 2
+
+
+def test_concurrent_ensure_size_spawns_each_worker_once(pool):
+    threads = [threading.Thread(target=pool.ensure_size, args=(3,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert pool.size == 3
+    assert pool.stats["workers_started"] == 3
+
+
+def test_each_job_gets_fresh_scope_and_captured_stdout(pool):
+    first = pool.run("x = 41\nprint('komunikat')", collect=["x"])
+    second = pool.run("y = globals().get('x')", collect=["y"])
+
+    assert first["outputs"]["x"] == 41
+    assert first["stdout"] == "komunikat\n"
+    assert second["outputs"]["y"] is None
+    assert first["worker"]["pid"] == second["worker"]["pid"]
+
+
+def test_frames_are_loaded_inside_worker(pool, tmp_path):
+    path = tmp_path / "data.csv"
+    pd.DataFrame({"a": [1, 2, 3], "b": [4, 5, 6]}).to_csv(path, index=False)
+
+    result = pool.run("total = int(df['a'].sum())\ncolumns = list(df.columns)", collect=["total", "columns"],
+                      frames={"df": {"path": str(path), "columns": ["a"]}})
+    assert result["outputs"] == {"total": 6, "columns": ["a"]}
+
+
+def test_errors_are_reported_not_raised(pool):
+    result = pool.run("raise KeyError('kolumna')")
+    assert not result["ok"]
+    assert result["error_type"] == "KeyError"
+    assert "KeyError: 'kolumna'" in result["traceback"]
+
+    unpicklable = pool.run("import threading\nlock = threading.Lock()", collect=["lock"])
+    assert unpicklable["error_type"] == "PicklingError"
+    assert pool.run("z = 1", collect=["z"])["ok"]
+
+
+def test_worker_crash_is_replaced(pool):
+    result = pool.run("import os\nos._exit(3)")
+
+    assert result["error_type"] == "WorkerCrashed"
+    assert "kod wyjścia: 3" in result["traceback"]
+    assert pool.stats["crashes"] == 1
+    assert pool.run("z = 1", collect=["z"])["outputs"]["z"] == 1
+
+
+def test_worker_is_recycled_after_max_jobs():
+    with SandboxPool(size=1, max_jobs_per_worker=2) as pool:
+        pids = [pool.run("pass")["worker"]["pid"] for _ in range(3)]
+
+        assert pids[0] == pids[1] != pids[2]
+        assert pool.stats["recycled_by_jobs"] == 1
+        assert pool.metrics()["jobs"] == 3
+
+
+def test_memory_limit_is_reported_as_limit_breach(pool):
+    result = pool.run("data = bytearray(2 * 1024**3)", limits=ExecutionLimits(memory_bytes=256 * 1024**2))
+
+    assert not result["ok"]
+    assert result["error_type"] == "MemoryLimitExceeded"
+    assert result["limit_exceeded"] == "memory"
+    assert pool.stats["limit_breaches"]["memory"] == 1
+    # Limity obowiązują tylko w jednym wykonaniu - następne zadanie działa bez nich
+    assert pool.run("data = bytearray(300 * 1024**2)\nn = len(data)", collect=["n"])["ok"]
+
+
+def test_cpu_time_limit_stops_busy_loop(pool):
+    result = pool.run("while True:\n    pass", limits=ExecutionLimits(cpu_time_s=1, wall_time_s=30))
+
+    assert result["error_type"] == "CpuTimeLimitExceeded"
+    assert result["limit_exceeded"] == "cpu_time"
+    assert result["usage"]["cpu_s"] >= 1
+
+
+def test_usage_is_reported_for_successful_jobs(pool):
+    result = pool.run("total = sum(range(2_000_000))", collect=["total"])
+
+    assert result["usage"]["cpu_s"] > 0
+    assert result["usage"]["peak_rss_bytes"] > 0
+    assert result["usage"]["wall_s"] == result["exec_s"]
+
+
+def test_cancel_event_kills_running_job(pool):
+    cancel_event = threading.Event()
+    threading.Timer(0.5, cancel_event.set).start()
+    result = pool.run("import time\ntime.sleep(30)", cancel_event=cancel_event)
+
+    assert result["error_type"] == "Cancelled"
+    assert result["roundtrip_s"] < 10
+    assert pool.stats["recycled_by_cancel"] == 1
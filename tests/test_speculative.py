@@ -0,0 +1,126 @@
+import threading
+import time
+
+from tools.sandbox import SandboxPool
+from tools.code_rules import check_code
+from tools.speculative import chosen_result, race
+
+
+def _finishes_after(delay: float, value):
+    def task(cancel_event: threading.Event):
+        if cancel_event.wait(delay):
+            return "anulowany"
+        return value
+    return task
+
+
+def test_first_accepted_result_wins_and_losers_are_cancelled():
+    observed = []
+
+    def loser(cancel_event: threading.Event):
+        observed.append(cancel_event.wait(5))
+        return None
+
+    winner, results = race([loser, _finishes_after(0.05, "ok")], accept=lambda r: r == "ok")
+
+    assert winner == 1
+    assert results[1] == "ok"
+    # Przegrany dostał sygnał anulowania i zakończył się w czasie karencji
+    assert observed == [True]
+
+
+def test_rejected_results_and_exceptions_do_not_win():
+    def failing(cancel_event):
+        raise RuntimeError("błąd kandydata")
+
+    winner, results = race([failing, _finishes_after(0.01, "zły"), _finishes_after(0.05, "ok")],
+                           accept=lambda r: r == "ok")
+
+    assert winner == 2
+    assert results[:2] == [None, "zły"]
+
+
+def test_tasks_not_started_are_dropped():
+    started = []
+
+    def task(index):
+        def run(cancel_event):
+            started.append(index)
+            return None if cancel_event.wait(0.1) else index
+        return run
+
+    winner, results = race([task(i) for i in range(5)], accept=lambda r: r is not None, max_workers=1)
+
+    assert winner == 0
+    assert len(started) <= 2
+    assert results == [0, None, None, None, None]
+
+
+def test_blocked_loser_waits_at_most_the_grace_period():
+    release = threading.Event()
+
+    def blocked(cancel_event):
+        release.wait(10)  # np. żądanie HTTP, które nie sprawdza zdarzenia
+        return "późny"
+
+    started = time.perf_counter()
+    winner, results = race([blocked, _finishes_after(0.01, "ok")], accept=lambda r: r == "ok", cancel_grace_s=0.3)
+    elapsed = time.perf_counter() - started
+    release.set()
+
+    assert winner == 1
+    assert results[0] is None
+    assert elapsed < 2
+
+
+def test_sandbox_loser_is_killed_when_candidate_wins():
+    with SandboxPool(size=2) as pool:
+        def candidate(code):
+            return lambda cancel_event: pool.run(code, collect=["x"], cancel_event=cancel_event)
+
+        started = time.perf_counter()
+        winner, results = race([candidate("import time\ntime.sleep(30)\nx = 'wolny'"), candidate("x = 'szybki'")],
+                               accept=lambda r: r["ok"])
+        elapsed = time.perf_counter() - started
+
+        assert winner == 1
+        assert results[1]["outputs"]["x"] == "szybki"
+        assert results[0] is None
+        assert elapsed < 10
+        assert pool.stats["recycled_by_cancel"] == 1
+        assert pool.run("x = 1", collect=["x"])["ok"]
+
+
+def test_first_generated_candidate_is_kept_when_none_passes():
+    assert chosen_result(None, [None, {"code": "a"}, {"code": "b"}]) == {"code": "a"}
+    assert chosen_result(2, [{"code": "a"}, None, {"code": "b"}]) == {"code": "b"}
+    assert chosen_result(None, [None, None]) is None
+
+
+def test_code_candidates_are_checked_by_rules_and_sandbox(tmp_path):
+    entry = "def process_data(input_path: str, output_path: str):\n    {body}\nprocess_data(input_path, output_path)  # noqa: F821\n"
+    candidates = [
+        "import argparse\n" + entry.format(body="pass"),  # łamie reguły architektury
+        entry.format(body="raise ValueError('zły wynik')"),  # nie przechodzi próby
+        # Poprawny kandydat kończy się ostatni - wyniki przegranych są już znane
+        entry.format(body="__import__('time').sleep(1); open(output_path, 'w').write('ok')"),
+    ]
+
+    with SandboxPool(size=3) as pool:
+        def make_task(index, code):
+            def task(cancel_event):
+                violations = check_code(code)
+                if violations:
+                    return {"code": code, "error": " ".join(map(str, violations))}
+                output_path = str(tmp_path / f"out_{index}.txt")
+                result = pool.run(code, variables={"input_path": "", "output_path": output_path}, cancel_event=cancel_event)
+                return {"code": code, "error": None if result["ok"] else result["traceback"]}
+            return task
+
+        winner, results = race([make_task(i, code) for i, code in enumerate(candidates)],
+                               accept=lambda r: r is not None and r["error"] is None)
+
+    assert winner == 2
+    assert "argparse" in results[0]["error"]
+    assert "zły wynik" in results[1]["error"]
+    assert chosen_result(winner, results)["code"] == candidates[2]
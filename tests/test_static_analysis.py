@@ -0,0 +1,122 @@
+import pytest
+
+from tools.code_rules import check_code
+from tools.static_analysis import (analyze_code, apply_fixers, fix_column_case, fix_entry_call, fix_forbidden_imports,
+                                   fix_markdown_fences, fix_stray_prefixes)
+
+
+COLUMNS = ["amount", "merchant"]
+
+
+def _script(body: str) -> str:
+    lines = "\n".join(f"    {line}" for line in body.strip().splitlines())
+    return f"""import pandas as pd
+def process_data(input_path: str, output_path: str):
+    df = pd.read_csv(input_path)
+{lines}
+    df.to_csv(output_path, index=False)
+process_data(input_path, output_path)  # noqa: F821
+"""
+
+
+def _column_findings(code: str):
+    return [f for f in analyze_code(code, known_columns=COLUMNS) if f.check == "UNKNOWN_COLUMN"]
+
+
+@pytest.mark.parametrize("body", [
+    "df.loc[df.amount > 100, 'is_large'] = 1\ndf['flag'] = df['is_large'] * 2",
+    "df.at[0, 'first'] = True\nprint(df['first'])",
+    "df.insert(0, 'row_id', range(len(df)))\nprint(df['row_id'])",
+    "df.insert(loc=0, column='row_id', value=0)\nprint(df['row_id'])",
+    "df = df.assign(**{'total': df['amount'] * 2})\nprint(df['total'])",
+    "df = df.assign(total=df['amount'] * 2)\nprint(df['total'])",
+    "df[['a', 'b']] = 0\nprint(df['a'], df['b'])",
+])
+def test_columns_created_by_the_code_are_known(body):
+    assert _column_findings(_script(body)) == []
+
+
+def test_unknown_column_with_static_schema_is_an_error():
+    findings = _column_findings(_script("print(df['amout'])"))
+    assert [(f.severity, f.line) for f in findings] == [("error", 4)]
+
+
+@pytest.mark.parametrize("body", [
+    "for name in ['x', 'y']:\n    df[name] = 0\nprint(df['x'])",
+    "df[f'{\"amount\"}_log'] = 0\nprint(df['amount_log'])",
+    "df.loc[:, [c + '_2' for c in ['x']]] = 0\nprint(df['x_2'])",
+    "df.insert(0, 'id' + '2', 0)\nprint(df['id2'])",
+    "rates = pd.read_csv('rates.csv')\nprint(rates['rate'])",
+    "extra = pd.DataFrame({'k': [1]})\nprint(extra['k'])",
+])
+def test_unresolvable_schema_downgrades_unknown_columns_to_warnings(body):
+    findings = _column_findings(_script(body))
+    assert findings and all(f.severity == "warning" for f in findings)
+
+
+def test_stray_prefix_removed_only_on_failing_line():
+    code = _script("$# Krok 1: filtrowanie\ndf = df[df['amount'] > 0]\n_# Krok 2\nprint(len(df))")
+    fixed = fix_stray_prefixes(code, "processing", COLUMNS)
+
+    assert "    # Krok 1: filtrowanie" in fixed.splitlines()
+    assert "    # Krok 2" in fixed.splitlines()
+    assert not [f for f in analyze_code(fixed, known_columns=COLUMNS) if f.severity == "error"]
+
+
+def test_stray_prefix_inside_string_literal_is_kept():
+    code = _script('''query = """
+SELECT amount
+:# komentarz w szablonie
+_# tekst, nie kod
+"""
+print(query)''')
+
+    assert fix_stray_prefixes(code, "processing", COLUMNS) == code.rstrip("\n")
+
+
+def test_markdown_fences_are_dropped():
+    code = "```python\n" + _script("print(len(df))") + "```\n"
+    assert fix_markdown_fences(code, "processing", None) == _script("print(len(df))").rstrip("\n")
+
+
+def test_entry_call_replaces_main_block():
+    code = _script("print(len(df))").replace("process_data(input_path, output_path)  # noqa: F821\n",
+                                             "if __name__ == '__main__':\n    process_data('in.csv', 'out.csv')\n")
+    fixed = fix_entry_call(code, "processing", None)
+
+    assert fixed.endswith("\nprocess_data(input_path, output_path)  # noqa: F821\n")
+    assert "__main__" not in fixed
+    assert check_code(fixed) == []
+
+
+def test_main_block_with_own_logic_is_left_to_debugger():
+    code = _script("print(len(df))") + "if __name__ == '__main__':\n    x = 1\n    process_data(x, x)\n"
+    assert fix_entry_call(code, "processing", None) == code
+
+
+def test_column_case_fixed_only_for_unambiguous_match():
+    code = _script("print(df['Amount '], df['MERCHANT'], df['missing'])")
+    fixed = fix_column_case(code, "processing", COLUMNS)
+
+    assert "print(df['amount'], df['merchant'], df['missing'])" in fixed
+    assert fix_column_case(code, "processing", ["Merchant", "merchant"]).count("'MERCHANT'") == 1
+
+
+def test_only_unused_forbidden_imports_are_removed():
+    unused = "import argparse\n" + _script("print(len(df))")
+    used = "import argparse\n" + _script("print(argparse.Namespace())")
+
+    assert "argparse" not in fix_forbidden_imports(unused, "processing", None)
+    assert fix_forbidden_imports(used, "processing", None) == used.rstrip("\n")
+
+
+def test_apply_fixers_repairs_combined_defects():
+    code = "```python\nimport argparse\n" + _script("$# Krok 1\nprint(df['AMOUNT'])").replace(
+        "process_data(input_path, output_path)  # noqa: F821", "process_data(input_path, output_path)") + "```"
+    fixed, applied = apply_fixers(code, known_columns=COLUMNS)
+
+    assert applied == ["fix_markdown_fences", "fix_stray_prefixes", "fix_entry_call", "fix_column_case",
+                       "fix_forbidden_imports"]
+    assert check_code(fixed) == []
+    assert not [f for f in analyze_code(fixed, known_columns=COLUMNS) if f.severity == "error"]
+    assert apply_fixers(fixed, known_columns=COLUMNS) == (fixed, [])
@@ -0,0 +1,33 @@
+from tools.step_dag import entry_read_options, parse_steps
+
+
+STEP_SCRIPT = """import pandas as pd
+STEPS = [{"name": "step_1_clean", "reads": ["a"], "writes": ["a"]}]
+def step_1_clean(df: pd.DataFrame) -> pd.DataFrame:
+    return df.assign(a=df["a"].fillna(0))
+def process_data(input_path: str, output_path: str):
+    df = READ
+    df = step_1_clean(df)
+    df.to_parquet(output_path, index=False)
+process_data(input_path, output_path)  # noqa: F821
+"""
+
+
+def test_plain_read_allows_step_mode():
+    code = STEP_SCRIPT.replace("READ", "pd.read_csv(input_path)")
+    assert parse_steps(code)[0]["name"] == "step_1_clean"
+    assert entry_read_options(code) == []
+    assert entry_read_options(STEP_SCRIPT.replace("READ", "read_optimized(input_path)")) == []
+
+
+def test_read_arguments_are_reported():
+    assert entry_read_options(STEP_SCRIPT.replace("READ", "pd.read_csv(input_path, sep=';', parse_dates=['d'])")) == ["sep", "parse_dates"]
+    assert entry_read_options(STEP_SCRIPT.replace("READ", "read_optimized(input_path, **options)")) == ["**kwargs"]
+    assert entry_read_options(STEP_SCRIPT.replace("READ", "pd.read_csv(input_path, ';')")) == ["read_csv: argumenty pozycyjne"]
+
+
+def test_reads_outside_process_data_are_ignored():
+    code = STEP_SCRIPT.replace("READ", "pd.read_csv(input_path)").replace(
+        "def step_1_clean(df: pd.DataFrame) -> pd.DataFrame:\n",
+        "def step_1_clean(df: pd.DataFrame) -> pd.DataFrame:\n    rates = pd.read_csv('rates.csv', sep=';')\n")
+    assert entry_read_options(code) == []
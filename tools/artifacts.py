@@ -0,0 +1,193 @@
+import io
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Iterator, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+# =================================================================================
+# Warstwa artefaktów pośrednich: przetworzone dane przekazywane między węzłami
+# w formacie kolumnowym (Parquet / Arrow IPC) zamiast CSV. Odczyt odbywa się przez
+# memory-mapping i tylko dla potrzebnych kolumn; eksport do CSV jest opcjonalny.
+# =================================================================================
+
+PARQUET_MAGIC = b"PAR1"
+ARROW_MAGIC = b"ARROW1"
+QUOTE_SCAN_BLOCK_SIZE = 4 * 1024**2
+
+
+def detect_format(path: str) -> str:
+    """Rozpoznaje format artefaktu: 'parquet', 'arrow' lub 'csv' (po zawartości, a w drugiej kolejności po rozszerzeniu)."""
+    if os.path.isdir(path):
+        return "parquet"
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            magic = f.read(6)
+        if magic[:4] == PARQUET_MAGIC:
+            return "parquet"
+        if magic == ARROW_MAGIC:
+            return "arrow"
+        return "csv"
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".parquet", ".pq"):
+        return "parquet"
+    if extension in (".arrow", ".feather", ".ipc"):
+        return "arrow"
+    return "csv"
+
+
+def _dataset(path: str) -> ds.Dataset:
+    fmt = detect_format(path)
+    partitioning = "hive" if os.path.isdir(path) else None
+    return ds.dataset(path, format="ipc" if fmt == "arrow" else "parquet", partitioning=partitioning)
+
+
+def write_artifact(df: pd.DataFrame, path: str, fmt: Optional[str] = None,
+                   partition_cols: Optional[List[str]] = None, n_parts: int = 1) -> str:
+    """
+    Zapisuje ramkę jako artefakt. Dla Parquet można podać `partition_cols` (układ hive)
+    albo `n_parts > 1` - wtedy plik jest dzielony na części zapisywane równolegle w katalogu `path`.
+    """
+    fmt = fmt or detect_format(path)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+        return path
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if fmt == "arrow":
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return path
+
+    if partition_cols:
+        pq.write_to_dataset(table, root_path=path, partition_cols=partition_cols)
+    elif n_parts > 1 and table.num_rows > n_parts:
+        os.makedirs(path, exist_ok=True)
+        rows_per_part = -(-table.num_rows // n_parts)
+        slices = [table.slice(i * rows_per_part, rows_per_part) for i in range(n_parts)]
+        with ThreadPoolExecutor(max_workers=n_parts) as pool:
+            list(pool.map(lambda item: pq.write_table(item[1], os.path.join(path, f"part-{item[0]:05d}.parquet")),
+                          enumerate(slices)))
+    else:
+        pq.write_table(table, path)
+    return path
+
+
+def read_artifact(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Wczytuje artefakt (memory-mapping dla formatów kolumnowych), opcjonalnie tylko wybrane kolumny."""
+    fmt = detect_format(path)
+    if fmt == "csv":
+        return pd.read_csv(path, usecols=columns)
+    if fmt == "arrow":
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        return (table.select(columns) if columns is not None else table).to_pandas()
+    if os.path.isdir(path):
+        return _dataset(path).to_table(columns=columns).to_pandas()
+    return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def read_artifact_columns(path: str) -> List[str]:
+    """Zwraca nazwy kolumn bez wczytywania danych (schemat Parquet/Arrow lub nagłówek CSV)."""
+    if detect_format(path) == "csv":
+        return pd.read_csv(path, nrows=0).columns.tolist()
+    return list(_dataset(path).schema.names)
+
+
+def read_artifact_schema(path: str) -> Dict[str, str]:
+    """Zwraca słownik kolumna -> typ ze schematu artefaktu kolumnowego (bez wczytywania danych)."""
+    return {field.name: str(field.type) for field in _dataset(path).schema}
+
+
+def iter_artifact_batches(path: str, batch_size: int = 100_000, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """Strumieniowo zwraca artefakt w kawałkach ramek pandas."""
+    if detect_format(path) == "csv":
+        yield from pd.read_csv(path, chunksize=batch_size, usecols=columns)
+        return
+    for batch in _dataset(path).to_batches(columns=columns, batch_size=batch_size):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def csv_byte_ranges(path: str, n_ranges: int) -> List[Tuple[int, int]]:
+    """Dzieli plik CSV na `n_ranges` przedziałów bajtów [start, end) do równoległego przetwarzania."""
+    size = os.path.getsize(path)
+    step = max(1, size // n_ranges)
+    bounds = list(range(0, size, step))[:n_ranges] + [size]
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+
+def csv_has_quoted_newlines(path: str, block_size: int = QUOTE_SCAN_BLOCK_SIZE) -> bool:
+    """
+    Czy któreś pole CSV w cudzysłowach zawiera znak nowej linii (parzystość cudzysłowów liczona blokami;
+    podwojony cudzysłów `""` jej nie zmienia). Takiego pliku nie da się dzielić na przedziały bajtów po liniach.
+    """
+    inside = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return False
+            if b'"' not in block:
+                if inside and b"\n" in block:
+                    return True
+                continue
+            data = np.frombuffer(block, dtype=np.uint8)
+            parity = np.bitwise_xor.accumulate((data == ord('"')).astype(np.uint8)) ^ inside
+            if parity[data == ord("\n")].any():
+                return True
+            inside = int(parity[-1])
+
+
+def iter_csv_byte_range(path: str, start: int, end: int, columns: List[str], chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+    """
+    Strumieniowo zwraca (w kawałkach po `chunksize` wierszy) wiersze pliku CSV, które ZACZYNAJĄ się
+    w przedziale bajtów [start, end). Przedziały z `csv_byte_ranges` pokrywają każdy wiersz dokładnie raz.
+    Uwaga: zakłada, że pola w cudzysłowach nie zawierają znaków nowej linii (sprawdza `csv_has_quoted_newlines`).
+    """
+    def parse(lines: List[bytes]) -> pd.DataFrame:
+        return pd.read_csv(io.BytesIO(b"".join(lines)), header=None, names=columns)
+
+    with open(path, "rb") as f:
+        if start == 0:
+            f.readline()  # nagłówek
+        else:
+            f.seek(start - 1)
+            f.readline()  # dokończenie wiersza należącego do poprzedniego przedziału
+        lines: List[bytes] = []
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            if line.strip():
+                lines.append(line)
+            if len(lines) >= chunksize:
+                yield parse(lines)
+                lines = []
+        if lines:
+            yield parse(lines)
+
+
+def export_csv(artifact_path: str, csv_path: str, batch_size: int = 100_000) -> str:
+    """Opcjonalny eksport artefaktu do CSV, strumieniowo (bez wczytywania całości do pamięci)."""
+    if detect_format(artifact_path) == "csv":
+        if os.path.abspath(artifact_path) != os.path.abspath(csv_path):
+            shutil.copyfile(artifact_path, csv_path)
+        return csv_path
+    dataset = _dataset(artifact_path)
+    with pa_csv.CSVWriter(csv_path, dataset.schema) as writer:
+        for batch in dataset.to_batches(batch_size=batch_size):
+            writer.write_batch(batch)
+    return csv_path
@@ -0,0 +1,196 @@
+import os
+import ast
+import time
+import shutil
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .artifacts import detect_format, read_artifact_columns, csv_byte_ranges, csv_has_quoted_newlines, iter_csv_byte_range
+from .sandbox import SandboxPool, ExecutionLimits
+
+
+# =================================================================================
+# Tryb kawałkowy (chunked) dla transformacji lokalnych dla wiersza. Wygenerowany skrypt
+# definiuje, obok `process_data`, dwie funkcje:
+#   fit_params(input_path) -> dict                      - osobny przebieg liczący statystyki globalne
+#                                                          (mediany do imputacji, granice IQR, ...),
+#   transform_chunk(chunk, params) -> pd.DataFrame      - transformacja jednego kawałka danych.
+# Wejście dzielone jest na shardy (zakresy bajtów CSV / grupy wierszy Parquet), shardy są
+# przetwarzane równolegle w procesach-piaskownicach, a wyniki trafiają strumieniowo do
+# partycjonowanego katalogu Parquet (`output_path/part-*.parquet`). Pamięć procesu zależy
+# od rozmiaru kawałka, a nie pliku.
+# =================================================================================
+
+ENTRY_FUNCTION = "process_data"
+CHUNKED_FUNCTIONS = ("fit_params", "transform_chunk")
+
+
+def defines_chunked_contract(code: str) -> bool:
+    """Czy kod definiuje na najwyższym poziomie `fit_params` i `transform_chunk`."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return False
+    defined = {node.name for node in tree.body if isinstance(node, ast.FunctionDef)}
+    return all(name in defined for name in CHUNKED_FUNCTIONS)
+
+
+def strip_entry_call(code: str) -> str:
+    """Usuwa wywołania `process_data(...)` z najwyższego poziomu skryptu (zostają same definicje)."""
+    tree = ast.parse(code)
+    lines = code.splitlines()
+    for node in tree.body:
+        if (isinstance(node, ast.Expr) and isinstance(node.value, ast.Call)
+                and isinstance(node.value.func, ast.Name) and node.value.func.id == ENTRY_FUNCTION):
+            for line_no in range(node.lineno - 1, node.end_lineno):
+                lines[line_no] = ""
+    return "\n".join(lines)
+
+
+def plan_shards(path: str, n_shards: int) -> List[Dict[str, Any]]:
+    """Dzieli wejście na shardy: zakresy bajtów dla CSV, grupy wierszy dla Parquet."""
+    fmt = detect_format(path)
+    if fmt == "csv":
+        if csv_has_quoted_newlines(path):
+            raise ValueError(f"Tryb kawałkowy nie obsługuje CSV z polami wieloliniowymi w cudzysłowach: {path}")
+        return [{"start": start, "end": end} for start, end in csv_byte_ranges(path, n_shards)]
+    if fmt == "parquet" and os.path.isfile(path):
+        n_groups = pq.ParquetFile(path).metadata.num_row_groups
+        groups = list(range(n_groups))
+        size = max(1, -(-n_groups // n_shards))
+        return [{"row_groups": groups[i:i + size]} for i in range(0, n_groups, size)]
+    raise ValueError(f"Tryb kawałkowy nie obsługuje wejścia w formacie '{fmt}': {path}")
+
+
+# --- Funkcje sterujące wykonywane w procesach-piaskownicach ---
+
+def run_fit(scope: Dict[str, Any], input_path: str) -> Dict[str, Any]:
+    params = scope["fit_params"](input_path)
+    if not isinstance(params, dict):
+        raise TypeError(f"fit_params musi zwrócić słownik, a zwróciło: {type(params).__name__}")
+    return params
+
+
+def run_shard(scope: Dict[str, Any], input_path: str, shard: Dict[str, Any], shard_id: int,
+              params: Dict[str, Any], output_dir: str, chunksize: int) -> Dict[str, int]:
+    """Przetwarza jeden shard kawałkami i zapisuje każdy przetworzony kawałek jako osobny plik części."""
+    transform_chunk = scope["transform_chunk"]
+    if "start" in shard:
+        columns = read_artifact_columns(input_path)
+        chunks = iter_csv_byte_range(input_path, shard["start"], shard["end"], columns, chunksize)
+    else:
+        parquet_file = pq.ParquetFile(input_path)
+        chunks = (batch.to_pandas() for batch in parquet_file.iter_batches(batch_size=chunksize, row_groups=shard["row_groups"]))
+    rows_in, rows_out, parts = 0, 0, 0
+    for chunk in chunks:
+        rows_in += len(chunk)
+        result = transform_chunk(chunk, params)
+        if result is None:
+            raise TypeError("transform_chunk musi zwrócić ramkę danych (zwróciło None).")
+        rows_out += len(result)
+        if len(result):
+            table = pa.Table.from_pandas(result, preserve_index=False)
+            pq.write_table(table, os.path.join(output_dir, f"part-{shard_id:05d}-{parts:05d}.parquet"))
+            parts += 1
+    return {"rows_in": rows_in, "rows_out": rows_out, "parts": parts}
+
+
+# --- Orkiestracja w procesie nadrzędnym ---
+
+def _unify_parts(output_dir: str):
+    """
+    Kawałki parsowane osobno mogą mieć różne typy tej samej kolumny (np. int64 i double przy brakach).
+    Części o odmiennym schemacie są rzutowane na wspólny schemat, aby katalog czytał się jako jeden zbiór.
+    """
+    paths = sorted(os.path.join(output_dir, name) for name in os.listdir(output_dir) if name.endswith(".parquet"))
+    schemas = {path: pq.read_schema(path) for path in paths}
+    if len({schema.to_string() for schema in schemas.values()}) <= 1:
+        return
+    unified = pa.unify_schemas(list(schemas.values()), promote_options="permissive")
+    for path, schema in schemas.items():
+        if not schema.equals(unified):
+            table = pq.read_table(path)
+            table = table.select(unified.names) if set(table.column_names) == set(unified.names) else table
+            pq.write_table(table.cast(unified), path)
+
+
+def run_chunked(pool: SandboxPool, code: str, input_path: str, output_path: str, max_workers: Optional[int] = None,
+                chunksize: int = 250_000, shards_per_worker: int = 4, limits: Optional[ExecutionLimits] = None,
+                dtype_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Wykonuje skrypt w trybie kawałkowym. Zwraca słownik w tym samym kształcie co `SandboxPool.run()`
+    (ok, traceback, error_type, limit_exceeded, stdout, usage, exec_s), zsumowany po wszystkich zadaniach.
+    `dtype_options` włącza warstwę optymalizacji typów w przebiegu `fit_params` (jedyny, który czyta całe kolumny).
+    """
+    started = time.perf_counter()
+    workers = max_workers or os.cpu_count() or 1
+    pool.ensure_size(workers)
+    body = strip_entry_call(code)
+
+    # 1. Osobny przebieg liczący statystyki globalne
+    fit = pool.run(body, driver="tools.chunked_exec:run_fit", driver_kwargs={"input_path": input_path}, limits=limits,
+                   dtype_options=dtype_options)
+    if not fit["ok"]:
+        fit["traceback"] = "[TRYB KAWAŁKOWY: fit_params]\n" + fit["traceback"]
+        return fit
+    params = fit["outputs"]["driver"]
+    print(f"  [CHUNKED] Parametry globalne z fit_params: {list(params)}")
+
+    # 2. Równoległe przetwarzanie shardów do katalogu tymczasowego
+    shards = plan_shards(input_path, workers * shards_per_worker)
+    tmp_dir = f"{output_path}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    print(f"  [CHUNKED] Przetwarzam {len(shards)} shardów w {workers} procesach...")
+
+    def run_one(shard_id: int) -> Dict[str, Any]:
+        # Bez warstwy typów: typy zawężone osobno w każdym shardzie różniłyby się między częściami wyniku
+        return pool.run(body, driver="tools.chunked_exec:run_shard", limits=limits, driver_kwargs={
+            "input_path": input_path, "shard": shards[shard_id], "shard_id": shard_id,
+            "params": params, "output_dir": tmp_dir, "chunksize": chunksize})
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(run_one, range(len(shards))))
+
+    all_results = [fit] + results
+    summary = {
+        "ok": all(r["ok"] for r in results), "traceback": None, "error_type": None, "limit_exceeded": None,
+        "outputs": {"dtype_report": fit["outputs"].get("dtype_report")} if dtype_options is not None else {},
+        "stdout": "".join(r["stdout"] for r in all_results),
+        "exec_s": sum(r["exec_s"] or 0 for r in all_results),
+        "usage": {
+            "wall_s": time.perf_counter() - started,
+            "cpu_s": sum((r.get("usage") or {}).get("cpu_s") or 0 for r in all_results),
+            "peak_rss_bytes": max((r.get("usage") or {}).get("peak_rss_bytes") or 0 for r in all_results),
+        },
+        "worker": None, "roundtrip_s": time.perf_counter() - started,
+    }
+    failed = next((r for r in results if not r["ok"]), None)
+    if failed:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        failed_id = results.index(failed)
+        summary.update({"traceback": f"[TRYB KAWAŁKOWY: shard {failed_id}]\n{failed['traceback']}",
+                        "error_type": failed["error_type"], "limit_exceeded": failed["limit_exceeded"]})
+        return summary
+
+    # 3. Wspólny schemat części i atomowa podmiana wyniku
+    try:
+        _unify_parts(tmp_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        summary.update({"ok": False, "error_type": "SchemaMismatch",
+                        "traceback": "[TRYB KAWAŁKOWY: łączenie wyników]\n" + traceback.format_exc()})
+        return summary
+    if os.path.isdir(output_path):
+        shutil.rmtree(output_path)
+    elif os.path.exists(output_path):
+        os.remove(output_path)
+    os.replace(tmp_dir, output_path)
+    counts = [r["outputs"]["driver"] for r in results]
+    summary["outputs"]["rows_in"] = sum(c["rows_in"] for c in counts)
+    summary["outputs"]["rows_out"] = sum(c["rows_out"] for c in counts)
+    print(f"  [CHUNKED] Wiersze: {summary['outputs']['rows_in']} -> {summary['outputs']['rows_out']}, "
+          f"części: {sum(c['parts'] for c in counts)} w {output_path}")
+    return summary
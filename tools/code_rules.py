@@ -0,0 +1,482 @@
+import ast
+import re
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel
+
+
+# =================================================================================
+# Silnik reguł architektury oparty na AST. Kod jest parsowany raz, a wszystkie
+# zarejestrowane reguły działają jako wizytatory w jednym przejściu po drzewie
+# (metody `visit_<TypNodu>`), z opcjonalnym sprawdzeniem końcowym (`finish`).
+# Werdykty są zapamiętywane po hashu kodu i zawierają numery linii.
+# =================================================================================
+
+ENTRY_FUNCTION = "process_data"
+ENTRY_ARGS = ["input_path", "output_path"]
+FORBIDDEN_MODULES = {"argparse"}
+# Operacje wierszowe pandas (reguły wydajności): iteracja po wierszach i indeksowanie pojedynczych komórek
+ROW_ITERATORS = {"iterrows", "itertuples"}
+CELL_INDEXERS = {"loc", "iloc", "at", "iat"}
+# Atrybuty wiersza (pd.Series), które nie są kolumnami - lambda z nimi nie ma prostego odpowiednika kolumnowego
+ROW_SERIES_ATTRIBUTES = {"index", "values", "array", "size", "shape", "ndim", "dtype", "dtypes", "empty", "T",
+                         "axes", "hasnans", "nbytes", "attrs", "flags"} | CELL_INDEXERS
+# Operatory porównania bez elementowego odpowiednika w wyrażeniu na kolumnach (`in` wymaga `.isin`)
+NON_ELEMENTWISE_COMPARISONS = (ast.In, ast.NotIn, ast.Is, ast.IsNot)
+LOOP_NODES = (ast.For, ast.While, ast.AsyncFor)
+SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef, ast.Module)
+# Silnik DuckDB: wywołania ściągające cały wynik do pamięci procesu oraz funkcja zapisu wyniku
+MATERIALIZING_METHODS = {"df", "fetchdf", "fetch_df", "fetchall", "fetchnumpy", "arrow", "fetch_arrow_table", "pl", "to_df"}
+RESULT_WRITER = "write_result"
+RESULT_CACHE_SIZE = 256
+
+
+class RuleViolation(BaseModel):
+    rule_id: str
+    message: str
+    line: Optional[int] = None
+    suggestion: Optional[str] = None  # konkretny zamiennik (reguły wydajności)
+
+    def __str__(self) -> str:
+        text = f"[linia {self.line}] {self.message}" if self.line else self.message
+        return f"{text} Zamiast tego: {self.suggestion}" if self.suggestion else text
+
+
+class CodeRule:
+    """
+    Bazowa reguła. Podklasy definiują metody `visit_<TypNodu>(node, ctx)` wywoływane w trakcie
+    wspólnego przejścia po AST oraz opcjonalnie `finish(tree, ctx)`. Każda metoda zwraca listę
+    naruszeń (albo None).
+    """
+    id: str = ""
+    description: str = ""
+    error_message: str = ""
+
+    def violation(self, node: Optional[ast.AST] = None, message: Optional[str] = None,
+                  suggestion: Optional[str] = None) -> RuleViolation:
+        return RuleViolation(rule_id=self.id, message=message or self.error_message,
+                             line=getattr(node, "lineno", None), suggestion=suggestion)
+
+    def finish(self, tree: ast.Module, ctx: "RuleContext") -> Optional[List[RuleViolation]]:
+        return None
+
+
+class RuleContext:
+    """Wspólny kontekst przejścia: źródło podzielone na linie i rodzic każdego węzła."""
+
+    def __init__(self, code: str, tree: ast.Module):
+        self.lines = code.splitlines()
+        self.parents: Dict[ast.AST, ast.AST] = {}
+        self.tree = tree
+
+    def is_module_level(self, node: ast.AST) -> bool:
+        return self.parents.get(node) is self.tree
+
+    def enclosing_loop(self, node: ast.AST) -> Optional[ast.AST]:
+        """Najbliższa pętla zawierająca węzeł (w obrębie tej samej funkcji)."""
+        node = self.parents.get(node)
+        while node is not None and not isinstance(node, SCOPE_NODES):
+            if isinstance(node, LOOP_NODES):
+                return node
+            node = self.parents.get(node)
+        return None
+
+
+# --- Reguły ---
+
+class NoMainBlockRule(CodeRule):
+    id = "NO_MAIN_BLOCK"
+    description = "Żadnego bloku `if __name__ == '__main__':`."
+    error_message = "Wykryto niedozwolony blok `if __name__ == '__main__':`."
+
+    def visit_If(self, node: ast.If, ctx: RuleContext):
+        test = node.test
+        if isinstance(test, ast.Compare) and len(test.ops) == 1 and isinstance(test.ops[0], ast.Eq):
+            sides = [test.left, test.comparators[0]]
+            has_name = any(isinstance(s, ast.Name) and s.id == "__name__" for s in sides)
+            has_main = any(isinstance(s, ast.Constant) and s.value == "__main__" for s in sides)
+            if has_name and has_main:
+                return [self.violation(node)]
+
+
+class ForbiddenImportsRule(CodeRule):
+    id = "NO_ARGPARSE"
+    description = "Żadnego `argparse` ani `sys.argv`."
+    error_message = "Wykryto niedozwolony import modułu `argparse`."
+
+    def visit_Import(self, node: ast.Import, ctx: RuleContext):
+        return [self.violation(node, f"Wykryto niedozwolony import modułu `{alias.name}`.")
+                for alias in node.names if alias.name.split(".")[0] in FORBIDDEN_MODULES]
+
+    def visit_ImportFrom(self, node: ast.ImportFrom, ctx: RuleContext):
+        if node.module and node.module.split(".")[0] in FORBIDDEN_MODULES:
+            return [self.violation(node, f"Wykryto niedozwolony import modułu `{node.module}`.")]
+
+    def visit_Attribute(self, node: ast.Attribute, ctx: RuleContext):
+        if node.attr == "argv" and isinstance(node.value, ast.Name) and node.value.id == "sys":
+            return [self.violation(node, "Wykryto niedozwolone użycie `sys.argv`.")]
+
+
+class EntryFunctionSignatureRule(CodeRule):
+    id = "SINGLE_FUNCTION_LOGIC"
+    description = "Cała logika musi być w funkcji `process_data(input_path: str, output_path: str)`."
+    error_message = "Brak wymaganej definicji funkcji `process_data(input_path: str, output_path: str)`."
+
+    def __init__(self):
+        self.found = False
+
+    def visit_FunctionDef(self, node: ast.FunctionDef, ctx: RuleContext):
+        if node.name != ENTRY_FUNCTION or not ctx.is_module_level(node):
+            return None
+        self.found = True
+        args = node.args
+        names = [a.arg for a in args.posonlyargs + args.args]
+        if names != ENTRY_ARGS or args.vararg or args.kwarg or args.kwonlyargs:
+            return [self.violation(node, f"Funkcja `{ENTRY_FUNCTION}` ma sygnaturę ({', '.join(names)}), "
+                                         f"wymagana: ({', '.join(ENTRY_ARGS)}).")]
+        wrong = [a.arg for a in args.args if a.annotation is not None
+                 and not (isinstance(a.annotation, ast.Name) and a.annotation.id == "str")]
+        if wrong:
+            return [self.violation(node, f"Argumenty {wrong} funkcji `{ENTRY_FUNCTION}` muszą mieć typ `str`.")]
+
+    def finish(self, tree: ast.Module, ctx: RuleContext):
+        if not self.found:
+            return [self.violation()]
+
+
+class EndsWithCallRule(CodeRule):
+    id = "ENDS_WITH_CALL"
+    description = ("Skrypt musi kończyć się **dokładnie jedną linią** w formacie: `process_data(input_path, output_path)  # noqa: F821`. "
+                   "Komentarz `# noqa: F821` jest **obowiązkowy**.")
+    error_message = "Skrypt nie kończy się wymaganym wywołaniem `process_data(input_path, output_path)  # noqa: F821`."
+
+    NOQA = re.compile(r"#\s*noqa:\s*F821")
+
+    @staticmethod
+    def _is_entry_call(node: ast.stmt) -> bool:
+        if not (isinstance(node, ast.Expr) and isinstance(node.value, ast.Call)):
+            return False
+        call = node.value
+        return (isinstance(call.func, ast.Name) and call.func.id == ENTRY_FUNCTION and not call.keywords
+                and [getattr(a, "id", None) for a in call.args] == ENTRY_ARGS)
+
+    def finish(self, tree: ast.Module, ctx: RuleContext):
+        if not tree.body or not self._is_entry_call(tree.body[-1]):
+            return [self.violation(tree.body[-1] if tree.body else None)]
+        last = tree.body[-1]
+        violations = []
+        if last.lineno != last.end_lineno or not self.NOQA.search(ctx.lines[last.end_lineno - 1]):
+            violations.append(self.violation(last))
+        extra = [node for node in tree.body[:-1] if self._is_entry_call(node)]
+        violations += [self.violation(node, f"Wywołanie `{ENTRY_FUNCTION}` może wystąpić tylko raz, na końcu skryptu.")
+                       for node in extra]
+        return violations
+
+
+class NoMaterializationRule(CodeRule):
+    id = "DUCKDB_NO_MATERIALIZATION"
+    description = ("Dane przetwarzaj wyłącznie w DuckDB: żadnego `pd.read_*` ani materializacji relacji w pamięci "
+                   "(`.df()`, `.fetchall()`, `.arrow()` itp.) - chyba że po `.limit(n)` lub agregacji do kilku wierszy w `.fetchone()`.")
+    error_message = "Kod wczytuje pełne dane do pamięci procesu zamiast przetwarzać je w DuckDB."
+
+    @staticmethod
+    def _limited(node: ast.AST) -> bool:
+        """Czy łańcuch wywołań przed materializacją zawiera `.limit(...)`."""
+        while isinstance(node, (ast.Call, ast.Attribute)):
+            node = node.func if isinstance(node, ast.Call) else node.value
+            if isinstance(node, ast.Attribute) and node.attr == "limit":
+                return True
+        return False
+
+    def visit_Call(self, node: ast.Call, ctx: RuleContext):
+        func = node.func
+        if not isinstance(func, ast.Attribute):
+            return None
+        if isinstance(func.value, ast.Name) and func.value.id == "pd" and func.attr.startswith("read_"):
+            return [self.violation(node, f"`pd.{func.attr}` wczytuje cały plik do pamięci - użyj `read_input(input_path)`.")]
+        if func.attr in MATERIALIZING_METHODS and not self._limited(func.value):
+            return [self.violation(node, f"`.{func.attr}()` materializuje całą relację w pamięci - zapisz wynik przez "
+                                         f"`{RESULT_WRITER}(relacja, output_path)` albo ogranicz ją `.limit(n)`.")]
+
+
+class WritesResultRule(CodeRule):
+    id = "DUCKDB_WRITE_RESULT"
+    description = f"Wynik zapisz wywołaniem `{RESULT_WRITER}(relacja_lub_sql, output_path)` wewnątrz `{ENTRY_FUNCTION}`."
+    error_message = f"Funkcja `{ENTRY_FUNCTION}` nie zapisuje wyniku przez `{RESULT_WRITER}(..., output_path)`."
+
+    def __init__(self):
+        self.found = False
+
+    def visit_Call(self, node: ast.Call, ctx: RuleContext):
+        if isinstance(node.func, ast.Name) and node.func.id == RESULT_WRITER:
+            self.found = True
+
+    def finish(self, tree: ast.Module, ctx: RuleContext):
+        if not self.found:
+            return [self.violation()]
+
+
+# --- Reguły wydajności (wzorce wierszowe pandas; naruszenie niesie konkretny zamiennik) ---
+
+class _RowToColumns(ast.NodeTransformer):
+    """
+    `row['x']` / `row.x` -> `df['x']` (a `row.name` -> `df.index`) w ciele funkcji wywoływanej dla wiersza.
+    `supported` jest False, gdy wyrażenia nie da się przenieść na kolumny (np. `x in [...]`).
+    """
+
+    def __init__(self, row: str, frame: ast.expr):
+        self.row, self.frame = row, frame
+        self.supported = True
+
+    def _column(self, name: str) -> ast.Subscript:
+        return ast.Subscript(value=copy.deepcopy(self.frame), slice=ast.Constant(name), ctx=ast.Load())
+
+    def visit_Subscript(self, node: ast.Subscript):
+        if isinstance(node.value, ast.Name) and node.value.id == self.row \
+                and isinstance(node.slice, ast.Constant) and isinstance(node.slice.value, str):
+            return self._column(node.slice.value)
+        return self.generic_visit(node)
+
+    def visit_Attribute(self, node: ast.Attribute):
+        if isinstance(node.value, ast.Name) and node.value.id == self.row:
+            if node.attr == "name":
+                # Nazwą wiersza w apply(axis=1) jest jego etykieta w indeksie
+                return ast.Attribute(value=copy.deepcopy(self.frame), attr="index", ctx=ast.Load())
+            if node.attr in ROW_SERIES_ATTRIBUTES:
+                return node  # zostaje odwołanie do wiersza - wyrażenie zostanie odrzucone
+            return self._column(node.attr)
+        return self.generic_visit(node)
+
+    def visit_Compare(self, node: ast.Compare):
+        node = self.generic_visit(node)
+        if any(isinstance(op, NON_ELEMENTWISE_COMPARISONS) for op in node.ops):
+            self.supported = False
+            return node
+        if len(node.ops) == 1:
+            return node
+        # `a < x < b` na seriach nie działa (niejednoznaczna wartość logiczna) - rozbijamy na `(a < x) & (x < b)`
+        operands = [node.left, *node.comparators]
+        terms = [ast.Compare(left=operands[i], ops=[op], comparators=[operands[i + 1]]) for i, op in enumerate(node.ops)]
+        result = terms[0]
+        for term in terms[1:]:
+            result = ast.BinOp(left=result, op=ast.BitAnd(), right=term)
+        return result
+
+    def visit_IfExp(self, node: ast.IfExp):
+        node = self.generic_visit(node)
+        return ast.Call(func=ast.Attribute(value=ast.Name("np", ast.Load()), attr="where", ctx=ast.Load()),
+                        args=[node.test, node.body, node.orelse], keywords=[])
+
+    def visit_BoolOp(self, node: ast.BoolOp):
+        node = self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = ast.BinOp(left=result, op=op, right=value)
+        return result
+
+    def visit_UnaryOp(self, node: ast.UnaryOp):
+        node = self.generic_visit(node)
+        return ast.UnaryOp(op=ast.Invert(), operand=node.operand) if isinstance(node.op, ast.Not) else node
+
+
+def vectorized_expression(function: ast.AST, frame: ast.expr) -> Optional[str]:
+    """
+    Wyrażenie kolumnowe równoważne `frame.apply(lambda row: ..., axis=1)` dla prostych lambd
+    (arytmetyka, porównania, warunki); None - gdy lambda woła funkcje lub używa wiersza inaczej niż przez kolumny.
+    """
+    if not (isinstance(function, ast.Lambda) and len(function.args.args) == 1):
+        return None
+    row = function.args.args[0].arg
+    if any(isinstance(node, ast.Call) for node in ast.walk(function.body)):
+        return None
+    transformer = _RowToColumns(row, frame)
+    body = transformer.visit(copy.deepcopy(function.body))
+    if not transformer.supported or any(isinstance(node, ast.Name) and node.id == row for node in ast.walk(body)):
+        return None
+    return ast.unparse(ast.fix_missing_locations(body))
+
+
+class ApplyAxis1Rule(CodeRule):
+    id = "PERF_APPLY_AXIS1"
+    description = ("Żadnego `df.apply(..., axis=1)` - funkcja Pythona wywoływana osobno dla każdego wiersza; "
+                   "użyj operacji na całych kolumnach (`df['a'] * df['b']`, `np.where`, `np.select`, metody `.str`/`.dt`).")
+    error_message = "`.apply(..., axis=1)` wywołuje funkcję Pythona dla każdego wiersza (wolne na dużych danych)."
+
+    def visit_Call(self, node: ast.Call, ctx: RuleContext):
+        if not (isinstance(node.func, ast.Attribute) and node.func.attr == "apply"):
+            return None
+        axis = next((kw.value for kw in node.keywords if kw.arg == "axis"), None)
+        if not (isinstance(axis, ast.Constant) and axis.value in (1, "columns")):
+            return None
+        frame = node.func.value
+        expression = vectorized_expression(node.args[0], frame) if node.args else None
+        if expression is None:
+            suggestion = (f"operacje na całych kolumnach `{ast.unparse(frame)}[...]` - arytmetyka i porównania "
+                          f"bezpośrednio na kolumnach, `np.where`/`np.select` dla warunków, `.str`/`.dt` dla tekstu i dat, "
+                          f"`merge` zamiast wyszukiwań w słowniku.")
+        else:
+            parent = ctx.parents.get(node)
+            target = parent.targets[0] if isinstance(parent, ast.Assign) and len(parent.targets) == 1 else None
+            suggestion = f"`{ast.unparse(target)} = {expression}`" if target is not None else f"`{expression}`"
+        return [self.violation(node, suggestion=suggestion)]
+
+
+class RowIterationRule(CodeRule):
+    id = "PERF_ITERROWS"
+    description = "Żadnego `iterrows()`/`itertuples()` - przetwarzaj całe kolumny naraz."
+    error_message = "Iteracja po wierszach (`.{method}()`) przetwarza dane w pętli Pythona."
+
+    def visit_Call(self, node: ast.Call, ctx: RuleContext):
+        if not (isinstance(node.func, ast.Attribute) and node.func.attr in ROW_ITERATORS):
+            return None
+        frame = ast.unparse(node.func.value)
+        suggestion = (f"wyrażenia na kolumnach `{frame}['kolumna']` zamiast pól wiersza; warunki przez maskę "
+                      f"(`{frame}.loc[maska, 'kolumna'] = wartość`) lub `np.select`; agregaty w grupach przez "
+                      f"`{frame}.groupby(...)[...].transform(...)`; wyszukiwania przez `{frame}.merge(...)` lub `.map(słownik)`.")
+        return [self.violation(node, self.error_message.format(method=node.func.attr), suggestion)]
+
+
+class _CellsToColumns(ast.NodeTransformer):
+    """`df.loc[i, 'x']` / `df.at[i, 'x']` -> `df['x']` dla zmiennej pętli `i`."""
+
+    def __init__(self, index: str):
+        self.index = index
+
+    def visit_Subscript(self, node: ast.Subscript):
+        if isinstance(node.value, ast.Attribute) and node.value.attr in CELL_INDEXERS and isinstance(node.slice, ast.Tuple) \
+                and len(node.slice.elts) == 2 and isinstance(node.slice.elts[0], ast.Name) and node.slice.elts[0].id == self.index:
+            return ast.Subscript(value=node.value.value, slice=node.slice.elts[1], ctx=node.ctx)
+        return self.generic_visit(node)
+
+
+class RowLoopRule(CodeRule):
+    id = "PERF_ROW_LOOP"
+    description = "Żadnych pętli `for i in range(len(df))` z `df.loc[i, ...]`/`df.at[i, ...]` - przypisuj całe kolumny."
+    error_message = "Pętla po indeksach wierszy z dostępem do pojedynczych komórek (`.{indexer}[{index}, ...]`)."
+
+    @staticmethod
+    def _row_index_loop(node: ast.For) -> Optional[str]:
+        """Nazwa zmiennej pętli po wierszach: `range(len(df))`, `range(df.shape[0])`, `df.index`."""
+        if not isinstance(node.target, ast.Name):
+            return None
+        iterable = node.iter
+        if isinstance(iterable, ast.Attribute) and iterable.attr == "index":
+            return node.target.id
+        if isinstance(iterable, ast.Call) and isinstance(iterable.func, ast.Name) and iterable.func.id == "range" \
+                and len(iterable.args) == 1:
+            bound = iterable.args[0]
+            is_len = isinstance(bound, ast.Call) and isinstance(bound.func, ast.Name) and bound.func.id == "len"
+            is_shape = isinstance(bound, ast.Subscript) and isinstance(bound.value, ast.Attribute) and bound.value.attr == "shape"
+            return node.target.id if is_len or is_shape else None
+        return None
+
+    @staticmethod
+    def _column_assignment(node: ast.For, index: str) -> Optional[str]:
+        """Przypisanie kolumnowe równoważne pętli z jednym przypisaniem komórki (`df.loc[i, 'y'] = ...`)."""
+        if len(node.body) != 1 or not isinstance(node.body[0], ast.Assign):
+            return None
+        statement = _CellsToColumns(index).visit(copy.deepcopy(node.body[0]))
+        if any(isinstance(child, ast.Name) and child.id == index for child in ast.walk(statement)) \
+                or any(isinstance(child, ast.Call) for child in ast.walk(statement.value)):
+            return None
+        return ast.unparse(statement)
+
+    def visit_For(self, node: ast.For, ctx: RuleContext):
+        index = self._row_index_loop(node)
+        if index is None:
+            return None
+        assignment = self._column_assignment(node, index)
+        for child in ast.walk(node):
+            if isinstance(child, ast.Subscript) and isinstance(child.value, ast.Attribute) \
+                    and child.value.attr in CELL_INDEXERS:
+                key = child.slice.elts[0] if isinstance(child.slice, ast.Tuple) else child.slice
+                if isinstance(key, ast.Name) and key.id == index:
+                    frame = ast.unparse(child.value.value)
+                    suggestion = f"`{assignment}`" if assignment else (f"jedno przypisanie kolumnowe bez pętli, np. `{frame}['kolumna'] = wyrażenie na kolumnach`, "
+                                  f"`{frame}.loc[maska, 'kolumna'] = wartość` albo `np.where(warunek, a, b)`; "
+                                  f"wartości z poprzedniego wiersza przez `{frame}['kolumna'].shift()`.")
+                    return [self.violation(node, self.error_message.format(indexer=child.value.attr, index=index), suggestion)]
+
+
+class ConcatInLoopRule(CodeRule):
+    id = "PERF_CONCAT_IN_LOOP"
+    description = "Żadnego `pd.concat` w pętli - zbieraj części w liście i połącz je raz, po pętli."
+    error_message = "`pd.concat` w pętli kopiuje całą narastającą ramkę w każdym obrocie (koszt kwadratowy)."
+
+    def visit_Call(self, node: ast.Call, ctx: RuleContext):
+        func = node.func
+        if not (isinstance(func, ast.Attribute) and func.attr == "concat" or isinstance(func, ast.Name) and func.id == "concat"):
+            return None
+        if ctx.enclosing_loop(node) is None:
+            return None
+        parent = ctx.parents.get(node)
+        target = ast.unparse(parent.targets[0]) if isinstance(parent, ast.Assign) and len(parent.targets) == 1 else "wynik"
+        suggestion = (f"przed pętlą `parts = []`, w pętli `parts.append(część)`, po pętli "
+                      f"`{target} = pd.concat(parts, ignore_index=True)`.")
+        return [self.violation(node, suggestion=suggestion)]
+
+
+DEFAULT_RULES = [NoMainBlockRule, ForbiddenImportsRule, EntryFunctionSignatureRule, EndsWithCallRule]
+DUCKDB_RULES = DEFAULT_RULES + [NoMaterializationRule, WritesResultRule]
+PERFORMANCE_RULES = [ApplyAxis1Rule, RowIterationRule, RowLoopRule, ConcatInLoopRule]
+# Zestaw reguł zależy od silnika wykonania kodu przetwarzającego; reguły wydajności są osobnym zestawem
+# (ostrzeżenie albo blokada - wg konfiguracji), sprawdzanym dla kodu pandas
+RULE_SETS = {"pandas": DEFAULT_RULES, "duckdb": DUCKDB_RULES, "performance": PERFORMANCE_RULES}
+
+
+# --- Silnik ---
+
+def run_rules(code: str, rule_classes=None) -> List[RuleViolation]:
+    """Parsuje kod raz i uruchamia wszystkie reguły w jednym przejściu po drzewie."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return [RuleViolation(rule_id="SYNTAX", message=f"Błąd składni: {e.msg}.", line=e.lineno)]
+    rules = [rule_class() for rule_class in (rule_classes or DEFAULT_RULES)]
+    handlers: Dict[str, list] = {}
+    for rule in rules:
+        for name in dir(rule):
+            if name.startswith("visit_"):
+                handlers.setdefault(name[len("visit_"):], []).append(getattr(rule, name))
+
+    ctx = RuleContext(code, tree)
+    violations: List[RuleViolation] = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        for child in ast.iter_child_nodes(node):
+            ctx.parents[child] = node
+            stack.append(child)
+        for handler in handlers.get(type(node).__name__, ()):
+            violations += handler(node, ctx) or []
+    for rule in rules:
+        violations += rule.finish(tree, ctx) or []
+    return sorted(violations, key=lambda v: (v.line or 0, v.rule_id))
+
+
+_results: "OrderedDict[str, Tuple[RuleViolation, ...]]" = OrderedDict()
+_results_lock = threading.Lock()
+
+
+def check_code(code: str, backend: str = "pandas") -> List[RuleViolation]:
+    """Werdykt dla zestawu reguł silnika `backend`, zapamiętywany po hashu kodu (LRU)."""
+    key = backend + ":" + hashlib.blake2b(code.encode(), digest_size=16).hexdigest()
+    with _results_lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return list(_results[key])
+    violations = run_rules(code, RULE_SETS[backend])
+    with _results_lock:
+        _results[key] = tuple(violations)
+        if len(_results) > RESULT_CACHE_SIZE:
+            _results.popitem(last=False)
+    return violations
+
+
+def rule_violated(rule_id: str, code: str) -> bool:
+    """Zgodność wstecz z `ARCHITECTURAL_RULES[...]['check']`: czy kod łamie regułę o danym id."""
+    return any(v.rule_id in (rule_id, "SYNTAX") for v in check_code(code))
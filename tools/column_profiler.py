@@ -0,0 +1,308 @@
+import os
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Iterable, Any, Union
+import numpy as np
+import pandas as pd
+from .artifacts import detect_format, iter_artifact_batches, csv_byte_ranges, iter_csv_byte_range
+
+
+# =================================================================================
+# Strumieniowy profiler kolumn oparty o łączalne (mergeable) szkice.
+# Plik jest czytany kawałkami o stałym rozmiarze, więc zużycie pamięci nie zależy
+# od rozmiaru danych. Profile kawałków/shardów można łączyć w dowolnej kolejności.
+# =================================================================================
+
+
+class TDigest:
+    """Kompaktowy t-digest (wariant scalający) do przybliżonych kwantyli."""
+
+    def __init__(self, compression: float = 100.0):
+        self.compression = compression
+        self.means = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+
+    @property
+    def total_weight(self) -> float:
+        return float(self.weights.sum())
+
+    def update(self, values: np.ndarray):
+        """Dodaje paczkę wartości; paczka jest najpierw wektorowo zwijana do centroidów."""
+        values = np.sort(np.asarray(values, dtype=np.float64))
+        if values.size == 0:
+            return
+        n_groups = min(values.size, int(self.compression * 5))
+        groups = np.array_split(values, n_groups)
+        means = np.fromiter((g.mean() for g in groups), dtype=np.float64, count=n_groups)
+        weights = np.fromiter((g.size for g in groups), dtype=np.float64, count=n_groups)
+        self._merge_centroids(means, weights)
+
+    def merge(self, other: "TDigest"):
+        self._merge_centroids(other.means, other.weights)
+
+    def _merge_centroids(self, means: np.ndarray, weights: np.ndarray):
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        if means.size == 0:
+            return
+        order = np.argsort(means, kind="mergesort")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+
+        new_means, new_weights = [], []
+        cumulative = 0.0
+        cur_mean, cur_weight = means[0], weights[0]
+        for mean, weight in zip(means[1:], weights[1:]):
+            q = (cumulative + (cur_weight + weight) / 2.0) / total
+            limit = max(1.0, 4.0 * total * q * (1.0 - q) / self.compression)
+            if cur_weight + weight <= limit:
+                cur_mean += (mean - cur_mean) * weight / (cur_weight + weight)
+                cur_weight += weight
+            else:
+                new_means.append(cur_mean)
+                new_weights.append(cur_weight)
+                cumulative += cur_weight
+                cur_mean, cur_weight = mean, weight
+        new_means.append(cur_mean)
+        new_weights.append(cur_weight)
+        self.means = np.asarray(new_means, dtype=np.float64)
+        self.weights = np.asarray(new_weights, dtype=np.float64)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.means.size == 0:
+            return None
+        if self.means.size == 1:
+            return float(self.means[0])
+        cumulative = np.cumsum(self.weights) - self.weights / 2.0
+        return float(np.interp(q * self.total_weight, cumulative, self.means))
+
+
+class HyperLogLog:
+    """HyperLogLog do przybliżonego zliczania wartości unikalnych (błąd ~1.04/sqrt(2^p))."""
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, series: pd.Series):
+        if series.empty:
+            return
+        hashes = pd.util.hash_pandas_object(series, index=False).to_numpy(dtype=np.uint64)
+        p = self.precision
+        idx = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        bit_length = np.zeros(rest.shape, dtype=np.int64)
+        nonzero = rest > 0
+        bit_length[nonzero] = np.floor(np.log2(rest[nonzero].astype(np.float64))).astype(np.int64) + 1
+        rank = ((64 - p) - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        m = float(self.registers.size)
+        alpha = 0.7213 / (1.0 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+
+class ColumnSketch:
+    """Łączalny profil jednej kolumny: liczności, min/max, średnia/wariancja (Welford), kwantyle, distinct."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.null_count = 0
+        self.dtypes: List[str] = []
+        self.min: Any = None
+        self.max: Any = None
+        self.numeric_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.digest = TDigest()
+        self.hll = HyperLogLog()
+
+    def update(self, series: pd.Series):
+        dtype_name = str(series.dtype)
+        if dtype_name not in self.dtypes:
+            self.dtypes.append(dtype_name)
+        non_null = series.dropna()
+        self.null_count += int(series.size - non_null.size)
+        self.count += int(non_null.size)
+        if non_null.empty:
+            return
+        self.hll.update(non_null)
+
+        if pd.api.types.is_numeric_dtype(non_null) and not pd.api.types.is_bool_dtype(non_null):
+            values = non_null.to_numpy(dtype=np.float64)
+            self._update_range(float(values.min()), float(values.max()))
+            chunk_mean = float(values.mean())
+            chunk_m2 = float(((values - chunk_mean) ** 2).sum())
+            self._combine_moments(values.size, chunk_mean, chunk_m2)
+            self.digest.update(values)
+        elif pd.api.types.is_datetime64_any_dtype(non_null):
+            self._update_range(non_null.min(), non_null.max())
+        else:
+            as_text = non_null.astype(str)
+            self._update_range(as_text.min(), as_text.max())
+
+    def _update_range(self, low: Any, high: Any):
+        try:
+            self.min = low if self.min is None or low < self.min else self.min
+            self.max = high if self.max is None or high > self.max else self.max
+        except TypeError:
+            # Mieszane typy w różnych kawałkach (np. liczby i tekst) - porównujemy reprezentacje tekstowe
+            self.min = min(str(self.min), str(low))
+            self.max = max(str(self.max), str(high))
+
+    def _combine_moments(self, n_b: int, mean_b: float, m2_b: float):
+        """Równoległy wariant algorytmu Welforda (Chan i in.)."""
+        n_a = self.numeric_count
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * n_a * n_b / n
+        self.numeric_count = n
+
+    def merge(self, other: "ColumnSketch"):
+        for dtype_name in other.dtypes:
+            if dtype_name not in self.dtypes:
+                self.dtypes.append(dtype_name)
+        self.count += other.count
+        self.null_count += other.null_count
+        if other.min is not None:
+            self._update_range(other.min, other.max)
+        if other.numeric_count:
+            self._combine_moments(other.numeric_count, other.mean, other.m2)
+        self.digest.merge(other.digest)
+        self.hll.merge(other.hll)
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = self.count + self.null_count
+        summary = {
+            "dtype": "/".join(self.dtypes),
+            "count": self.count,
+            "null_count": self.null_count,
+            "null_rate": round(self.null_count / total, 4) if total else 0.0,
+            "distinct_approx": self.hll.estimate(),
+            "min": self.min,
+            "max": self.max,
+        }
+        if self.numeric_count:
+            variance = self.m2 / (self.numeric_count - 1) if self.numeric_count > 1 else 0.0
+            summary.update({
+                "mean": self.mean,
+                "std": math.sqrt(variance),
+                "quantiles": {q: self.digest.quantile(q) for q in (0.25, 0.5, 0.75)},
+            })
+        return summary
+
+
+class TableProfile:
+    """Profil całej tabeli: liczba wierszy i szkice kolumn (w kolejności kolumn w pliku)."""
+
+    def __init__(self):
+        self.row_count = 0
+        self.columns: Dict[str, ColumnSketch] = {}
+
+    def update(self, chunk: pd.DataFrame):
+        self.row_count += len(chunk)
+        for name in chunk.columns:
+            sketch = self.columns.setdefault(str(name), ColumnSketch(str(name)))
+            sketch.update(chunk[name])
+
+    def merge(self, other: "TableProfile"):
+        self.row_count += other.row_count
+        for name, sketch in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(sketch)
+            else:
+                self.columns[name] = sketch
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"row_count": self.row_count, "columns": {n: s.to_dict() for n, s in self.columns.items()}}
+
+
+def profile_chunks(chunks: Iterable[pd.DataFrame]) -> TableProfile:
+    """Profiluje dowolny strumień ramek (np. `pd.read_csv(..., chunksize=...)`)."""
+    profile = TableProfile()
+    for chunk in chunks:
+        profile.update(chunk)
+    return profile
+
+
+def _profile_csv_shard(path: str, start: int, end: int, columns: List[str], chunksize: int) -> TableProfile:
+    """Profiluje wiersze pliku CSV, które ZACZYNAJĄ się w przedziale bajtów [start, end)."""
+    return profile_chunks(iter_csv_byte_range(path, start, end, columns, chunksize))
+
+
+def profile_file(path: str, chunksize: int = 100_000, max_workers: Optional[int] = None) -> TableProfile:
+    """
+    Profiluje plik CSV w kawałkach o stałym rozmiarze. Lokalne pliki są dzielone na shardy
+    (zakresy bajtów) profilowane równolegle w puli procesów, a wyniki są łączone.
+    Pliki zdalne lub `max_workers=1` są czytane sekwencyjnie przez `pd.read_csv(chunksize=...)`.
+    Artefakty kolumnowe (Parquet/Arrow) są czytane strumieniowo paczkami rekordów, bez parsowania.
+    """
+    if detect_format(path) != "csv":
+        return profile_chunks(iter_artifact_batches(path, batch_size=chunksize))
+    workers = max_workers or os.cpu_count() or 1
+    if workers <= 1 or not os.path.exists(path):
+        return profile_chunks(pd.read_csv(path, chunksize=chunksize))
+
+    columns = pd.read_csv(path, nrows=0).columns.tolist()
+    shards = csv_byte_ranges(path, workers)
+    profile = TableProfile()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_profile_csv_shard, path, start, end, columns, chunksize) for start, end in shards]
+        for future in futures:
+            profile.merge(future.result())
+    # Kolumny w kolejności z pliku, także gdy pierwszy shard był pusty
+    profile.columns = {c: profile.columns.get(c, ColumnSketch(c)) for c in columns}
+    return profile
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    text = str(value)
+    return text if len(text) <= 24 else text[:21] + "..."
+
+
+def format_profile(profile: Union[TableProfile, Dict[str, Any]], title: str) -> str:
+    """
+    Zwięzła, tekstowa reprezentacja profilu (odpowiednik `describe()` + `info()`) dla promptów.
+    Przyjmuje `TableProfile` albo jego słownik (`to_dict()`), np. odczytany z magazynu profili.
+    """
+    summary = profile.to_dict() if isinstance(profile, TableProfile) else profile
+    lines = [f"{title}", f"Liczba wierszy: {summary['row_count']}, liczba kolumn: {len(summary['columns'])}",
+             "kolumna | typ | niepuste | braki % | unikalne~ | min | max | średnia | odch.std | p25 | p50 | p75"]
+    for name, s in summary["columns"].items():
+        quantiles = s.get("quantiles", {})
+        lines.append(" | ".join([
+            name, s["dtype"], str(s["count"]), f"{s['null_rate'] * 100:.2f}", str(s["distinct_approx"]),
+            _format_value(s["min"]), _format_value(s["max"]), _format_value(s.get("mean")),
+            _format_value(s.get("std")), _format_value(quantiles.get(0.25)),
+            _format_value(quantiles.get(0.5)), _format_value(quantiles.get(0.75)),
+        ]))
+    return "\n".join(lines)
+
+
+def format_column_brief(summary: Dict[str, Any], max_columns: int = 60) -> str:
+    """Krótki opis kolumn dla promptów generatorów kodu: typ, braki, kardynalność i kwartyle."""
+    lines = []
+    for name, s in list(summary["columns"].items())[:max_columns]:
+        line = f"- {name}: {s['dtype']}, braki {s['null_rate'] * 100:.1f}%, unikalne~{s['distinct_approx']}"
+        quantiles = s.get("quantiles")
+        if quantiles:
+            line += (f", min {_format_value(s['min'])}, p25/p50/p75 {_format_value(quantiles.get(0.25))}"
+                     f"/{_format_value(quantiles.get(0.5))}/{_format_value(quantiles.get(0.75))}, max {_format_value(s['max'])}")
+        lines.append(line)
+    if len(summary["columns"]) > max_columns:
+        lines.append(f"- ... (pominięto {len(summary['columns']) - max_columns} kolumn)")
+    return f"Liczba wierszy: {summary['row_count']}\n" + "\n".join(lines)
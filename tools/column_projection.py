@@ -0,0 +1,314 @@
+import re
+import ast
+from typing import Dict, List, Optional, Sequence, Set
+from .code_rules import ENTRY_FUNCTION
+from .dtype_optimizer import SCOPE_READER
+from .static_analysis import FRAME_METHODS
+
+
+# =================================================================================
+# Projekcja kolumn: przejście po AST wygenerowanego kodu wyznacza kolumny, których
+# kod faktycznie używa (literały w `df['x']`, `df[['x', 'y']]`, `.loc[:, 'x']`,
+# `usecols=[...]`, argumenty `groupby`/`x=`/`y=`, wyrażenia `query`/`eval`), aby
+# ramki i odczyty wejścia wczytywały tylko te kolumny (`usecols` dla CSV, wybór
+# kolumn dla Parquet/Arrow). Analiza jest zachowawcza: każde użycie ramki, którego
+# wynik może zależeć od pełnego zbioru kolumn (zapis całej ramki, `.columns`,
+# `df[zmienna]`, przekazanie ramki do funkcji, agregacja wszystkich kolumn...),
+# oznacza brak projekcji - wczytywane są wtedy wszystkie kolumny.
+# =================================================================================
+
+# Czytniki wejścia, którym można przekazać listę kolumn (nazwa wywołania -> nazwa argumentu)
+PROJECTABLE_READERS = {"read_csv": "usecols", "read_parquet": "columns", "read_feather": "columns",
+                       "read_artifact": "columns", SCOPE_READER: "columns"}
+# Argumenty czytnika, przy których wynik nie jest zwykłą ramką wszystkich kolumn
+READER_BLOCKING_KEYWORDS = {"usecols", "columns", "chunksize", "iterator", "names", "index_col", "header"}
+# Metody zwracające ramkę o tych samych (lub wyprowadzonych z tych samych) kolumnach
+PRESERVING_METHODS = (FRAME_METHODS - {"pipe"}) | {"where", "mask", "abs", "eval"}
+# Metody wybierające wiersze na podstawie wartości we WSZYSTKICH kolumnach, chyba że podano `subset=`
+ROW_DEPENDENT_METHODS = {"dropna", "drop_duplicates", "duplicated"}
+# Argumenty `merge` wskazujące klucze złączenia (bez nich złączenie idzie po wszystkich wspólnych kolumnach)
+MERGE_KEY_KEYWORDS = {"on", "left_on", "right_on", "left_index", "right_index"}
+# Metody, których argumentem jest wyrażenie tekstowe odwołujące się do kolumn
+EXPRESSION_METHODS = {"query", "eval"}
+# Maski wierszy w `df[...]` / `df.loc[...]` (wynik ma wszystkie kolumny)
+MASK_METHODS = {"isin", "notna", "notnull", "isna", "isnull", "between", "duplicated", "contains", "startswith",
+                "endswith", "match"}
+# Atrybuty ramki niezależne od zbioru kolumn
+ROW_ATTRIBUTES = {"index", "empty"}
+# Agregacje po `groupby`, które nie obejmują automatycznie wszystkich kolumn
+GROUPBY_SAFE = {"size", "ngroups", "groups", "indices"}
+# Wykresy seaborn używające tylko kolumn wskazanych argumentami (x=, y=, hue=...)
+SEABORN_VARIABLE_PLOTS = {"countplot", "histplot", "boxplot", "barplot", "scatterplot", "lineplot", "violinplot",
+                          "kdeplot", "stripplot", "swarmplot", "pointplot", "displot", "catplot", "relplot",
+                          "lmplot", "regplot", "ecdfplot", "boxenplot"}
+PLOT_VARIABLE_KEYWORDS = {"x", "y"}
+IDENTIFIER = re.compile(r"`([^`]+)`|([A-Za-z_]\w*)")
+
+
+def _call_name(call: ast.Call) -> Optional[str]:
+    func = call.func
+    return func.attr if isinstance(func, ast.Attribute) else func.id if isinstance(func, ast.Name) else None
+
+
+def _constant_names(tree: ast.Module) -> Set[str]:
+    """Zmienne, którym przypisywane są wyłącznie stałe nazwy kolumn (`cols = ['a', 'b']`, `for c in ['a', 'b']`)."""
+    bindings: Dict[str, List[bool]] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    bindings.setdefault(target.id, []).append(_is_constant_key(node.value, set()))
+        elif isinstance(node, (ast.For, ast.comprehension)) and isinstance(node.target, ast.Name):
+            iterable = node.iter
+            constant = isinstance(iterable, (ast.List, ast.Tuple)) and all(_is_constant_key(el, set()) for el in iterable.elts)
+            bindings.setdefault(node.target.id, []).append(constant)
+        elif isinstance(node, (ast.AugAssign, ast.AnnAssign, ast.NamedExpr)) and isinstance(node.target, ast.Name):
+            bindings.setdefault(node.target.id, []).append(False)
+    return {name for name, constant in bindings.items() if all(constant)}
+
+
+def _is_constant_key(node: ast.AST, constants: Set[str]) -> bool:
+    """Czy klucz `df[...]` to stała nazwa kolumny albo lista/krotka stałych nazw."""
+    if isinstance(node, ast.Constant):
+        return isinstance(node.value, str)
+    if isinstance(node, ast.Name):
+        return node.id in constants
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return all(isinstance(el, ast.Constant) and isinstance(el.value, str) for el in node.elts)
+    return False
+
+
+def _is_row_mask(node: ast.AST) -> bool:
+    """Czy klucz `df[...]` wybiera wiersze (porównanie, maska logiczna, wycinek), a nie kolumny."""
+    if isinstance(node, (ast.Compare, ast.BoolOp, ast.Slice)):
+        return True
+    if isinstance(node, ast.UnaryOp):
+        return isinstance(node.op, (ast.Invert, ast.Not))
+    if isinstance(node, ast.BinOp):
+        return isinstance(node.op, (ast.BitAnd, ast.BitOr, ast.BitXor))
+    return isinstance(node, ast.Call) and _call_name(node) in MASK_METHODS
+
+
+class _FrameUses:
+    """Sprawdza, czy każde użycie ramki (i jej pochodnych) zależy tylko od kolumn wskazanych w kodzie."""
+
+    def __init__(self, tree: ast.Module, known_columns: Set[str]):
+        self.tree = tree
+        self.known_columns = known_columns
+        self.constants = _constant_names(tree)
+        self.parents: Dict[ast.AST, ast.AST] = {}
+        for node in ast.walk(tree):
+            for child in ast.iter_child_nodes(node):
+                self.parents[child] = node
+        self.expression_columns: Set[str] = set()
+
+    def aliases(self, roots: Set[str], root_calls: List[ast.Call]) -> Optional[Set[str]]:
+        """Zmienne wskazujące na ramkę pełnych kolumn; None - gdy któreś użycie jest dynamiczne."""
+        aliases = set(roots)
+        queued: Set[int] = set()
+        pending: List[ast.AST] = list(root_calls)
+        while True:
+            new = [node for node in ast.walk(self.tree) if isinstance(node, ast.Name) and node.id in aliases
+                   and isinstance(node.ctx, ast.Load) and id(node) not in queued]
+            queued.update(map(id, new))
+            pending += new
+            if not pending:
+                return aliases
+            target = self._full_frame_target(pending.pop())
+            if target is False:
+                return None
+            if isinstance(target, str):
+                aliases.add(target)
+
+    def _full_frame_target(self, node: ast.AST):
+        """
+        Idzie w górę od wyrażenia będącego ramką pełnych kolumn. Zwraca nazwę zmiennej, do której trafia ramka,
+        True - gdy użycie jest bezpieczne, False - gdy wynik może zależeć od wszystkich kolumn.
+        """
+        while True:
+            parent = self.parents.get(node)
+            if isinstance(parent, ast.Subscript) and parent.value is node:
+                key = parent.slice
+                if _is_constant_key(key, self.constants):
+                    return True  # kolumna albo stała lista kolumn (także przypisanie nowej kolumny)
+                if isinstance(parent.ctx, ast.Load) and _is_row_mask(key):
+                    node = parent
+                    continue
+                return False
+            if isinstance(parent, ast.Attribute) and parent.value is node:
+                verdict = self._attribute_use(parent)
+                if isinstance(verdict, ast.AST):
+                    node = verdict
+                    continue
+                return verdict
+            if isinstance(parent, ast.Expr):
+                return True  # wynik odrzucony (np. metoda z `inplace=True`)
+            if isinstance(parent, ast.Assign) and parent.value is node:
+                targets = parent.targets
+                return targets[0].id if len(targets) == 1 and isinstance(targets[0], ast.Name) else False
+            if isinstance(parent, ast.Call) and node in parent.args:
+                return _call_name(parent) == "len" and len(parent.args) == 1
+            if isinstance(parent, ast.keyword) and parent.arg == "data":
+                call = self.parents.get(parent)
+                keywords = {kw.arg for kw in call.keywords}
+                return _call_name(call) in SEABORN_VARIABLE_PLOTS and bool(keywords & PLOT_VARIABLE_KEYWORDS)
+            if isinstance(parent, ast.Compare) and all(isinstance(op, (ast.Is, ast.IsNot)) for op in parent.ops):
+                return True
+            return False
+
+    def _attribute_use(self, attribute: ast.Attribute):
+        """Werdykt dla `ramka.atrybut`: bool albo węzeł, który dalej jest ramką pełnych kolumn."""
+        name = attribute.attr
+        parent = self.parents.get(attribute)
+        call = parent if isinstance(parent, ast.Call) and parent.func is attribute else None
+        if name in ROW_ATTRIBUTES or name in self.known_columns:
+            return True
+        if name == "shape":
+            return isinstance(parent, ast.Subscript) and isinstance(parent.slice, ast.Constant) and parent.slice.value == 0
+        if name in ("loc", "iloc") and isinstance(parent, ast.Subscript):
+            key = parent.slice
+            if isinstance(key, ast.Tuple) and len(key.elts) == 2:
+                return name == "loc" and _is_constant_key(key.elts[1], self.constants)
+            return parent if isinstance(parent.ctx, ast.Load) and (name == "iloc" or _is_row_mask(key)) else False
+        if call is None:
+            if name == "plot" and isinstance(parent, ast.Attribute):
+                plot_call = self.parents.get(parent)
+                return isinstance(plot_call, ast.Call) and PLOT_VARIABLE_KEYWORDS <= {kw.arg for kw in plot_call.keywords}
+            return False
+        keywords = {kw.arg for kw in call.keywords}
+        if name in ROW_DEPENDENT_METHODS:
+            subset = next((kw.value for kw in call.keywords if kw.arg == "subset"), None)
+            if subset is None and call.args and name != "dropna":
+                subset = call.args[0]  # drop_duplicates/duplicated przyjmują `subset` także pozycyjnie
+            axis = next((kw.value for kw in call.keywords if kw.arg == "axis"), None)
+            if subset is None or not _is_constant_key(subset, self.constants) \
+                    or not (axis is None or isinstance(axis, ast.Constant) and axis.value in (0, "index")):
+                return False  # wynik zależy od wartości we wszystkich kolumnach
+            if name == "duplicated":
+                return True  # maska wierszy liczona tylko z kolumn `subset`
+        if name == "merge" and not keywords & MERGE_KEY_KEYWORDS:
+            return False
+        if name in EXPRESSION_METHODS:
+            expression = call.args[0] if call.args else None
+            if not (isinstance(expression, ast.Constant) and isinstance(expression.value, str)):
+                return False
+            self.expression_columns.update(quoted or plain for quoted, plain in IDENTIFIER.findall(expression.value))
+        if name in PRESERVING_METHODS:
+            return call
+        if name == "groupby":
+            return self._groupby_use(call)
+        if name == "plot":
+            return PLOT_VARIABLE_KEYWORDS <= keywords
+        if name in ("hist", "boxplot"):
+            return "column" in keywords
+        if name == "pivot_table":
+            return "values" in keywords
+        return False
+
+    def _groupby_use(self, call: ast.Call) -> bool:
+        parent = self.parents.get(call)
+        if isinstance(parent, ast.Subscript) and parent.value is call:
+            return _is_constant_key(parent.slice, self.constants)
+        if isinstance(parent, ast.Attribute) and parent.value is call:
+            if parent.attr in GROUPBY_SAFE:
+                return True
+            aggregation = self.parents.get(parent)
+            if parent.attr in ("agg", "aggregate") and isinstance(aggregation, ast.Call):
+                named = bool(aggregation.keywords) and not aggregation.args
+                return named or (len(aggregation.args) == 1 and isinstance(aggregation.args[0], ast.Dict))
+        return False
+
+
+def _referenced_columns(tree: ast.Module, uses: _FrameUses, known_columns: Sequence[str]) -> List[str]:
+    """Nadzbiór kolumn używanych przez kod: znane kolumny występujące jako literały, atrybuty lub w wyrażeniach."""
+    known = set(known_columns)
+    found = set(uses.expression_columns) & known
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and node.value in known:
+            found.add(node.value)
+        elif isinstance(node, ast.Attribute) and node.attr in known:
+            found.add(node.attr)
+    return [column for column in known_columns if column in found]
+
+
+def _projection(tree: ast.Module, known_columns: Sequence[str], roots: Set[str],
+                root_calls: List[ast.Call]) -> Optional[List[str]]:
+    uses = _FrameUses(tree, set(known_columns))
+    if uses.aliases(roots, root_calls) is None:
+        return None
+    columns = _referenced_columns(tree, uses, known_columns)
+    # Brak kolumn (np. tylko len(df)) albo wszystkie kolumny - projekcja nic nie daje
+    return columns if 0 < len(columns) < len(known_columns) else None
+
+
+def frame_projection(code: str, frame: str, known_columns: Optional[Sequence[str]]) -> Optional[List[str]]:
+    """Kolumny ramki `frame` (wstawianej do zakresu wykonania) potrzebne kodowi; None - wczytaj wszystkie."""
+    if not known_columns:
+        return None
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    return _projection(tree, list(map(str, known_columns)), {frame}, [])
+
+
+def _input_reads(tree: ast.Module, path_name: str) -> Optional[List[ast.Call]]:
+    """Wywołania czytników z argumentem `path_name`; None - gdy ścieżka wejścia jest użyta w inny sposób."""
+    reads = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and _call_name(node) in PROJECTABLE_READERS \
+                and node.args and isinstance(node.args[0], ast.Name) and node.args[0].id == path_name:
+            if any(kw.arg in READER_BLOCKING_KEYWORDS or kw.arg is None for kw in node.keywords):
+                return None
+            reads.append(node)
+    read_args = {id(call.args[0]) for call in reads}
+    for parent in ast.walk(tree):
+        for node in ast.iter_child_nodes(parent):
+            if not (isinstance(node, ast.Name) and node.id == path_name and id(node) not in read_args):
+                continue
+            # Dozwolone: wywołanie końcowe `process_data(input_path, output_path)` i metody tekstowe ścieżki
+            if isinstance(parent, ast.Call) and isinstance(parent.func, ast.Name) and parent.func.id == ENTRY_FUNCTION:
+                continue
+            if isinstance(parent, ast.Attribute) and parent.value is node:
+                continue
+            return None
+    return reads
+
+
+def input_projection(code: str, known_columns: Optional[Sequence[str]], path_name: str = "input_path",
+                     frames: Sequence[str] = ()) -> Optional[List[str]]:
+    """
+    Kolumny wejścia potrzebne kodowi przetwarzającemu: czytanemu przez `pd.read_csv(input_path)`,
+    `read_optimized(input_path)` itp. oraz przez ramki `frames` z zakresu. None - wczytaj wszystkie.
+    """
+    if not known_columns:
+        return None
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    reads = _input_reads(tree, path_name)
+    if reads is None:
+        return None
+    return _projection(tree, list(map(str, known_columns)), set(frames), reads)
+
+
+def push_projection(code: str, columns: Optional[Sequence[str]], path_name: str = "input_path") -> str:
+    """Dopisuje listę kolumn (`usecols=`/`columns=`) do odczytów wejścia; numery linii kodu pozostają bez zmian."""
+    if not columns:
+        return code
+    tree = ast.parse(code)
+    reads = _input_reads(tree, path_name) or []
+    lines = code.splitlines(keepends=True)
+    for call in sorted(reads, key=lambda c: (c.end_lineno, c.end_col_offset), reverse=True):
+        line = lines[call.end_lineno - 1].encode()
+        before = line[:call.end_col_offset - 1].decode()  # wszystko przed zamykającym nawiasem
+        separator = "" if before.rstrip().endswith((",", "(")) else ", "
+        argument = f"{separator}{PROJECTABLE_READERS[_call_name(call)]}={list(columns)!r}"
+        lines[call.end_lineno - 1] = before + argument + line[call.end_col_offset - 1:].decode()
+    projected = "".join(lines)
+    try:
+        ast.parse(projected)
+    except SyntaxError:
+        return code
+    return projected
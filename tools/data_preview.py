@@ -0,0 +1,176 @@
+import os
+import re
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from .artifacts import detect_format, iter_artifact_batches, read_artifact_columns, write_artifact
+from .column_profiler import TableProfile
+
+
+# =================================================================================
+# Reprezentatywny podgląd danych dla fazy planowania. Jeden przebieg po pliku daje:
+# - próbkę wierszy (reservoir "bottom-k": każdy wiersz dostaje losowy klucz, zostaje
+#   k najmniejszych) - opcjonalnie warstwowaną po kolumnie etykiety (np. flaga fraudu),
+# - zwięzłe statystyki kolumn (te same szkice co w profilerze).
+# Wynikowy tekst mieści się w stałym budżecie tokenów niezależnie od rozmiaru pliku.
+# Ta sama próbka (w większym rozmiarze) służy jako plik do próbnego uruchomienia kodu.
+# Z `DatasetCache.data_preview()` statystyki pochodzą z profilu zbioru (magazyn profili),
+# a próbka podglądu jest zapamiętywana pod odciskiem treści - przebieg po pliku jest tylko jeden.
+# =================================================================================
+
+STRATIFY_NAME_PATTERN = re.compile(r"(fraud|label|target|class|outcome|^is_|_flag$)", re.IGNORECASE)
+MAX_STRATA = 20
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Zgrubne oszacowanie liczby tokenów (ok. 4 znaki na token)."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def guess_stratify_column(columns: List[str]) -> Optional[str]:
+    """Wybiera kolumnę etykiety po nazwie (np. 'is_fraud', 'Fraud_Label', 'target')."""
+    for name in columns:
+        if STRATIFY_NAME_PATTERN.search(str(name)):
+            return name
+    return None
+
+
+class StratifiedReservoir:
+    """Jednoprzebiegowa, łączalna próbka bez zwracania: k wierszy z najmniejszym losowym kluczem na warstwę."""
+
+    def __init__(self, k: int, stratify_on: Optional[str] = None, seed: int = 42):
+        self.k = k
+        self.stratify_on = stratify_on
+        self.rng = np.random.default_rng(seed)
+        self.rows_seen = 0
+        self.sample: Optional[pd.DataFrame] = None
+
+    def update(self, chunk: pd.DataFrame):
+        # `_row` to numer wiersza w pliku - pokazywany w podglądzie zamiast indeksu
+        chunk = chunk.assign(_sample_key=self.rng.random(len(chunk)),
+                             _row=np.arange(self.rows_seen, self.rows_seen + len(chunk)))
+        self.rows_seen += len(chunk)
+        combined = chunk if self.sample is None else pd.concat([self.sample, chunk], ignore_index=True)
+        if self.stratify_on is not None:
+            strata = combined[self.stratify_on].astype(str)
+            if strata.nunique() > MAX_STRATA:
+                print(f"  [PODGLĄD] Kolumna '{self.stratify_on}' ma zbyt wiele wartości - próbkowanie bez warstw.")
+                self.stratify_on = None
+            else:
+                order = combined.assign(_stratum=strata).sort_values("_sample_key")
+                self.sample = order.groupby("_stratum", sort=False).head(self.k).drop(columns="_stratum")
+                return
+        self.sample = combined.nsmallest(self.k, "_sample_key")
+
+    def result(self, n_rows: int) -> pd.DataFrame:
+        """Zwraca `n_rows` wierszy; przy warstwach - możliwie równo z każdej warstwy (rzadkie klasy nie giną)."""
+        if self.sample is None:
+            return pd.DataFrame()
+        sample = self.sample.sort_values("_sample_key")
+        if self.stratify_on is not None:
+            strata = sample[self.stratify_on].astype(str)
+            per_stratum = max(1, n_rows // max(1, strata.nunique()))
+            balanced = sample.groupby(strata, sort=False).head(per_stratum)
+            # Jeśli któraś warstwa była mniejsza niż przydział, dopełniamy próbkę pozostałymi wierszami
+            filler = sample.drop(balanced.index).head(max(0, n_rows - len(balanced)))
+            sample = pd.concat([balanced, filler])
+        sample = sample.head(n_rows).sort_values("_row")
+        return sample.drop(columns="_sample_key").set_index("_row").rename_axis("wiersz")
+
+
+def _format_stat(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    text = str(value)
+    return text if len(text) <= 20 else text[:17] + "..."
+
+
+def _render(columns: List[str], profile: Dict[str, Any], sample: pd.DataFrame, stratify_on: Optional[str],
+            max_stat_columns: int, max_cell_width: int) -> str:
+    lines = [f"Kolumny ({len(columns)}):\n{columns}", "",
+             f"Statystyki kolumn (pełny przebieg, {profile['row_count']} wierszy):"]
+    for name in columns[:max_stat_columns]:
+        stats = profile["columns"][str(name)]
+        line = (f"- {name} ({stats['dtype']}): braki {stats['null_rate'] * 100:.1f}%, "
+                f"unikalne~{stats['distinct_approx']}, zakres [{_format_stat(stats['min'])}, {_format_stat(stats['max'])}]")
+        if "mean" in stats:
+            line += f", średnia {_format_stat(stats['mean'])}, mediana {_format_stat(stats['quantiles'][0.5])}"
+        lines.append(line)
+    if len(columns) > max_stat_columns:
+        lines.append(f"- ... (pominięto statystyki {len(columns) - max_stat_columns} kolumn)")
+
+    strata_info = f", warstwowana po '{stratify_on}'" if stratify_on else ""
+    lines += ["", f"Reprezentatywna próbka {len(sample)} wierszy (losowa z całego pliku{strata_info}):"]
+    truncated = sample.astype(str).apply(lambda col: col.str.slice(0, max_cell_width))
+    lines.append(truncated.to_string())
+    return "\n".join(lines)
+
+
+def sample_reservoir(path: str, k: int, stratify_on: Optional[str] = None, chunksize: int = 100_000,
+                     seed: int = 42) -> StratifiedReservoir:
+    """Jeden przebieg po pliku: próbka `k` wierszy (na warstwę); `stratify_on` musi być kolumną pliku albo None."""
+    reservoir = StratifiedReservoir(k=k, stratify_on=stratify_on, seed=seed)
+    for chunk in iter_artifact_batches(path, batch_size=chunksize):
+        reservoir.update(chunk)
+    return reservoir
+
+
+def render_data_preview(columns: List[str], profile: Dict[str, Any], reservoir: StratifiedReservoir,
+                        sample_rows: int, token_budget: int) -> str:
+    """
+    Składa podgląd z gotowego profilu (`TableProfile.to_dict()`) i próbki. Tekst jest skracany
+    (mniej wierszy, węższe komórki, mniej statystyk), aż zmieści się w `token_budget`.
+    """
+    n_rows, cell_width, stat_columns = sample_rows, 40, len(columns)
+    while True:
+        text = _render(columns, profile, reservoir.result(n_rows), reservoir.stratify_on, stat_columns, cell_width)
+        if estimate_tokens(text) <= token_budget:
+            return text
+        if n_rows > 2:
+            n_rows = max(2, n_rows // 2)
+        elif cell_width > 12:
+            cell_width //= 2
+        elif stat_columns > 10:
+            stat_columns //= 2
+        else:
+            return text[:token_budget * CHARS_PER_TOKEN] + "\n[... podgląd skrócony do budżetu tokenów ...]"
+
+
+def build_data_preview(path: str, sample_rows: int = 20, token_budget: int = 2000,
+                       stratify_on: Optional[str] = None, chunksize: int = 100_000, seed: int = 42) -> str:
+    """
+    Buduje tekstowy podgląd danych: statystyki kolumn + reprezentatywna próbka wierszy (jeden przebieg po pliku).
+    `stratify_on=None` oznacza automatyczny wybór kolumny etykiety na podstawie nazwy.
+    Gdy dostępny jest `DatasetCache`, lepiej użyć `DatasetCache.data_preview()` (bez ponownego profilowania).
+    """
+    columns = read_artifact_columns(path)
+    stratify_on = stratify_on if stratify_on in columns else guess_stratify_column(columns)
+    profile = TableProfile()
+    reservoir = StratifiedReservoir(k=sample_rows, stratify_on=stratify_on, seed=seed)
+    for chunk in iter_artifact_batches(path, batch_size=chunksize):
+        profile.update(chunk)
+        reservoir.update(chunk)
+    return render_data_preview(columns, profile.to_dict(), reservoir, sample_rows, token_budget)
+
+
+def write_sample_file(path: str, out_path: str, n_rows: int = 10_000, stratify_on: Optional[str] = None,
+                      chunksize: int = 100_000, seed: int = 42) -> str:
+    """
+    Zapisuje reprezentatywną próbkę `n_rows` wierszy pliku `path` do `out_path`, w tym samym formacie
+    i z tymi samymi kolumnami (kod napisany dla pełnych danych działa na próbce bez zmian).
+    """
+    columns = read_artifact_columns(path)
+    stratify_on = stratify_on if stratify_on in columns else guess_stratify_column(columns)
+    sample = sample_reservoir(path, n_rows, stratify_on, chunksize=chunksize, seed=seed).result(n_rows).reset_index(drop=True)
+    fmt = detect_format(path)
+    tmp_path = f"{out_path}.part"
+    if fmt == "csv":
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        sample.to_csv(tmp_path, index=False)
+    else:
+        write_artifact(sample, tmp_path, fmt=fmt)
+    os.replace(tmp_path, out_path)
+    return out_path
@@ -0,0 +1,222 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+import pandas as pd
+from .artifacts import detect_format, read_artifact, read_artifact_columns
+from .io_layer import CachedObjectStore, is_remote
+from .fingerprint import DatasetFingerprint, compute_fingerprint
+from .column_profiler import profile_file
+from .profile_store import ProfileStore
+from .data_preview import guess_stratify_column, render_data_preview, sample_reservoir, write_sample_file
+
+
+class DatasetCache:
+    """
+    Pamięć podręczna zbiorów danych o zasięgu jednego uruchomienia (run).
+    Każdy plik jest parsowany tylko raz (klucz: ścieżka + odcisk zawartości),
+    a węzły grafu otrzymują współdzielone widoki ramek zamiast własnych kopii.
+    Dla artefaktów kolumnowych (Parquet/Arrow) wczytywane są wyłącznie żądane kolumny,
+    a brakujące są dociągane przy kolejnych zapytaniach. Obiekty zdalne (gs://) czytane są
+    przez `CachedObjectStore`: nagłówki i podglądy odczytami zakresowymi, całość z lokalnej kopii.
+    Profile kolumn trafiają do trwałego `ProfileStore` (klucz: sygnatura odcisku), więc przeżywają
+    kolejne uruchomienia na tych samych danych.
+
+    Widoki są płytkimi kopiami (`copy(deep=False)`) i należy je traktować jako
+    TYLKO DO ODCZYTU: dodanie/podmiana kolumny w widoku nie zmienia oryginału,
+    ale modyfikacja wartości "w miejscu" (np. `inplace=True`, `.loc[...] = ...`)
+    zmieniłaby dane współdzielone przez pozostałe węzły.
+    """
+
+    def __init__(self, run_id: str, object_store: Optional[CachedObjectStore] = None,
+                 profile_store: Optional[ProfileStore] = None):
+        self.run_id = run_id
+        self.object_store = object_store or CachedObjectStore()
+        self.profile_store = profile_store
+        self._frames: Dict[Tuple[str, str], pd.DataFrame] = {}
+        self._headers: Dict[Tuple[str, str], List[str]] = {}
+        self._complete: Set[Tuple[str, str]] = set()
+        self._fingerprints: Dict[Tuple[str, str], DatasetFingerprint] = {}
+        self._profiles: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def fingerprint(self, path: str) -> str:
+        """Tani odcisk pliku: generacja/ETag obiektu zdalnego albo rozmiar i czas modyfikacji pliku lokalnego."""
+        if is_remote(path):
+            return self.object_store.version(path)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            return f"{stat.st_size}-{stat.st_mtime_ns}"
+        return "missing"
+
+    def dataset_fingerprint(self, path: str, exact: bool = False) -> DatasetFingerprint:
+        """
+        Odcisk treści (schemat, próbkowane bloki, MD5 obiektu GCS), liczony co najwyżej raz na wersję pliku.
+        `exact=True` gwarantuje dokładny hash treści (sygnatura 'content'): odcisk próbkowany bez niego
+        jest liczony ponownie jednym strumieniowym przebiegiem i zastępuje wpis w pamięci.
+        """
+        key = self._key(path)
+        with self._lock:
+            fingerprint = self._fingerprints.get(key)
+            if fingerprint is None or (exact and not fingerprint.content_hash):
+                fingerprint = compute_fingerprint(path, object_store=self.object_store, exact=exact)
+                self._fingerprints[key] = fingerprint
+            return fingerprint
+
+    def dataset_profile(self, path: str, chunksize: int = 100_000, max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Profil kolumn (typy, braki, kardynalności, kwantyle) jako słownik `TableProfile.to_dict()`.
+        Kolejność wyszukiwania: pamięć uruchomienia -> trwały magazyn profili -> profilowanie pliku.
+        """
+        key = self._key(path)
+        if key in self._profiles:
+            self.stats["hits"] += 1
+            return self._profiles[key]
+        local_path = self.local_path(path)
+        # Katalogi (zbiory partycjonowane) nie mają odcisku - profilujemy je bez zapisu w magazynie
+        signature = None
+        if self.profile_store is not None and not os.path.isdir(local_path):
+            signature = self.dataset_fingerprint(path, exact=True).signature("content")
+            profile = self.profile_store.get(signature)
+            if profile is not None:
+                print(f"  [CACHE] Profil kolumn z magazynu profili (bez czytania danych): {path}")
+                self._profiles[key] = profile
+                return profile
+        self.stats["misses"] += 1
+        print(f"  [CACHE] Profiluję zbiór danych: {path}")
+        profile = profile_file(local_path, chunksize=chunksize, max_workers=max_workers).to_dict()
+        if signature is not None:
+            self.profile_store.put(signature, path, profile)
+        self._profiles[key] = profile
+        return profile
+
+    def sample_path(self, path: str, n_rows: int = 10_000, sample_dir: str = ".cache/samples") -> str:
+        """
+        Ścieżka do reprezentatywnej próbki pliku (ten sam format i kolumny). Próbka jest tworzona raz
+        dla danej wersji danych (klucz: odcisk treści) i trwale zapisana w `sample_dir`.
+        """
+        signature = self.dataset_fingerprint(path, exact=True).signature("content")
+        extension = os.path.splitext(self.local_path(path))[1] or ".csv"
+        sample_file = os.path.join(sample_dir, f"{signature}_{n_rows}{extension}")
+        if not os.path.exists(sample_file):
+            print(f"  [CACHE] Tworzę próbkę {n_rows} wierszy do próbnych uruchomień: {path}")
+            write_sample_file(self.local_path(path), sample_file, n_rows=n_rows)
+        return sample_file
+
+    def data_preview(self, path: str, sample_rows: int = 20, token_budget: int = 2000,
+                     stratify_on: Optional[str] = None, sample_dir: str = ".cache/samples") -> str:
+        """
+        Podgląd danych dla fazy planowania (jak `build_data_preview`), ale bez ponownego profilowania:
+        statystyki kolumn pochodzą z `dataset_profile()`, a próbka podglądu jest zapisywana pod odciskiem
+        treści, więc kolejne uruchomienia na tych samych danych nie czytają pliku wcale.
+        """
+        local_path = self.local_path(path)
+        columns = self.get_columns(path)
+        stratify_on = stratify_on if stratify_on in columns else guess_stratify_column(columns)
+        profile = self.dataset_profile(path)
+        # Katalogi (zbiory partycjonowane) nie mają odcisku - próbkę losujemy bez zapisu
+        if os.path.isdir(local_path):
+            reservoir = sample_reservoir(local_path, sample_rows, stratify_on)
+            return render_data_preview(columns, profile, reservoir, sample_rows, token_budget)
+        signature = self.dataset_fingerprint(path, exact=True).signature("content")
+        sample_file = os.path.join(sample_dir, f"{signature}_preview_{sample_rows}_{stratify_on or '-'}.pkl")
+        if os.path.exists(sample_file):
+            print(f"  [CACHE] Próbka podglądu z pamięci podręcznej (bez czytania danych): {path}")
+            reservoir = pd.read_pickle(sample_file)
+        else:
+            reservoir = sample_reservoir(local_path, sample_rows, stratify_on)
+            os.makedirs(sample_dir, exist_ok=True)
+            tmp_path = f"{sample_file}.part"
+            pd.to_pickle(reservoir, tmp_path)
+            os.replace(tmp_path, sample_file)
+        return render_data_preview(columns, profile, reservoir, sample_rows, token_budget)
+
+    def local_path(self, path: str) -> str:
+        """Ścieżka lokalna dla danego pliku (obiekty zdalne są pobierane raz do pamięci dyskowej)."""
+        return self.object_store.local_path(path)
+
+    def _key(self, path: str) -> Tuple[str, str]:
+        return (path, self.fingerprint(path))
+
+    def _evict_stale(self, key: Tuple[str, str]):
+        """Usuwa wpisy dla tej samej ścieżki, ale z nieaktualnym odciskiem (plik się zmienił)."""
+        for store in (self._frames, self._headers, self._profiles):
+            for stale_key in [k for k in store if k[0] == key[0] and k != key]:
+                del store[stale_key]
+        self._complete = {k for k in self._complete if k[0] != key[0] or k == key}
+
+    def get_frame(self, path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Zwraca widok pełnej ramki (opcjonalnie tylko wybrane kolumny), wczytując plik co najwyżej raz."""
+        key = self._key(path)
+        with self._lock:
+            df = self._frames.get(key)
+            if key in self._complete or (df is not None and columns is not None and set(columns) <= set(df.columns)):
+                self.stats["hits"] += 1
+            else:
+                self.stats["misses"] += 1
+                self._evict_stale(key)
+                df = self._load(path, key, df, columns)
+        if columns is not None:
+            return df.loc[:, [c for c in columns if c in df.columns]].copy(deep=False)
+        return df.copy(deep=False)
+
+    def _load(self, path: str, key: Tuple[str, str], df: Optional[pd.DataFrame], columns: Optional[List[str]]) -> pd.DataFrame:
+        """Wczytuje cały plik albo (dla formatów kolumnowych) tylko brakujące kolumny."""
+        local_path = self.local_path(path)
+        if columns is not None and detect_format(local_path) != "csv":
+            all_columns = self._get_columns_unlocked(path, key)
+            missing = [c for c in all_columns if c in columns and (df is None or c not in df.columns)]
+            print(f"  [CACHE] Wczytuję kolumny {missing} z artefaktu: {path}")
+            loaded = read_artifact(local_path, columns=missing)
+            df = loaded if df is None else pd.concat([df, loaded], axis=1)
+            # Kolejność kolumn jak w pliku źródłowym
+            df = df[[c for c in all_columns if c in df.columns]]
+            if len(df.columns) == len(all_columns):
+                self._complete.add(key)
+        else:
+            print(f"  [CACHE] Wczytuję zbiór danych do pamięci podręcznej: {path}")
+            df = read_artifact(local_path)
+            self._complete.add(key)
+        self._frames[key] = df
+        return df
+
+    def _get_columns_unlocked(self, path: str, key: Tuple[str, str]) -> List[str]:
+        if key in self._complete:
+            return self._frames[key].columns.tolist()
+        if key not in self._headers:
+            if is_remote(path) and detect_format(path) == "csv":
+                # Sam nagłówek - odczyt zakresowy początku obiektu zamiast pobierania całości
+                self._headers[key] = self.object_store.read_csv_header(path)
+            else:
+                self._headers[key] = read_artifact_columns(self.local_path(path))
+        return list(self._headers[key])
+
+    def get_columns(self, path: str) -> List[str]:
+        """Zwraca listę kolumn; jeśli ramka nie jest jeszcze wczytana, czyta wyłącznie nagłówek."""
+        key = self._key(path)
+        with self._lock:
+            if key in self._complete or key in self._headers:
+                self.stats["hits"] += 1
+            else:
+                self.stats["misses"] += 1
+                self._evict_stale(key)
+            return self._get_columns_unlocked(path, key)
+
+    def head(self, path: str, n: int = 5) -> pd.DataFrame:
+        """Zwraca pierwsze `n` wierszy: ze współdzielonej ramki, a jeśli nie jest wczytana - z początku pliku."""
+        key = self._key(path)
+        with self._lock:
+            if key in self._complete:
+                self.stats["hits"] += 1
+                return self._frames[key].head(n).copy(deep=False)
+        if detect_format(path) == "csv":
+            return self.object_store.read_csv_preview(path, n)
+        return self.get_frame(path).head(n)
+
+    def invalidate(self, path: Optional[str] = None):
+        """Usuwa z pamięci jeden plik lub (bez argumentu) całą zawartość."""
+        with self._lock:
+            for store in (self._frames, self._headers, self._profiles):
+                for key in [k for k in store if path is None or k[0] == path]:
+                    del store[key]
+            self._complete = {k for k in self._complete if path is not None and k[0] != path}
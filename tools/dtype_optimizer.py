@@ -0,0 +1,108 @@
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .artifacts import detect_format, read_artifact
+
+
+# =================================================================================
+# Warstwa optymalizacji typów dla kodu wykonywanego w piaskownicy. Domyślne wnioskowanie
+# pandas (object / int64 / float64) zajmuje na danych transakcyjnych kilkukrotnie więcej
+# pamięci niż potrzeba. Warstwa:
+# - zawęża liczby całkowite (nie poniżej `min_int_bits` - arytmetyka na int8 łatwo się przepełnia),
+# - float64 -> float32 tylko wtedy, gdy rzutowanie jest bezstratne (kolumny float zostają float:
+#   nullable Int zmieniałby semantykę braków i dzielenia),
+# - teksty o małej kardynalności -> category, kolumny True/False z brakami -> nullable boolean.
+# Teksty dat zostają tekstami: kod, który sam je parsuje albo używa `.str`, działa bez zmian.
+# Zakres wykonania dostaje funkcję `read_optimized(path, **kwargs)` i (gdy kod jej używa)
+# wczytaną już ramkę wejściową `input_df`.
+# =================================================================================
+
+SCOPE_READER = "read_optimized"
+SCOPE_FRAME = "input_df"
+
+
+def _frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _smallest_int(values: pd.Series, min_bits: int) -> Optional[str]:
+    low, high = values.min(), values.max()
+    for bits in (8, 16, 32, 64):
+        if bits < min_bits:
+            continue
+        info = np.iinfo(f"int{bits}")
+        if info.min <= low and high <= info.max:
+            return f"int{bits}"
+    return None
+
+
+def _optimize_column(series: pd.Series, min_int_bits: int, categorical_max_ratio: float) -> Optional[pd.Series]:
+    """Zoptymalizowana kolumna albo None, gdy typ ma zostać bez zmian."""
+    kind = series.dtype.kind
+    non_null = series.dropna()
+    if kind in "iu":
+        target = _smallest_int(series, min_int_bits) if len(non_null) else None
+        return series.astype(target) if target and target != str(series.dtype) else None
+    if kind == "f":
+        if non_null.empty:
+            return None
+        if series.dtype == np.float64 and (non_null.astype(np.float32).astype(np.float64) == non_null).all():
+            return series.astype(np.float32)
+        return None
+    if kind != "O" or non_null.empty:
+        return None
+    if non_null.map(type).isin([bool, np.bool_]).all():
+        return series.astype("boolean")
+    if not non_null.map(type).eq(str).all():
+        return None  # kolumny mieszane zostają bez zmian
+    if non_null.nunique() <= categorical_max_ratio * len(series):
+        return series.astype("category")
+    return None
+
+
+def optimize_frame(df: pd.DataFrame, min_int_bits: int = 32,
+                   categorical_max_ratio: float = 0.5) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Zwraca (ramka ze zoptymalizowanymi typami, raport: bajty przed/po i zmiany typów kolumn)."""
+    bytes_before = _frame_bytes(df)
+    changes: Dict[str, str] = {}
+    columns = {}
+    for name in df.columns:
+        optimized = _optimize_column(df[name], min_int_bits, categorical_max_ratio)
+        if optimized is not None:
+            changes[str(name)] = f"{df[name].dtype} -> {optimized.dtype}"
+            columns[name] = optimized
+    if columns:
+        df = df.copy(deep=False)  # płytka kopia: ramka wywołującego nie jest modyfikowana, dane nie są kopiowane
+        for name, column in columns.items():
+            df[name] = column
+    bytes_after = _frame_bytes(df)
+    return df, {"bytes_before": bytes_before, "bytes_after": bytes_after,
+                "saved_bytes": bytes_before - bytes_after, "changes": changes}
+
+
+class DtypeLayer:
+    """Czytnik danych ze zoptymalizowanymi typami, zbierający raport oszczędności z jednego wykonania."""
+
+    def __init__(self, min_int_bits: int = 32, categorical_max_ratio: float = 0.5):
+        self.min_int_bits = min_int_bits
+        self.categorical_max_ratio = categorical_max_ratio
+        self.reports: List[Dict[str, Any]] = []
+
+    def read(self, path: str, columns: Optional[List[str]] = None, **read_csv_kwargs: Any) -> pd.DataFrame:
+        """Wczytuje CSV (z argumentami `pd.read_csv`) lub artefakt kolumnowy i optymalizuje typy kolumn."""
+        if detect_format(path) == "csv":
+            if columns is not None:
+                read_csv_kwargs.setdefault("usecols", columns)
+            read_csv_kwargs.setdefault("low_memory", False)  # typy wnioskowane z całej kolumny, a nie per blok
+            df = pd.read_csv(path, **read_csv_kwargs)
+        else:
+            df = read_artifact(path, columns=columns)
+        df, report = optimize_frame(df, self.min_int_bits, self.categorical_max_ratio)
+        self.reports.append({"path": str(path), **report})
+        return df
+
+    def summary(self) -> Dict[str, Any]:
+        before = sum(r["bytes_before"] for r in self.reports)
+        after = sum(r["bytes_after"] for r in self.reports)
+        return {"reads": len(self.reports), "bytes_before": before, "bytes_after": after, "saved_bytes": before - after,
+                "changes": {column: change for r in self.reports for column, change in r["changes"].items()}}
@@ -0,0 +1,56 @@
+import os
+from typing import Any, Dict, Optional, Union
+import duckdb
+from .artifacts import detect_format
+
+
+# =================================================================================
+# Silnik DuckDB dla zbiorów większych niż pamięć. Wygenerowany kod zachowuje strukturę
+# `process_data(input_path, output_path)`, ale zamiast pandas operuje na relacjach DuckDB
+# (SQL albo API relacyjne), które są wykonywane strumieniowo i - po przekroczeniu
+# `memory_limit` - zrzucają dane pośrednie do `temp_directory`. W zakresie wykonania są:
+#   con                       - połączenie z ustawionym limitem pamięci i katalogiem zrzutu,
+#   read_input(path)          - relacja nad plikiem CSV/Parquet (bez wczytywania do pamięci),
+#   write_result(rel, path)   - zapis relacji (lub zapytania SQL) jako Parquet/CSV wg `output_path`.
+# Moduł jest importowany wyłącznie w procesie-piaskownicy, dla zadań tego silnika.
+# =================================================================================
+
+class DuckDBSession:
+    """Połączenie DuckDB dla jednego wykonania wraz z funkcjami wstawianymi do zakresu."""
+
+    def __init__(self, memory_limit_bytes: Optional[int] = None, temp_dir: Optional[str] = None,
+                 threads: Optional[int] = None):
+        self.con = duckdb.connect(database=":memory:")
+        if memory_limit_bytes:
+            self.con.execute(f"SET memory_limit = '{int(memory_limit_bytes) // 1024**2}MB'")
+        if temp_dir:
+            os.makedirs(temp_dir, exist_ok=True)
+            self.con.execute(f"SET temp_directory = '{temp_dir}'")
+        if threads:
+            self.con.execute(f"SET threads = {int(threads)}")
+        # Kolejność wierszy nie musi być zachowana - pozwala to DuckDB ograniczyć pamięć przy zapisie i agregacjach
+        self.con.execute("SET preserve_insertion_order = false")
+
+    def read_input(self, path: str) -> duckdb.DuckDBPyRelation:
+        if detect_format(path) == "csv":
+            return self.con.read_csv(path)
+        return self.con.read_parquet(os.path.join(path, "**", "*.parquet") if os.path.isdir(path) else path)
+
+    def write_result(self, relation: Union[duckdb.DuckDBPyRelation, str], output_path: str) -> str:
+        """Zapisuje wynik strumieniowo (COPY) w formacie wynikającym ze ścieżki: Parquet albo CSV."""
+        if isinstance(relation, str):
+            relation = self.con.sql(relation)
+        parent = os.path.dirname(output_path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        if detect_format(output_path) == "parquet":
+            relation.write_parquet(output_path)
+        else:
+            relation.write_csv(output_path, header=True)
+        return output_path
+
+    def scope(self) -> Dict[str, Any]:
+        return {"con": self.con, "duckdb": duckdb, "read_input": self.read_input, "write_result": self.write_result}
+
+    def close(self):
+        self.con.close()
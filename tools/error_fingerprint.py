@@ -0,0 +1,83 @@
+import re
+import hashlib
+from typing import List, Optional, Tuple
+from pydantic import BaseModel
+
+
+# =================================================================================
+# Znormalizowane odciski błędów: typ wyjątku + wadliwa linia kodu + komunikat bez
+# wartości ulotnych (liczby, adresy, ścieżki). Ten sam błąd po kolejnej "poprawce"
+# daje ten sam odcisk, co pozwala wykryć pętle naprawcze (A, A) i oscylacje (A, B, A).
+# =================================================================================
+
+# Ramka wygenerowanego kodu w tracebacku (kod wykonywany przez exec() ma nazwę pliku "<string>")
+CODE_FRAME = re.compile(r'File "<string>", line (\d+)')
+STATIC_LINE = re.compile(r"\[linia (\d+)\]")
+EXCEPTION_LINE = re.compile(r"^([A-Za-z_][\w.]*(?:Error|Exception|Exceeded|Crashed|Cancelled|Interrupt|Exit))(?::\s*(.*))?$")
+VOLATILE = [
+    (re.compile(r"0x[0-9a-fA-F]+"), "0x?"),
+    (re.compile(r"(?:[A-Za-z]:)?(?:[\\/][\w.\-]+){2,}"), "<ścieżka>"),
+    (re.compile(r"\b\d+(?:\.\d+)?(?:e[+-]?\d+)?\b"), "N"),
+    (re.compile(r"\s+"), " "),
+]
+MAX_MESSAGE_CHARS = 300
+
+
+class ErrorFingerprint(BaseModel):
+    exc_type: str
+    location: str
+    message: str
+    digest: str
+
+
+def normalize_message(text: str) -> str:
+    for pattern, replacement in VOLATILE:
+        text = pattern.sub(replacement, text)
+    return text.strip()[:MAX_MESSAGE_CHARS]
+
+
+def failing_line(error_message: str) -> Optional[int]:
+    """Numer linii wygenerowanego kodu, w której wystąpił błąd (ostatnia ramka `<string>` albo `[linia N]`)."""
+    frames = CODE_FRAME.findall(error_message or "")
+    if frames:
+        return int(frames[-1])
+    static = STATIC_LINE.search(error_message or "")
+    return int(static.group(1)) if static else None
+
+
+def _exception(error_message: str) -> Tuple[str, str]:
+    for line in reversed((error_message or "").strip().splitlines()):
+        match = EXCEPTION_LINE.match(line.strip())
+        if match:
+            return match.group(1).split(".")[-1], match.group(2) or ""
+    # Komunikaty systemowe (np. "Błąd Analizy Statycznej: ...") - typem jest prefiks przed dwukropkiem
+    first = (error_message or "").strip().splitlines()[0] if (error_message or "").strip() else ""
+    prefix, _, rest = first.partition(":")
+    return (prefix.strip() or "Unknown"), (rest or error_message or "")
+
+
+def fingerprint_error(error_message: str, code: Optional[str] = None) -> ErrorFingerprint:
+    """Odcisk błędu; gdy podano kod, lokalizacją jest treść wadliwej linii (odporna na przesunięcia numeracji)."""
+    exc_type, message = _exception(error_message)
+    line_no = failing_line(error_message)
+    location = "-"
+    if line_no is not None:
+        lines = (code or "").splitlines()
+        location = normalize_message(lines[line_no - 1]) if 0 < line_no <= len(lines) else f"linia {line_no}"
+    message = normalize_message(message)
+    digest = hashlib.blake2b(f"{exc_type}|{location}|{message}".encode(), digest_size=8).hexdigest()
+    return ErrorFingerprint(exc_type=exc_type, location=location, message=message, digest=digest)
+
+
+def detect_loop(history: List[str]) -> Optional[str]:
+    """
+    Ocena historii odcisków w sesji naprawczej (ostatni element = bieżący błąd):
+    'identical' - ten sam błąd co poprzednio, 'oscillation' - powrót do wcześniejszego błędu, None - nowy błąd.
+    """
+    if len(history) < 2:
+        return None
+    if history[-1] == history[-2]:
+        return "identical"
+    if history[-1] in history[:-2]:
+        return "oscillation"
+    return None
@@ -0,0 +1,132 @@
+import os
+import re
+import ast
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, TypedDict
+
+
+# =================================================================================
+# Lokalny klasyfikator błędów: szybka ścieżka dla znanych klas błędów, które nie
+# wymagają wywołania LLM w debuggerze. Tabela tras jest przeglądana po kolei; pierwsza
+# trasa, której wzorzec pasuje do tracebacku, a obsługa zwraca decyzję, wygrywa.
+# Decyzja ma kształt odpowiedzi debuggera (`tool_choice`, `tool_args`, `debugger_analysis`),
+# więc graf kieruje ją dalej bez zmian (instalator pakietów, aplikowanie poprawki).
+# Decyzja `{"llm_prompt": ...}` oznacza: LLM jest potrzebny, ale z ukierunkowanym promptem.
+# =================================================================================
+
+# Nazwy importów różne od nazw pakietów w PyPI
+PIP_PACKAGE_NAMES = {
+    "sklearn": "scikit-learn", "cv2": "opencv-python", "PIL": "Pillow", "yaml": "PyYAML",
+    "bs4": "beautifulsoup4", "dateutil": "python-dateutil", "Crypto": "pycryptodome",
+    "skimage": "scikit-image", "statsmodels": "statsmodels", "lightgbm": "lightgbm",
+}
+RESOURCE_LIMIT_ERRORS = ("TimeoutError", "MemoryLimitExceeded", "CpuTimeLimitExceeded", "MemoryError")
+
+
+class ErrorRoute(TypedDict):
+    id: str; pattern: "re.Pattern[str]"; handler: Callable[["re.Match[str]", Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+def _missing_module(match: "re.Match[str]", state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    module = match.group(1).split(".")[0]
+    package = PIP_PACKAGE_NAMES.get(module, module)
+    analysis = f"Brak modułu `{module}` w środowisku (ModuleNotFoundError). Wymagana instalacja pakietu `{package}`."
+    return {"tool_choice": "request_package_installation",
+            "tool_args": {"package_name": package, "analysis": analysis},
+            "debugger_analysis": analysis}
+
+
+def _insert_into_entry_function(code: str, statement: str) -> Optional[str]:
+    """Wstawia instrukcję na początek ciała `process_data` (z zachowaniem wcięcia)."""
+    tree = ast.parse(code)
+    entry = next((n for n in tree.body if isinstance(n, ast.FunctionDef) and n.name == "process_data"), None)
+    if entry is None:
+        return None
+    first = entry.body[0]
+    if isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant) and isinstance(first.value.value, str):
+        first = entry.body[1] if len(entry.body) > 1 else None  # docstring zostaje na początku
+    if first is None:
+        return None
+    lines = code.splitlines()
+    indent = " " * first.col_offset
+    lines[first.lineno - 1:first.lineno - 1] = [indent + line for line in statement.splitlines()]
+    return "\n".join(lines) + "\n"
+
+
+def _missing_file(match: "re.Match[str]", state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Brakujący plik: zaszyta na sztywno ścieżka zamiast `input_path` albo brak katalogu wyjściowego."""
+    if state.get("active_code_key") != "generated_code":
+        return None
+    missing = match.group(1)
+    code = state.get("error_context_code") or ""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    output_dir = os.path.dirname(os.path.normpath(state.get("output_path") or ""))
+    if output_dir and os.path.normpath(missing).startswith(output_dir):
+        fixed = _insert_into_entry_function(code, "import os\nos.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)")
+        analysis = f"Katalog wyjściowy `{output_dir}` nie istnieje. Poprawka: utworzenie katalogu przed zapisem."
+    else:
+        literals = [n for n in ast.walk(tree) if isinstance(n, ast.Constant) and isinstance(n.value, str)
+                    and n.value and (n.value == missing or os.path.basename(missing) == n.value) and n.lineno == n.end_lineno]
+        if not literals:
+            return None
+        lines = code.splitlines()
+        for node in sorted(literals, key=lambda n: (n.lineno, n.col_offset), reverse=True):
+            line = lines[node.lineno - 1]
+            lines[node.lineno - 1] = line[:node.col_offset] + "input_path" + line[node.end_col_offset:]
+        fixed = "\n".join(lines) + "\n"
+        analysis = f"Kod odwołuje się do zaszytej na sztywno ścieżki `{missing}`. Poprawka: użycie zmiennej `input_path`."
+    if fixed is None:
+        return None
+    return {"tool_choice": "propose_code_fix",
+            "tool_args": {"analysis": analysis, "corrected_code": fixed},
+            "debugger_analysis": analysis}
+
+
+def _resource_limit(match: "re.Match[str]", state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return {"llm_prompt": "performance", "error_type": match.group(1)}
+
+
+DEFAULT_ERROR_ROUTES: List[ErrorRoute] = [
+    {"id": "MISSING_MODULE", "pattern": re.compile(r"ModuleNotFoundError: No module named '([\w.]+)'"), "handler": _missing_module},
+    {"id": "FILE_NOT_FOUND", "pattern": re.compile(r"FileNotFoundError: .*?No such file or directory: '([^']+)'"), "handler": _missing_file},
+    {"id": "RESOURCE_LIMIT", "pattern": re.compile(r"\b(" + "|".join(RESOURCE_LIMIT_ERRORS) + r")\b"), "handler": _resource_limit},
+]
+
+
+class ErrorRouter:
+    """Tabelaryczny klasyfikator błędów z metrykami trafień (ile błędów obsłużono bez ogólnego wywołania LLM)."""
+
+    def __init__(self, routes: Optional[List[ErrorRoute]] = None):
+        self.routes: List[ErrorRoute] = list(routes if routes is not None else DEFAULT_ERROR_ROUTES)
+        self.stats: Dict[str, Any] = {"classified": 0, "fast_path": 0, "targeted_llm": 0, "fallback_llm": 0, "by_route": Counter()}
+
+    def register(self, route: ErrorRoute, first: bool = False):
+        """Dodaje trasę na koniec tabeli (albo na początek, aby miała pierwszeństwo)."""
+        if first:
+            self.routes.insert(0, route)
+        else:
+            self.routes.append(route)
+
+    def classify(self, error_message: str, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Zwraca decyzję pierwszej pasującej trasy (z kluczem `route`) albo None - wtedy decyduje debugger LLM."""
+        self.stats["classified"] += 1
+        for route in self.routes:
+            match = route["pattern"].search(error_message or "")
+            if not match:
+                continue
+            decision = route["handler"](match, state)
+            if decision is not None:
+                self.stats["by_route"][route["id"]] += 1
+                self.stats["targeted_llm" if "llm_prompt" in decision else "fast_path"] += 1
+                return {**decision, "route": route["id"]}
+        self.stats["fallback_llm"] += 1
+        return None
+
+    def metrics(self) -> Dict[str, Any]:
+        classified = self.stats["classified"]
+        return {**self.stats, "by_route": dict(self.stats["by_route"]),
+                "hit_rate": (self.stats["fast_path"] / classified) if classified else None}
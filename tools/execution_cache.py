@@ -0,0 +1,150 @@
+import os
+import ast
+import json
+import time
+import shutil
+import hashlib
+import platform
+import threading
+from importlib import metadata
+from typing import Any, Dict, List, Optional
+
+
+# =================================================================================
+# Pamięć podręczna wyników wykonania wygenerowanego kodu, adresowana treścią:
+# klucz = hash(znormalizowany kod) + odciski danych wejściowych + wersje bibliotek.
+# Wpis przechowuje artefakt wynikowy (plik lub katalog części Parquet) oraz dane
+# pomocnicze (np. wyrenderowane wykresy). Rozmiar ograniczony jest polityką LRU.
+# Zakładamy deterministyczność kodu: ten sam kod na tych samych danych daje ten sam wynik.
+# =================================================================================
+
+VERSIONED_LIBRARIES = ("pandas", "numpy", "pyarrow", "matplotlib")
+
+
+def normalize_code(code: str) -> str:
+    """Postać kodu niezależna od komentarzy i formatowania (zrzut AST); przy błędzie składni - sam tekst."""
+    try:
+        return ast.dump(ast.parse(code), annotate_fields=False, include_attributes=False)
+    except SyntaxError:
+        return code.strip()
+
+
+def library_versions() -> Dict[str, str]:
+    versions = {"python": platform.python_version()}
+    for name in VERSIONED_LIBRARIES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = "-"
+    return versions
+
+
+class ExecutionCache:
+    """
+    Trwała pamięć wyników wykonań na dysku lokalnym.
+    Artefakty są dowiązywane twardo (hardlink) zamiast kopiowane, gdy to możliwe - dlatego
+    ścieżkę wynikową należy przed zapisem usunąć, a nie nadpisywać w miejscu.
+    """
+
+    def __init__(self, cache_dir: str = ".cache/executions", max_bytes: int = 50 * 1024**3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._versions = library_versions()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, code: str, inputs: List[str], **extra: Any) -> str:
+        """Klucz wpisu: znormalizowany kod, sygnatury danych wejściowych, wersje bibliotek i dodatkowe parametry."""
+        material = json.dumps({"code": normalize_code(code), "inputs": inputs, "versions": self._versions, "extra": extra},
+                              sort_keys=True, default=str)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Zwraca dane pomocnicze wpisu (None przy braku); trafienie odświeża pozycję w LRU."""
+        payload_path = os.path.join(self._entry_dir(key), "payload.json")
+        if not os.path.exists(payload_path):
+            self.stats["misses"] += 1
+            return None
+        with open(payload_path, encoding="utf-8") as f:
+            payload = json.load(f)
+        os.utime(self._entry_dir(key), None)
+        self.stats["hits"] += 1
+        return payload
+
+    def restore_artifact(self, key: str, target_path: str) -> bool:
+        """Odtwarza zapisany artefakt pod `target_path` (plik lub katalog). Zwraca False, gdy wpis nie ma artefaktu."""
+        artifact_dir = os.path.join(self._entry_dir(key), "artifact")
+        if not os.path.isdir(artifact_dir) or not os.listdir(artifact_dir):
+            return False
+        source = os.path.join(artifact_dir, os.listdir(artifact_dir)[0])
+        _remove(target_path)
+        parent = os.path.dirname(target_path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        _link_or_copy(source, target_path)
+        return True
+
+    def put(self, key: str, payload: Optional[Dict[str, Any]] = None, artifact_path: Optional[str] = None):
+        """Zapisuje wpis atomowo (katalog tymczasowy + zamiana) i przycina pamięć do `max_bytes`."""
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.tmp-{os.getpid()}-{threading.get_ident()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(os.path.join(tmp_dir, "artifact"))
+        if artifact_path:
+            _link_or_copy(artifact_path, os.path.join(tmp_dir, "artifact", os.path.basename(os.path.normpath(artifact_path))))
+        with open(os.path.join(tmp_dir, "payload.json"), "w", encoding="utf-8") as f:
+            json.dump({**(payload or {}), "created_at": time.time()}, f, default=str)
+        with self._lock:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+            self.stats["stores"] += 1
+            self._evict(protect=entry_dir)
+
+    def _entry_size(self, entry_dir: str) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(entry_dir):
+            total += sum(os.path.getsize(os.path.join(dirpath, name)) for name in filenames)
+        return total
+
+    def _evict(self, protect: Optional[str] = None):
+        """Usuwa najdawniej używane wpisy, dopóki łączny rozmiar przekracza `max_bytes`."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            if os.path.isdir(entry_dir) and ".tmp-" not in name:
+                entries.append((os.path.getmtime(entry_dir), entry_dir, self._entry_size(entry_dir)))
+        total = sum(size for _, _, size in entries)
+        for _, entry_dir, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry_dir == protect:
+                continue
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            self.stats["evictions"] += 1
+
+
+def _remove(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _link_file(source: str, target: str):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def _link_or_copy(source: str, target: str):
+    """Dowiązanie twarde pliku lub drzewa katalogów (kopia, gdy dowiązanie jest niemożliwe, np. między dyskami)."""
+    if os.path.isdir(source):
+        shutil.copytree(source, target, copy_function=_link_file)
+    else:
+        _link_file(source, target)
@@ -0,0 +1,121 @@
+import os
+import base64
+import hashlib
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+from .artifacts import detect_format, read_artifact_schema
+from .io_layer import CachedObjectStore, is_remote
+
+
+# =================================================================================
+# Odcisk zbioru danych. Plik jest czytany jeden raz dużymi blokami, a wynik łączy:
+# - hash schematu (nazwy i typy kolumn) oraz hashe typów poszczególnych kolumn,
+# - hash próbkowanych bloków (początek, koniec, bloki rozłożone równomiernie),
+# - dokładny hash całej zawartości (z metadanych MD5 obiektu GCS albo - w trybie `exact` - strumieniowo).
+# Domyślnie czytane są tylko próbkowane bloki: odcisk pliku wielogigabajtowego nie wymaga przebiegu po całości.
+# Pamięci podręczne i zakresy pamięci wybierają potrzebną granulację przez `signature()`: 'content' (dokładna
+# treść), 'sampled' (próbkowane bloki - przybliżenie, nigdy nie podstawiane za 'content') albo 'schema'.
+# =================================================================================
+
+DEFAULT_BLOCK_SIZE = 8 * 1024**2
+PREVIEW_ROWS_FOR_DTYPES = 1000
+GRANULARITIES = ("content", "sampled", "schema")
+
+
+class DatasetFingerprint(BaseModel):
+    """Wielopoziomowy odcisk zbioru danych."""
+    path: str
+    size: int
+    columns: List[str]
+    schema_hash: str = Field(description="Hash samych nazw i typów kolumn - wspólny dla plików o tym samym schemacie.")
+    dtype_hashes: Dict[str, str] = Field(default_factory=dict)
+    sample_hash: str = Field(description="Hash rozmiaru i próbkowanych bloków - szybki, przybliżony odcisk treści.")
+    content_hash: Optional[str] = Field(default=None, description="Dokładny hash całej zawartości (None w trybie próbkowanym).")
+
+    def signature(self, granularity: str = "content") -> str:
+        """
+        Zwraca sygnaturę o żądanej granulacji: 'content', 'sampled' lub 'schema'.
+        Sygnatura 'content' wymaga dokładnego hasha treści - odcisk próbkowany (bez MD5 obiektu GCS)
+        należy policzyć ponownie z `exact=True`.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Nieznana granulacja sygnatury '{granularity}' (dozwolone: {', '.join(GRANULARITIES)}).")
+        if granularity == "schema":
+            return self.schema_hash
+        if granularity == "sampled":
+            return self.sample_hash
+        if not self.content_hash:
+            raise ValueError(f"Odcisk {self.path} nie ma dokładnego hasha treści - policz go z exact=True.")
+        return self.content_hash
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _infer_dtypes(path: str, object_store: CachedObjectStore) -> Dict[str, str]:
+    """Typy kolumn z podglądu początku pliku (CSV) albo ze schematu artefaktu kolumnowego."""
+    if detect_format(path) == "csv":
+        preview = object_store.read_csv_preview(path, PREVIEW_ROWS_FOR_DTYPES)
+        return {str(name): str(dtype) for name, dtype in preview.dtypes.items()}
+    return read_artifact_schema(object_store.local_path(path))
+
+
+def _sampled_block_offsets(size: int, block_size: int, sample_blocks: int) -> List[int]:
+    n_blocks = max(1, -(-size // block_size))
+    if n_blocks <= sample_blocks:
+        return [i * block_size for i in range(n_blocks)]
+    step = (n_blocks - 1) / (sample_blocks - 1)
+    return sorted({int(round(i * step)) * block_size for i in range(sample_blocks)})
+
+
+def compute_fingerprint(path: str, object_store: Optional[CachedObjectStore] = None, exact: bool = False,
+                        block_size: int = DEFAULT_BLOCK_SIZE, sample_blocks: int = 16) -> DatasetFingerprint:
+    """
+    Liczy odcisk zbioru danych.
+    - `exact=False` (domyślnie): czytane są tylko próbkowane bloki (odczyty zakresowe); `content_hash` pochodzi
+      wyłącznie z MD5 obiektu GCS, a dla pozostałych plików jest None (sygnatura 'content' niedostępna),
+    - `exact=True`: jeden strumieniowy przebieg po blokach daje jednocześnie dokładny hash treści
+      i hashe próbkowanych bloków (dla obiektów GCS z MD5 w metadanych treść nie jest w ogóle czytana).
+    """
+    object_store = object_store or CachedObjectStore()
+    dtypes = _infer_dtypes(path, object_store)
+    columns = list(dtypes)
+    dtype_hashes = {name: _digest(f"{name}:{dtype}".encode())[:16] for name, dtype in dtypes.items()}
+    schema_hash = _digest("|".join(f"{name}:{dtype}" for name, dtype in dtypes.items()).encode())
+
+    remote_md5 = object_store.info(path).get("md5") if is_remote(path) else None
+    local_path = None
+    if exact and not remote_md5:
+        local_path = object_store.local_path(path)
+    if os.path.isdir(local_path or ("" if is_remote(path) else path)):
+        raise ValueError(f"Odcisk katalogu (zbioru partycjonowanego) nie jest obsługiwany: {path}")
+    size = object_store.info(path)["size"] if is_remote(path) else os.path.getsize(local_path or path)
+
+    offsets = set(_sampled_block_offsets(size, block_size, sample_blocks))
+    sample = hashlib.blake2b(str(size).encode(), digest_size=16)
+    content_hash = None
+
+    if local_path:
+        content = hashlib.blake2b(digest_size=16)
+        with open(local_path, "rb") as f:
+            offset = 0
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                content.update(block)
+                if offset in offsets:
+                    sample.update(_digest(block).encode())
+                offset += len(block)
+        content_hash = content.hexdigest()
+    else:
+        for offset in sorted(offsets):
+            sample.update(_digest(object_store.read_range(path, offset, block_size)).encode())
+        if remote_md5:
+            content_hash = base64.b64decode(remote_md5).hex()
+
+    return DatasetFingerprint(
+        path=path, size=size, columns=columns, schema_hash=schema_hash, dtype_hashes=dtype_hashes,
+        sample_hash=sample.hexdigest(), content_hash=content_hash,
+    )
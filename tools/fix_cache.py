@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import difflib
+import hashlib
+import sqlite3
+import contextlib
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from .error_fingerprint import failing_line, fingerprint_error, normalize_message
+
+
+# =================================================================================
+# Trwały indeks poprawek (SQLite na dysku lokalnym), współdzielony przez kolejne
+# uruchomienia. Klucz = odcisk błędu + hash fragmentu kodu wokół wadliwej linii;
+# wartość = łatka (bloki "przed" -> "po" z kontekstem), która ten błąd usunęła.
+# Łatka jest nakładana przez dopasowanie treści bloków, a nie numerów linii, więc działa
+# także na kodzie, który różni się od pierwotnego poza naprawianym miejscem.
+# Pewność wpisu = sukcesy / (sukcesy + odrzucenia w piaskownicy).
+# =================================================================================
+
+FIX_CACHE_SCHEMA_VERSION = 1
+PATCH_CONTEXT_LINES = 2
+
+
+def code_region_hash(code: str, line: Optional[int], radius: int = 3) -> str:
+    """Hash znormalizowanych linii kodu wokół wadliwej linii (bez numeru linii - cały kod)."""
+    lines = [normalize_message(l) for l in (code or "").splitlines()]
+    if line is not None and 0 < line <= len(lines):
+        lines = lines[max(0, line - 1 - radius):line + radius]
+    return hashlib.blake2b("\n".join(l for l in lines if l).encode(), digest_size=8).hexdigest()
+
+
+def fix_key(error_message: str, code: str, radius: int = 3) -> str:
+    fingerprint = fingerprint_error(error_message, code)
+    return f"{fingerprint.digest}:{code_region_hash(code, failing_line(error_message), radius)}"
+
+
+def make_patch(before: str, after: str, context: int = PATCH_CONTEXT_LINES) -> List[Dict[str, List[str]]]:
+    """Różnica kodu jako lista bloków {"before", "after"} z liniami kontekstu (do dopasowania treścią)."""
+    old, new = before.splitlines(), after.splitlines()
+    hunks = []
+    for group in difflib.SequenceMatcher(None, old, new, autojunk=False).get_grouped_opcodes(context):
+        i1, i2 = group[0][1], group[-1][2]
+        j1, j2 = group[0][3], group[-1][4]
+        hunks.append({"before": old[i1:i2], "after": new[j1:j2]})
+    return hunks
+
+
+def apply_patch(code: str, hunks: List[Dict[str, List[str]]]) -> Optional[str]:
+    """Nakłada łatkę; None, gdy któryś blok "przed" nie występuje w kodzie dokładnie raz."""
+    lines = code.splitlines()
+    stripped = [l.rstrip() for l in lines]
+    placements = []
+    for hunk in hunks:
+        before = [l.rstrip() for l in hunk["before"]]
+        if not before:
+            return None
+        starts = [i for i in range(len(stripped) - len(before) + 1) if stripped[i:i + len(before)] == before]
+        if len(starts) != 1:
+            return None
+        placements.append((starts[0], len(before), hunk["after"]))
+    placements.sort(reverse=True)
+    for (start, length, after), previous in zip(placements, [None] + placements[:-1]):
+        if previous is not None and start + length > previous[0]:
+            return None  # bloki nachodzą na siebie
+        lines[start:start + length] = after
+    return "\n".join(lines) + "\n"
+
+
+class FixCache:
+    """Indeks poprawek adresowany odciskiem błędu i fragmentem kodu."""
+
+    def __init__(self, db_path: str = ".cache/fixes.sqlite", region_lines: int = 3, min_confidence: float = 0.8):
+        self.db_path = db_path
+        self.region_lines = region_lines
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "low_confidence": 0, "not_applicable": 0,
+                      "validated": 0, "rejected": 0, "stores": 0}
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fixes ("
+                " key TEXT PRIMARY KEY, schema_version INTEGER, exc_type TEXT, analysis TEXT, patch_json TEXT,"
+                " successes INTEGER, failures INTEGER, created_at REAL, used_at REAL)"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Połączenie na jedną operację: transakcja zatwierdzana (albo wycofywana przy błędzie), potem zamknięcie."""
+        with contextlib.closing(sqlite3.connect(self.db_path, timeout=30)) as conn, conn:
+            yield conn
+
+    def key(self, error_message: str, code: str) -> str:
+        return fix_key(error_message, code, self.region_lines)
+
+    def lookup(self, error_message: str, code: str) -> Optional[Dict[str, Any]]:
+        """
+        Poprawka dla błędu o pewności co najmniej `min_confidence`, już nałożona na `code`:
+        {"key", "corrected_code", "analysis", "confidence"}; None - brak wpisu, niska pewność albo łatka nie pasuje.
+        """
+        key = self.key(error_message, code)
+        self.stats["lookups"] += 1
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT analysis, patch_json, successes, failures FROM fixes WHERE key = ? AND schema_version = ?",
+                (key, FIX_CACHE_SCHEMA_VERSION),
+            ).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        analysis, patch_json, successes, failures = row
+        confidence = successes / (successes + failures)
+        if confidence < self.min_confidence:
+            self.stats["low_confidence"] += 1
+            return None
+        corrected = apply_patch(code, json.loads(patch_json))
+        if corrected is None:
+            self.stats["not_applicable"] += 1
+            return None
+        self.stats["hits"] += 1
+        return {"key": key, "corrected_code": corrected, "analysis": analysis, "confidence": confidence}
+
+    def record_outcome(self, key: str, ok: bool):
+        """Wynik sprawdzenia poprawki z indeksu w piaskownicy (odrzucenia obniżają pewność wpisu)."""
+        self.stats["validated" if ok else "rejected"] += 1
+        column = "successes" if ok else "failures"
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE fixes SET {column} = {column} + 1, used_at = ? WHERE key = ?", (time.time(), key))
+
+    def store(self, error_message: str, failing_code: str, corrected_code: str, analysis: str = ""):
+        """Zapisuje poprawkę, która usunęła błąd; ta sama łatka zwiększa licznik sukcesów, inna zastępuje wpis."""
+        hunks = make_patch(failing_code, corrected_code)
+        if not hunks:
+            return
+        key = self.key(error_message, failing_code)
+        patch_json = json.dumps(hunks)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT patch_json FROM fixes WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] == patch_json:
+                conn.execute("UPDATE fixes SET successes = successes + 1, used_at = ? WHERE key = ?", (now, key))
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO fixes (key, schema_version, exc_type, analysis, patch_json,"
+                    " successes, failures, created_at, used_at) VALUES (?, ?, ?, ?, ?, 1, 0, ?, ?)",
+                    (key, FIX_CACHE_SCHEMA_VERSION, fingerprint_error(error_message, failing_code).exc_type,
+                     analysis, patch_json, now, now),
+                )
+        self.stats["stores"] += 1
+
+    def invalidate(self, key: Optional[str] = None):
+        """Usuwa jeden wpis albo (bez argumentu) cały indeks."""
+        with self._lock, self._connect() as conn:
+            if key is None:
+                conn.execute("DELETE FROM fixes")
+            else:
+                conn.execute("DELETE FROM fixes WHERE key = ?", (key,))
@@ -0,0 +1,274 @@
+import os
+import io
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple, Any
+import pandas as pd
+
+
+# =================================================================================
+# Warstwa I/O dla obiektów zdalnych (gs://) z lokalną pamięcią podręczną na dysku.
+# Wpisy są adresowane treścią (klucz: ścieżka + generacja/ETag obiektu), więc nowa
+# wersja obiektu w buckecie automatycznie unieważnia stare dane. Odczyty nagłówka
+# i podglądu korzystają z odczytów zakresowych z wyprzedzeniem (readahead), bez
+# pobierania całego pliku. Rozmiar pamięci ograniczony jest polityką LRU.
+# =================================================================================
+
+REMOTE_PREFIX = "gs://"
+
+
+def is_remote(path: str) -> bool:
+    return isinstance(path, str) and path.startswith(REMOTE_PREFIX)
+
+
+def split_remote_path(path: str) -> Tuple[str, str]:
+    bucket, _, key = path[len(REMOTE_PREFIX):].partition("/")
+    return bucket, key
+
+
+class GCSBackend:
+    """Backend Google Cloud Storage (metadane, odczyty zakresowe i pobieranie całych obiektów)."""
+
+    def __init__(self, project: Optional[str] = None):
+        from google.cloud import storage  # zależność opcjonalna - potrzebna tylko dla prawdziwego bucketu
+        self.client = storage.Client(project=project)
+
+    def _blob(self, path: str):
+        bucket, key = split_remote_path(path)
+        blob = self.client.bucket(bucket).get_blob(key)
+        if blob is None:
+            raise FileNotFoundError(path)
+        return blob
+
+    def info(self, path: str) -> Dict[str, Any]:
+        blob = self._blob(path)
+        return {"size": blob.size, "version": f"{blob.generation}-{blob.etag}", "md5": blob.md5_hash}
+
+    def read_range(self, path: str, start: int, end: int) -> bytes:
+        """Zwraca bajty z przedziału [start, end)."""
+        return self._blob(path).download_as_bytes(start=start, end=end - 1)
+
+    def download(self, path: str, local_path: str):
+        self._blob(path).download_to_filename(local_path)
+
+
+class LocalBucketBackend:
+    """
+    Backend zastępujący bucket lokalnym katalogiem: `gs://bucket/a/b.csv` -> `<root>/bucket/a/b.csv`.
+    Przydatny w testach i przy pracy offline; wersją obiektu jest rozmiar + czas modyfikacji.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _local(self, path: str) -> str:
+        bucket, key = split_remote_path(path)
+        local = os.path.join(self.root, bucket, key)
+        if not os.path.isfile(local):
+            raise FileNotFoundError(path)
+        return local
+
+    def info(self, path: str) -> Dict[str, Any]:
+        stat = os.stat(self._local(path))
+        return {"size": stat.st_size, "version": f"{stat.st_size}-{stat.st_mtime_ns}", "md5": None}
+
+    def read_range(self, path: str, start: int, end: int) -> bytes:
+        with open(self._local(path), "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def download(self, path: str, local_path: str):
+        shutil.copyfile(self._local(path), local_path)
+
+
+class CachedObjectStore:
+    """
+    Pamięć podręczna obiektów zdalnych na dysku lokalnym.
+    - `local_path()` pobiera obiekt raz i zwraca ścieżkę do lokalnej kopii,
+    - `read_range()` czyta fragmenty blokami z wyprzedzeniem (readahead),
+    - `read_csv_header()` / `read_csv_preview()` pobierają tylko początek pliku.
+    Ścieżki lokalne są przepuszczane bez zmian.
+    """
+
+    def __init__(self, cache_dir: str = ".cache/objects", max_bytes: int = 20 * 1024**3,
+                 block_size: int = 1024**2, readahead_blocks: int = 4, backend=None, metadata_ttl: float = 60.0):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+        self.readahead_blocks = readahead_blocks
+        self.metadata_ttl = metadata_ttl
+        self._backend = backend
+        self._info_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "bytes_fetched": 0, "evictions": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = GCSBackend()
+        return self._backend
+
+    # --- Metadane i klucze ---
+
+    def info(self, path: str) -> Dict[str, Any]:
+        """Metadane obiektu (rozmiar, wersja); zapamiętywane na `metadata_ttl` sekund."""
+        now = time.monotonic()
+        cached = self._info_cache.get(path)
+        if cached and now - cached[0] < self.metadata_ttl:
+            return cached[1]
+        info = self.backend.info(path)
+        self._info_cache[path] = (now, info)
+        return info
+
+    def version(self, path: str) -> str:
+        return self.info(path)["version"]
+
+    def _entry_dir(self, path: str) -> str:
+        key = hashlib.sha256(f"{path}@{self.version(path)}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, key)
+
+    def _touch(self, entry_dir: str):
+        os.utime(entry_dir, None)
+
+    # --- Pełne obiekty ---
+
+    def local_path(self, path: str) -> str:
+        """Zwraca ścieżkę do lokalnej kopii obiektu, pobierając go tylko przy braku w pamięci."""
+        if not is_remote(path):
+            return path
+        entry_dir = self._entry_dir(path)
+        data_path = os.path.join(entry_dir, "data" + os.path.splitext(path)[1])
+        with self._lock:
+            if os.path.exists(data_path):
+                self.stats["hits"] += 1
+                self._touch(entry_dir)
+                return data_path
+            self.stats["misses"] += 1
+            os.makedirs(entry_dir, exist_ok=True)
+            print(f"  [I/O] Pobieram obiekt do lokalnej pamięci podręcznej: {path}")
+            fd, tmp_path = tempfile.mkstemp(dir=entry_dir, suffix=".part")
+            os.close(fd)
+            try:
+                self.backend.download(path, tmp_path)
+                os.replace(tmp_path, data_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self.stats["bytes_fetched"] += os.path.getsize(data_path)
+            # Bloki z odczytów zakresowych są już zbędne - cały obiekt jest lokalnie
+            shutil.rmtree(os.path.join(entry_dir, "blocks"), ignore_errors=True)
+            self._touch(entry_dir)
+            self._evict(protect=entry_dir)
+        return data_path
+
+    # --- Odczyty zakresowe ---
+
+    def read_range(self, path: str, start: int, length: int) -> bytes:
+        """Czyta `length` bajtów od `start`; brakujące bloki pobierane są jednym żądaniem z readahead."""
+        if not is_remote(path):
+            with open(path, "rb") as f:
+                f.seek(start)
+                return f.read(length)
+        size = self.info(path)["size"]
+        end = min(start + length, size)
+        if start >= end:
+            return b""
+        entry_dir = self._entry_dir(path)
+        full_copy = os.path.join(entry_dir, "data" + os.path.splitext(path)[1])
+        if os.path.exists(full_copy):
+            self.stats["hits"] += 1
+            self._touch(entry_dir)
+            with open(full_copy, "rb") as f:
+                f.seek(start)
+                return f.read(end - start)
+
+        blocks_dir = os.path.join(entry_dir, "blocks")
+        first_block, last_block = start // self.block_size, (end - 1) // self.block_size
+        with self._lock:
+            os.makedirs(blocks_dir, exist_ok=True)
+            missing = [b for b in range(first_block, last_block + 1)
+                       if not os.path.exists(os.path.join(blocks_dir, str(b)))]
+            if missing:
+                self.stats["misses"] += 1
+                n_blocks = -(-size // self.block_size)
+                fetch_from = missing[0]
+                fetch_to = min(n_blocks - 1, missing[-1] + self.readahead_blocks)
+                data = self.backend.read_range(path, fetch_from * self.block_size,
+                                               min(size, (fetch_to + 1) * self.block_size))
+                self.stats["bytes_fetched"] += len(data)
+                for block in range(fetch_from, fetch_to + 1):
+                    offset = (block - fetch_from) * self.block_size
+                    self._write_block(os.path.join(blocks_dir, str(block)), data[offset:offset + self.block_size])
+            else:
+                self.stats["hits"] += 1
+            self._touch(entry_dir)
+            self._evict(protect=entry_dir)
+
+        buffer = io.BytesIO()
+        for block in range(first_block, last_block + 1):
+            with open(os.path.join(blocks_dir, str(block)), "rb") as f:
+                buffer.write(f.read())
+        offset = start - first_block * self.block_size
+        return buffer.getvalue()[offset:offset + (end - start)]
+
+    def _write_block(self, block_path: str, data: bytes):
+        """Zapis atomowy (plik tymczasowy + os.replace) - przerwany zapis nie zostawia uciętego bloku."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(block_path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, block_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def read_head_lines(self, path: str, n_lines: int) -> bytes:
+        """Zwraca początek pliku zawierający co najmniej `n_lines` pełnych linii (lub cały plik)."""
+        if not is_remote(path):
+            size = os.path.getsize(path)
+        else:
+            size = self.info(path)["size"]
+        length = self.block_size
+        while True:
+            data = self.read_range(path, 0, length)
+            if data.count(b"\n") >= n_lines or length >= size:
+                break
+            length *= 2
+        if length < size and b"\n" in data:
+            data = data[:data.rfind(b"\n") + 1]  # odcinamy ostatnią, niepełną linię
+        return data
+
+    def read_csv_header(self, path: str) -> List[str]:
+        return pd.read_csv(io.BytesIO(self.read_head_lines(path, 1)), nrows=0).columns.tolist()
+
+    def read_csv_preview(self, path: str, nrows: int) -> pd.DataFrame:
+        return pd.read_csv(io.BytesIO(self.read_head_lines(path, nrows + 1)), nrows=nrows)
+
+    # --- LRU ---
+
+    def _entry_size(self, entry_dir: str) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(entry_dir):
+            total += sum(os.path.getsize(os.path.join(dirpath, name)) for name in filenames)
+        return total
+
+    def _evict(self, protect: Optional[str] = None):
+        """Usuwa najdawniej używane wpisy, dopóki łączny rozmiar przekracza `max_bytes`."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            if os.path.isdir(entry_dir):
+                entries.append((os.path.getmtime(entry_dir), entry_dir, self._entry_size(entry_dir)))
+        total = sum(size for _, _, size in entries)
+        for _, entry_dir, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry_dir == protect:
+                continue
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            self.stats["evictions"] += 1
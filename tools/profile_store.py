@@ -0,0 +1,86 @@
+import os
+import json
+import time
+import sqlite3
+import contextlib
+import threading
+from typing import Any, Dict, Iterator, Optional
+
+
+# =================================================================================
+# Trwały magazyn profili kolumn (SQLite na dysku lokalnym). Kluczem jest sygnatura
+# odcisku zbioru danych, więc kolejne uruchomienia na tych samych danych dostają
+# typy, odsetki braków, kardynalności i kwantyle bez ponownego czytania pliku.
+# Przechowywany jest słownik z `TableProfile.to_dict()`.
+# =================================================================================
+
+PROFILE_SCHEMA_VERSION = 1
+
+
+def _json_default(value: Any):
+    """Wartości spoza JSON (typy numpy, znaczniki czasu) zapisujemy jako liczby albo tekst."""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _restore_quantiles(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON zamienia klucze kwantyli (0.25, 0.5, 0.75) na tekst - przywracamy liczby."""
+    for column in summary.get("columns", {}).values():
+        if "quantiles" in column:
+            column["quantiles"] = {float(q): v for q, v in column["quantiles"].items()}
+    return summary
+
+
+class ProfileStore:
+    """Magazyn profili kolumn adresowany sygnaturą zbioru danych."""
+
+    def __init__(self, db_path: str = ".cache/profiles.sqlite"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS profiles ("
+                " signature TEXT PRIMARY KEY, schema_version INTEGER, path TEXT,"
+                " created_at REAL, profile_json TEXT)"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Połączenie na jedną operację: transakcja zatwierdzana (albo wycofywana przy błędzie), potem zamknięcie."""
+        with contextlib.closing(sqlite3.connect(self.db_path, timeout=30)) as conn, conn:
+            yield conn
+
+    def get(self, signature: str) -> Optional[Dict[str, Any]]:
+        """Zwraca zapisany profil albo None (także dla profili zapisanych w starszym formacie)."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT profile_json FROM profiles WHERE signature = ? AND schema_version = ?",
+                (signature, PROFILE_SCHEMA_VERSION),
+            ).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return _restore_quantiles(json.loads(row[0]))
+
+    def put(self, signature: str, path: str, profile: Dict[str, Any]):
+        payload = json.dumps(profile, default=_json_default)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO profiles (signature, schema_version, path, created_at, profile_json)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (signature, PROFILE_SCHEMA_VERSION, path, time.time(), payload),
+            )
+
+    def invalidate(self, signature: Optional[str] = None):
+        """Usuwa jeden profil albo (bez argumentu) cały magazyn."""
+        with self._lock, self._connect() as conn:
+            if signature is None:
+                conn.execute("DELETE FROM profiles")
+            else:
+                conn.execute("DELETE FROM profiles WHERE signature = ?", (signature,))
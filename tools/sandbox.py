@@ -0,0 +1,486 @@
+import os
+import io
+import sys
+import time
+import queue
+import signal
+import atexit
+import importlib
+import threading
+import traceback
+import statistics
+import multiprocessing
+from collections import deque
+from contextlib import nullcontext, redirect_stdout, redirect_stderr
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
+
+
+# =================================================================================
+# Pula wstępnie rozgrzanych procesów-piaskownic do wykonywania kodu generowanego przez LLM.
+# Procesy powstają z forkservera, który ma już zaimportowane pandas/numpy/matplotlib,
+# więc start nowego procesu nie płaci za importy. Kod wykonywany jest poza głównym
+# procesem (jądrem notatnika): wyciek pamięci lub zawieszenie nie psuje stanu interpretera,
+# a każde zadanie dostaje świeży zakres zmiennych. Proces jest wymieniany po N zadaniach
+# albo po przekroczeniu progu RSS.
+#
+# Limity pojedynczego wykonania pilnowane są dwutorowo:
+# - w procesie-piaskownicy: RLIMIT_AS (MemoryError -> MemoryLimitExceeded) i RLIMIT_CPU (SIGXCPU),
+# - w procesie nadrzędnym: czas zegarowy, RSS i czas CPU próbkowane z /proc - po przekroczeniu
+#   proces jest zabijany, co działa także wtedy, gdy kod utknął w długiej operacji w C.
+# =================================================================================
+
+PRELOAD_MODULES = ["pandas", "numpy", "matplotlib", "pyarrow.parquet", "tools.artifacts"]
+DEFAULT_IMPORTS = {"pd": "pandas"}
+MONITOR_INTERVAL_S = 0.25
+CPU_GRACE_S = 5.0  # zapas na obsługę SIGXCPU w procesie, zanim proces nadrzędny go zabije
+
+
+class MemoryLimitExceeded(MemoryError):
+    """Wykonanie przekroczyło limit pamięci (RLIMIT_AS lub RSS)."""
+
+
+class CpuTimeLimitExceeded(Exception):
+    """Wykonanie przekroczyło limit czasu procesora."""
+
+
+class ExecutionLimits(BaseModel):
+    """Limity pojedynczego wykonania kodu w piaskownicy (None = bez limitu)."""
+    wall_time_s: Optional[float] = Field(default=None, description="Limit czasu zegarowego (TimeoutError).")
+    memory_bytes: Optional[int] = Field(default=None, description="Limit pamięci: RSS oraz zapas przestrzeni adresowej (MemoryLimitExceeded).")
+    cpu_time_s: Optional[float] = Field(default=None, description="Limit czasu procesora (CpuTimeLimitExceeded).")
+
+
+def _current_rss() -> int:
+    """Bieżące RSS procesu w bajtach (/proc), a poza Linuksem - szczytowe RSS z getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _proc_status_bytes(field: str, pid: str = "self") -> Optional[int]:
+    """Czyta pole pamięci (np. VmHWM, VmSize) z /proc/<pid>/status; None poza Linuksem."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """Zeruje licznik szczytowego RSS (VmHWM), aby mierzyć szczyt pojedynczego zadania (Linux >= 4.0)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _process_usage(pid: int) -> Optional[Tuple[int, float]]:
+    """(RSS w bajtach, łączny czas CPU w sekundach) innego procesu z /proc; None, gdy niedostępne."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        return rss, cpu
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _raise_cpu_limit(signum, frame):
+    raise CpuTimeLimitExceeded("Przekroczono limit czasu procesora (RLIMIT_CPU).")
+
+
+def _apply_limits(limits: Dict[str, Any]) -> Dict[int, Tuple[int, int]]:
+    """Ustawia miękkie limity zasobów względem bieżącego zużycia i zwraca poprzednie wartości."""
+    import resource
+    previous = {}
+    if limits.get("memory_bytes"):
+        vm_size = _proc_status_bytes("VmSize") or 0
+        previous[resource.RLIMIT_AS] = resource.getrlimit(resource.RLIMIT_AS)
+        soft, hard = previous[resource.RLIMIT_AS]
+        limit = vm_size + limits["memory_bytes"]
+        resource.setrlimit(resource.RLIMIT_AS, (limit if hard == resource.RLIM_INFINITY else min(limit, hard), hard))
+    if limits.get("cpu_time_s"):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        previous[resource.RLIMIT_CPU] = resource.getrlimit(resource.RLIMIT_CPU)
+        soft, hard = previous[resource.RLIMIT_CPU]
+        limit = int(usage.ru_utime + usage.ru_stime + limits["cpu_time_s"]) + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (limit if hard == resource.RLIM_INFINITY else min(limit, hard), hard))
+    return previous
+
+
+def _restore_limits(previous: Dict[int, Tuple[int, int]]):
+    import resource
+    for kind, value in previous.items():
+        resource.setrlimit(kind, value)
+
+
+def _cpu_seconds() -> float:
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _figures_to_html(figures: List[Any]) -> List[str]:
+    from .utils import embed_plot_to_html
+    return [embed_plot_to_html(fig) for fig in figures]
+
+
+def _execute(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Wykonuje jedno zadanie w procesie-piaskownicy i zwraca słownik wyniku (bez wyjątków)."""
+    from .artifacts import read_artifact
+    from .dtype_optimizer import DtypeLayer, SCOPE_READER
+    from .code_profiler import SamplingProfiler
+    stdout = io.StringIO()
+    result: Dict[str, Any] = {"ok": False, "traceback": None, "error_type": None, "limit_exceeded": None, "outputs": {}}
+    limits = job.get("limits") or {}
+    _reset_peak_rss()
+    started, cpu_started = time.perf_counter(), _cpu_seconds()
+    previous_limits = {}
+    duckdb_session = None
+    try:
+        previous_limits = _apply_limits(limits)
+        if job.get("cwd"):
+            os.chdir(job["cwd"])
+        scope: Dict[str, Any] = {alias: importlib.import_module(module) for alias, module in job["imports"].items()}
+        scope.update(job.get("variables") or {})
+        dtype_layer = DtypeLayer(**job["dtype_options"]) if job.get("dtype_options") is not None else None
+        if dtype_layer is not None:
+            scope[SCOPE_READER] = dtype_layer.read
+        if job.get("duckdb_options") is not None:
+            from .duckdb_backend import DuckDBSession  # zależność opcjonalna, tylko dla zadań silnika DuckDB
+            duckdb_session = DuckDBSession(**job["duckdb_options"])
+            scope.update(duckdb_session.scope())
+        for name, spec in (job.get("frames") or {}).items():
+            if spec.get("optimize") and dtype_layer is not None:
+                scope[name] = dtype_layer.read(spec["path"], columns=spec.get("columns"))
+            else:
+                scope[name] = read_artifact(spec["path"], columns=spec.get("columns"))
+        profile_options = dict(job.get("profile_options") or {})
+        top_n = profile_options.pop("top_n", 10)
+        profiler = SamplingProfiler(**profile_options) if job.get("profile_options") is not None else None
+        with redirect_stdout(stdout), redirect_stderr(stdout), profiler or nullcontext():
+            exec(job["code"], scope)
+            if job.get("driver"):
+                # Funkcja sterująca z kodu systemu (np. przetwarzanie jednego kawałka danych) - dostaje zakres wykonanego kodu
+                module_name, function_name = job["driver"].split(":")
+                driver = getattr(importlib.import_module(module_name), function_name)
+                result["outputs"]["driver"] = driver(scope, **(job.get("driver_kwargs") or {}))
+        for name in job.get("collect") or []:
+            result["outputs"][name] = scope.get(name)
+        if job.get("render_figures"):
+            result["outputs"]["figures_html"] = _figures_to_html(scope.get("figures_to_embed", []))
+        if dtype_layer is not None:
+            result["outputs"]["dtype_report"] = dtype_layer.summary()
+        if profiler is not None:
+            result["outputs"]["profile"] = {"hotspots": profiler.hotspots(job["code"], top_n), "samples": profiler.samples,
+                                            "sampled_s": round(profiler.total_s, 3), "interval_s": profiler.interval_s}
+        result["ok"] = True
+    except CpuTimeLimitExceeded:
+        result["traceback"] = traceback.format_exc()
+        result["error_type"], result["limit_exceeded"] = "CpuTimeLimitExceeded", "cpu_time"
+    except MemoryError:
+        result["traceback"] = traceback.format_exc()
+        if limits.get("memory_bytes"):
+            result["traceback"] += (f"MemoryLimitExceeded: kod przekroczył limit pamięci "
+                                    f"{limits['memory_bytes'] / 1024**3:.1f} GB dla pojedynczego wykonania.\n")
+            result["error_type"], result["limit_exceeded"] = "MemoryLimitExceeded", "memory"
+        else:
+            result["error_type"] = "MemoryError"
+    except BaseException as e:
+        result["traceback"] = traceback.format_exc()
+        result["error_type"] = type(e).__name__
+    finally:
+        if duckdb_session is not None:
+            duckdb_session.close()
+        _restore_limits(previous_limits)
+        import matplotlib.pyplot as plt
+        plt.close("all")
+    result["stdout"] = stdout.getvalue()
+    result["exec_s"] = time.perf_counter() - started
+    result["usage"] = {
+        "wall_s": result["exec_s"],
+        "cpu_s": _cpu_seconds() - cpu_started,
+        "peak_rss_bytes": _proc_status_bytes("VmHWM") or _current_rss(),
+    }
+    return result
+
+
+def _worker_main(conn, max_jobs: int, max_rss_bytes: Optional[int]):
+    """Pętla procesu-piaskownicy: odbiera zadania z potoku, aż do polecenia zamknięcia lub emerytury."""
+    import matplotlib
+    matplotlib.use("Agg", force=True)  # bez GUI i bez backendu inline notatnika
+    import matplotlib.pyplot  # noqa: F401
+    signal.signal(signal.SIGXCPU, _raise_cpu_limit)
+    conn.send({"ready_at": time.time(), "pid": os.getpid()})
+    jobs = 0
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        result = _execute(job)
+        jobs += 1
+        rss = _current_rss()
+        retiring = None
+        if result["limit_exceeded"]:
+            retiring = "limit"  # po przekroczeniu limitu stan procesu (sterta, wątki) jest niepewny
+        elif jobs >= max_jobs:
+            retiring = "jobs"
+        elif max_rss_bytes and rss > max_rss_bytes:
+            retiring = "rss"
+        result["worker"] = {"pid": os.getpid(), "jobs": jobs, "rss_bytes": rss, "retiring": retiring}
+        try:
+            conn.send(result)
+        except Exception:
+            # Zebrane obiekty nie dały się zserializować - odsyłamy sam błąd
+            conn.send({"ok": False, "traceback": traceback.format_exc(), "error_type": "PicklingError", "limit_exceeded": None,
+                       "outputs": {}, "stdout": result["stdout"], "exec_s": result["exec_s"], "usage": result["usage"],
+                       "worker": result["worker"]})
+        if retiring:
+            break
+    conn.close()
+
+
+def _cancelled_result(wall_s: float) -> Dict[str, Any]:
+    return {"ok": False, "error_type": "Cancelled", "limit_exceeded": None, "outputs": {}, "stdout": "",
+            "exec_s": wall_s, "worker": None, "usage": None,
+            "traceback": "Cancelled: zadanie zostało anulowane; proces piaskownicy został zatrzymany."}
+
+
+class _Worker:
+    """Uchwyt pojedynczego procesu-piaskownicy (start nieblokujący, gotowość sprawdzana przy pierwszym użyciu)."""
+
+    def __init__(self, ctx, max_jobs: int, max_rss_bytes: Optional[int]):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, max_jobs, max_rss_bytes), daemon=True)
+        self.started_at = time.time()
+        self.process.start()
+        child_conn.close()
+        self.startup_s: Optional[float] = None
+
+    def wait_ready(self) -> float:
+        if self.startup_s is None:
+            ready = self.conn.recv()
+            self.pid = ready["pid"]
+            self.startup_s = ready["ready_at"] - self.started_at
+        return self.startup_s
+
+    def stop(self, timeout: float = 5.0):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    Pula procesów-piaskownic uruchamianych z forkservera z wstępnie zaimportowanymi bibliotekami.
+    - `run()` wysyła kod do wolnego procesu i zwraca słownik: ok, traceback, error_type, limit_exceeded,
+      outputs, stdout, usage (czas zegarowy, czas CPU, szczytowe RSS) i metryki,
+    - ramki danych (`frames`) są wczytywane po stronie procesu z lokalnych ścieżek, a nie przesyłane potokiem,
+    - `limits` (domyślne dla puli albo podane w `run()`) zamieniają przekroczenia na błędy
+      `TimeoutError`, `MemoryLimitExceeded` lub `CpuTimeLimitExceeded`,
+    - proces jest wymieniany po `max_jobs_per_worker` zadaniach, gdy jego RSS przekroczy `max_rss_bytes`
+      albo po przekroczeniu limitu.
+    Metody są bezpieczne wątkowo - kilka zadań może działać równolegle (do `size` naraz).
+    """
+
+    def __init__(self, size: int = 2, max_jobs_per_worker: int = 20, max_rss_bytes: Optional[int] = 4 * 1024**3,
+                 preload: Optional[List[str]] = None, limits: Optional[ExecutionLimits] = None):
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_rss_bytes = max_rss_bytes
+        self.limits = limits or ExecutionLimits()
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._ctx = multiprocessing.get_context(method)
+        if method == "forkserver":
+            self._ctx.set_forkserver_preload(preload or PRELOAD_MODULES)
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._all: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._resize_lock = threading.Lock()
+        self._closed = False
+        self.stats = {"workers_started": 0, "workers_recycled": 0, "recycled_by_jobs": 0, "recycled_by_rss": 0,
+                      "recycled_by_limit": 0, "recycled_by_cancel": 0, "crashes": 0, "jobs": 0, "failed_jobs": 0,
+                      "limit_breaches": {"wall_time": 0, "memory": 0, "cpu_time": 0}}
+        self._latencies = {name: deque(maxlen=1000) for name in ("startup_s", "exec_s", "roundtrip_s")}
+        for _ in range(size):
+            self._idle.put(self._spawn())
+        atexit.register(self.close)
+
+    def ensure_size(self, size: int):
+        """Powiększa pulę do `size` procesów (np. przed równoległym przetwarzaniem kawałków danych)."""
+        # Osobna blokada: równoległe wywołania nie mogą obie uznać puli za zbyt małą i uruchomić nadmiarowych procesów
+        with self._resize_lock:
+            while self.size < size:
+                self._idle.put(self._spawn())
+                self.size += 1
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._ctx, self.max_jobs_per_worker, self.max_rss_bytes)
+        with self._lock:
+            self._all.append(worker)
+            self.stats["workers_started"] += 1
+        return worker
+
+    def _retire(self, worker: _Worker, reason: str, kill: bool = False):
+        """Zamyka (lub zabija) proces i od razu uruchamia następcę, aby pula pozostała rozgrzana."""
+        worker.kill() if kill else worker.stop()
+        with self._lock:
+            self._all.remove(worker)
+            if reason == "crash":
+                self.stats["crashes"] += 1
+            else:
+                self.stats["workers_recycled"] += 1
+                self.stats[f"recycled_by_{reason}"] += 1
+        if not self._closed:
+            self._idle.put(self._spawn())
+
+    def _watch(self, worker: _Worker, limits: ExecutionLimits, started: float,
+               cancel_event: Optional[threading.Event] = None) -> Optional[Dict[str, Any]]:
+        """
+        Czeka na wynik, próbkując zużycie procesu. Zwraca None, gdy wynik jest gotowy,
+        albo opis przekroczenia limitu lub anulowania (proces trzeba wtedy zabić).
+        """
+        baseline = _process_usage(worker.pid)
+        peak_rss, cpu_s = 0, 0.0
+        while not worker.conn.poll(MONITOR_INTERVAL_S):
+            wall_s = time.perf_counter() - started
+            usage = _process_usage(worker.pid)
+            if usage and baseline:
+                peak_rss, cpu_s = max(peak_rss, usage[0]), usage[1] - baseline[1]
+            breach = None
+            if limits.wall_time_s and wall_s > limits.wall_time_s:
+                breach = ("wall_time", "TimeoutError", f"wykonanie przekroczyło limit czasu {limits.wall_time_s:.0f} s")
+            elif limits.memory_bytes and peak_rss > limits.memory_bytes:
+                breach = ("memory", "MemoryLimitExceeded",
+                          f"RSS procesu ({peak_rss / 1024**3:.2f} GB) przekroczył limit {limits.memory_bytes / 1024**3:.1f} GB")
+            elif limits.cpu_time_s and cpu_s > limits.cpu_time_s + CPU_GRACE_S:
+                breach = ("cpu_time", "CpuTimeLimitExceeded", f"czas CPU ({cpu_s:.0f} s) przekroczył limit {limits.cpu_time_s:.0f} s")
+            if cancel_event is not None and cancel_event.is_set():
+                return _cancelled_result(wall_s)
+            if breach:
+                limit, error_type, message = breach
+                return {"ok": False, "error_type": error_type, "limit_exceeded": limit, "outputs": {}, "stdout": "",
+                        "exec_s": wall_s, "worker": None,
+                        "traceback": f"{error_type}: {message}; proces piaskownicy został zatrzymany.",
+                        "usage": {"wall_s": wall_s, "cpu_s": cpu_s, "peak_rss_bytes": peak_rss}}
+            if not worker.process.is_alive():
+                return None  # recv() zgłosi EOFError i zadanie zostanie potraktowane jak awaria procesu
+        return None
+
+    def run(self, code: str, variables: Optional[Dict[str, Any]] = None, frames: Optional[Dict[str, Dict[str, Any]]] = None,
+            collect: Optional[List[str]] = None, render_figures: bool = False,
+            imports: Optional[Dict[str, str]] = None, limits: Optional[ExecutionLimits] = None,
+            driver: Optional[str] = None, driver_kwargs: Optional[Dict[str, Any]] = None,
+            cancel_event: Optional[threading.Event] = None, dtype_options: Optional[Dict[str, Any]] = None,
+            duckdb_options: Optional[Dict[str, Any]] = None, profile_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Wykonuje `code` w wolnym procesie-piaskownicy.
+        - `variables`: małe, serializowalne wartości wstawiane do zakresu (np. ścieżki),
+        - `frames`: {nazwa: {"path": ..., "columns": [...]}} - ramki wczytywane w procesie,
+        - `collect`: nazwy zmiennych zwracanych w `outputs`,
+        - `render_figures`: figury z `figures_to_embed` zwracane jako gotowe tagi <img> (`outputs['figures_html']`),
+        - `imports`: aliasy modułów w zakresie (domyślnie tylko `pd`),
+        - `limits`: limity tego wykonania (domyślnie limity puli),
+        - `driver`: opcjonalna funkcja systemowa 'moduł:funkcja' wywoływana po kodzie jako `f(scope, **driver_kwargs)`;
+          jej wynik trafia do `outputs['driver']`,
+        - `cancel_event`: ustawienie zdarzenia przerywa zadanie (proces jest zabijany, wynik: `error_type="Cancelled"`),
+        - `dtype_options`: włącza warstwę optymalizacji typów (`DtypeLayer`): w zakresie pojawia się `read_optimized`,
+          ramki z `"optimize": True` są wczytywane przez nią, a raport oszczędności trafia do `outputs['dtype_report']`,
+        - `duckdb_options`: silnik DuckDB (`DuckDBSession`): w zakresie pojawiają się `con`, `read_input` i `write_result`,
+        - `profile_options`: próbkujący profiler linii kodu (`SamplingProfiler`: `interval_s`, `top_n`); najkosztowniejsze
+          linie trafiają do `outputs['profile']`.
+        """
+        if self._closed:
+            raise RuntimeError("Pula piaskownic została zamknięta.")
+        limits = limits or self.limits
+        job = {"code": code, "variables": variables, "frames": frames, "collect": collect,
+               "render_figures": render_figures, "imports": imports or DEFAULT_IMPORTS, "cwd": os.getcwd(),
+               "limits": limits.model_dump(), "driver": driver, "driver_kwargs": driver_kwargs,
+               "dtype_options": dtype_options, "duckdb_options": duckdb_options, "profile_options": profile_options}
+        worker = self._idle.get()
+        started = time.perf_counter()
+        if cancel_event is not None and cancel_event.is_set():
+            # Anulowane jeszcze przed startem - proces wraca do puli nietknięty
+            self._idle.put(worker)
+            return {**_cancelled_result(0.0), "roundtrip_s": time.perf_counter() - started}
+        try:
+            startup_s = worker.wait_ready() if worker.startup_s is None else None
+            if startup_s is not None:
+                self._latencies["startup_s"].append(startup_s)
+            # Limit czasu zegarowego liczony od wysłania zadania - start procesu (importy) się do niego nie wlicza
+            worker.conn.send(job)
+            result = self._watch(worker, limits, time.perf_counter(), cancel_event) or worker.conn.recv()
+        except (EOFError, OSError, BrokenPipeError):
+            self._retire(worker, "crash")
+            exit_code = worker.process.exitcode
+            result = {"ok": False, "error_type": "WorkerCrashed", "limit_exceeded": None, "outputs": {}, "stdout": "",
+                      "exec_s": None, "usage": None, "worker": None,
+                      "traceback": f"WorkerCrashed: proces piaskownicy zakończył się nieoczekiwanie (kod wyjścia: {exit_code})."}
+        else:
+            if result["worker"] is None:
+                # Limit przekroczony (lub zadanie anulowane) w trakcie wykonania - proces jest zabijany i zastępowany nowym
+                self._retire(worker, "cancel" if result["error_type"] == "Cancelled" else "limit", kill=True)
+            elif result["worker"]["retiring"]:
+                self._retire(worker, result["worker"]["retiring"])
+            else:
+                self._idle.put(worker)
+            self._latencies["exec_s"].append(result["exec_s"])
+        roundtrip_s = time.perf_counter() - started
+        self._latencies["roundtrip_s"].append(roundtrip_s)
+        result["roundtrip_s"] = roundtrip_s
+        with self._lock:
+            self.stats["jobs"] += 1
+            if not result["ok"]:
+                self.stats["failed_jobs"] += 1
+            if result["limit_exceeded"]:
+                self.stats["limit_breaches"][result["limit_exceeded"]] += 1
+        return result
+
+    def metrics(self) -> Dict[str, Any]:
+        """Liczniki puli oraz mediana / p95 / maksimum opóźnień startu procesu, wykonania i pełnego przebiegu."""
+        summary: Dict[str, Any] = dict(self.stats)
+        for name, values in self._latencies.items():
+            values = sorted(values)
+            if values:
+                summary[name] = {"count": len(values), "p50": statistics.median(values),
+                                 "p95": values[min(len(values) - 1, int(0.95 * len(values)))], "max": values[-1]}
+        return summary
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        with self._lock:
+            workers = list(self._all)
+            self._all.clear()
+        for worker in workers:
+            worker.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,59 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, List, Optional, Tuple
+
+
+# =================================================================================
+# Wyścig kandydatów: K zadań (np. "wygeneruj poprawkę i sprawdź ją w piaskownicy")
+# działa równolegle; pierwszy wynik zaakceptowany przez `accept` wygrywa, a pozostałe
+# zadania dostają sygnał anulowania (wspólne `threading.Event`). Zadania, które jeszcze
+# nie ruszyły, są porzucane (`cancel_futures=True`); trwające powinny sprawdzać zdarzenie
+# (np. przekazując je do `SandboxPool.run(cancel_event=...)`, które zabija proces).
+# Wątku w trakcie blokującego wywołania (np. żądania HTTP do modelu) nie da się przerwać:
+# `race` czeka na przegranych co najwyżej `cancel_grace_s`, a ich późniejsze wyniki są odrzucane.
+# =================================================================================
+
+DEFAULT_CANCEL_GRACE_S = 2.0
+
+def race(tasks: List[Callable[[threading.Event], Any]], accept: Callable[[Any], bool],
+         max_workers: Optional[int] = None, cancel_grace_s: float = DEFAULT_CANCEL_GRACE_S) -> Tuple[Optional[int], List[Any]]:
+    """
+    Uruchamia `tasks` równolegle (każde dostaje zdarzenie anulowania). Zwraca (indeks zwycięzcy albo None,
+    wyniki w kolejności zadań - None dla zadań anulowanych lub zakończonych wyjątkiem).
+    Po rozstrzygnięciu czeka najwyżej `cancel_grace_s` na zakończenie anulowanych zadań (zwalniają procesy piaskownic).
+    """
+    cancel_event = threading.Event()
+    results: List[Any] = [None] * len(tasks)
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(tasks) or 1)
+    futures = {executor.submit(task, cancel_event): i for i, task in enumerate(tasks)}
+    winner = None
+    try:
+        pending = set(futures)
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=futures.get):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    print(f"  [SPEKULACJA] Kandydat {index} zakończył się wyjątkiem: {e}")
+                    continue
+                if winner is None and accept(results[index]):
+                    winner = index
+    finally:
+        cancel_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        running = [future for future in futures if not future.done()]
+        if running:
+            _, still_running = wait(running, timeout=cancel_grace_s)
+            if still_running:
+                print(f"  [SPEKULACJA] {len(still_running)} anulowanych kandydatów nadal czeka na zablokowane wywołanie "
+                      f"- ich wyniki zostaną odrzucone.")
+    return winner, results
+
+
+def chosen_result(winner: Optional[int], results: List[Any]) -> Any:
+    """Wynik zwycięzcy, a bez zwycięzcy - pierwszy wynik, który powstał (kandydat dla zwykłej pętli naprawczej); None, gdy żaden."""
+    if winner is not None:
+        return results[winner]
+    return next((r for r in results if r is not None), None)
@@ -0,0 +1,382 @@
+import re
+import ast
+import builtins
+import symtable
+from typing import Dict, List, Optional, Set, Tuple
+from pydantic import BaseModel
+from .code_rules import check_code, ENTRY_FUNCTION, FORBIDDEN_MODULES
+from .dtype_optimizer import SCOPE_READER, SCOPE_FRAME
+
+
+# =================================================================================
+# Analiza statyczna wygenerowanego kodu przed wykonaniem oraz deterministyczne,
+# lokalne poprawki trywialnych klas błędów. Wykrywa: błędy składni, niezdefiniowane
+# nazwy, nieużywane i zabronione importy oraz odwołania do kolumn spoza znanego
+# schematu (błąd tylko wtedy, gdy zbiór kolumn da się ustalić statycznie - w innym
+# wypadku ostrzeżenie). Poprawki mechaniczne (pozostałości bloków markdown, zabłąkane
+# znaki przed komentarzem, brakujące wywołanie końcowe, wielkość liter w nazwie kolumny)
+# są stosowane bez udziału LLM - debugger dostaje tylko to, czego nie da się
+# naprawić mechanicznie.
+# =================================================================================
+
+# Nazwy wstrzykiwane do zakresu wykonania przez piaskownicę, zależnie od rodzaju kodu
+PREDEFINED_NAMES = {
+    "processing": {"pd", "input_path", "output_path", SCOPE_READER, SCOPE_FRAME},
+    "duckdb": {"pd", "input_path", "output_path", "con", "duckdb", "read_input", "write_result"},  # tools/duckdb_backend.py
+    "plot": {"pd", "plt", "df_original", "df_processed", "figures_to_embed"},
+}
+PREDEFINED_FRAMES = {"processing": {SCOPE_FRAME}, "duckdb": set(), "plot": {"df_original", "df_processed"}}
+MODULE_DUNDERS = {"__name__", "__file__", "__doc__", "__builtins__", "__spec__", "__loader__", "__package__"}
+
+# Nazwy argumentów funkcji traktowane jako ramki danych (np. transform_chunk(chunk, params))
+FRAME_ARG_PATTERN = re.compile(r"^(df\w*|\w*_df|chunk|data|frame)$")
+# Wywołania tworzące ramki danych
+FRAME_FACTORIES = {"DataFrame", "read_csv", "read_parquet", "read_feather", "read_excel", "read_json",
+                   "read_artifact", "concat", "merge"}
+# Metody ramki zwracające ramkę (propagacja "to jest ramka" przez przypisania)
+FRAME_METHODS = {"copy", "dropna", "fillna", "drop", "drop_duplicates", "rename", "assign", "sort_values", "sort_index",
+                 "query", "head", "tail", "sample", "astype", "set_index", "reset_index", "merge", "join", "filter",
+                 "select_dtypes", "replace", "clip", "round", "pipe", "infer_objects", "convert_dtypes"}
+# Operacje, po których zbiór kolumn nie jest znany statycznie - brak kolumny to wtedy tylko ostrzeżenie
+DYNAMIC_COLUMN_OPS = {"get_dummies", "pivot", "pivot_table", "unstack", "melt", "crosstab", "merge", "join",
+                      "concat", "add_prefix", "add_suffix", "reset_index", "json_normalize", "from_records"}
+
+FENCE_LINE = re.compile(r"^\s*```[\w-]*\s*$")
+# Zabłąkany znak tuż przed komentarzem, np. "_# Krok 1: ..." (prawdziwy przypadek z raportu eskalacji);
+# usuwany tylko z linii, na której parser zgłasza błąd składni
+STRAY_PREFIX = re.compile(r"^(\s*)[_`~$@!|\\;:,]{1,3}\s*(#.*)$")
+ENTRY_CALL_LINE = f"{ENTRY_FUNCTION}(input_path, output_path)  # noqa: F821"
+
+
+class Finding(BaseModel):
+    check: str
+    message: str
+    line: Optional[int] = None
+    severity: str = "error"  # "error" blokuje wykonanie, "warning" jest tylko raportowane
+
+    def __str__(self) -> str:
+        return f"[linia {self.line}] {self.message}" if self.line else self.message
+
+
+# --- Analiza ---
+
+def _first_line_of_name(tree: ast.AST, name: str) -> Optional[int]:
+    lines = [node.lineno for node in ast.walk(tree) if isinstance(node, ast.Name) and node.id == name]
+    return min(lines) if lines else None
+
+
+def _scope_symbols(table: symtable.SymbolTable):
+    """Wszystkie tablice symboli poniżej modułu (funkcje, klasy, wyrażenia lambda)."""
+    for child in table.get_children():
+        yield child
+        yield from _scope_symbols(child)
+
+
+def _name_findings(code: str, tree: ast.Module, kind: str) -> List[Finding]:
+    """Niezdefiniowane nazwy i nieużywane importy na podstawie tablic symboli (moduł `symtable`)."""
+    if any(isinstance(node, ast.ImportFrom) and any(a.name == "*" for a in node.names) for node in ast.walk(tree)):
+        return []  # import z gwiazdką - zbiór nazw nieznany
+    module = symtable.symtable(code, "<generated>", "exec")
+    defined = set(PREDEFINED_NAMES.get(kind, set())) | set(dir(builtins)) | MODULE_DUNDERS
+    referenced: Set[str] = set()
+    for symbol in module.get_symbols():
+        if symbol.is_assigned() or symbol.is_imported() or symbol.is_namespace():
+            defined.add(symbol.get_name())
+        if symbol.is_referenced():
+            referenced.add(symbol.get_name())
+    nested_globals: Set[str] = set()
+    for scope in _scope_symbols(module):
+        for symbol in scope.get_symbols():
+            if symbol.is_declared_global() and symbol.is_assigned():
+                defined.add(symbol.get_name())
+            if symbol.is_global() and symbol.is_referenced():
+                nested_globals.add(symbol.get_name())
+
+    findings = []
+    for name in sorted((referenced | nested_globals) - defined):
+        findings.append(Finding(check="UNDEFINED_NAME", message=f"Nazwa `{name}` nie jest zdefiniowana.",
+                                line=_first_line_of_name(tree, name)))
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                bound = alias.asname or alias.name.split(".")[0]
+                if bound not in referenced and bound not in nested_globals:
+                    findings.append(Finding(check="UNUSED_IMPORT", severity="warning", line=node.lineno,
+                                            message=f"Import `{alias.name}` nie jest używany."))
+    return findings
+
+
+def _forbidden_import_findings(tree: ast.Module) -> List[Finding]:
+    findings = []
+    for node in ast.walk(tree):
+        modules = [a.name for a in node.names] if isinstance(node, ast.Import) else \
+                  [node.module or ""] if isinstance(node, ast.ImportFrom) else []
+        for module in modules:
+            if module.split(".")[0] in FORBIDDEN_MODULES:
+                findings.append(Finding(check="FORBIDDEN_IMPORT", line=node.lineno,
+                                        message=f"Import modułu `{module}` jest zabroniony."))
+    return findings
+
+
+def _call_name(call: ast.Call) -> Optional[str]:
+    func = call.func
+    return func.attr if isinstance(func, ast.Attribute) else func.id if isinstance(func, ast.Name) else None
+
+
+def _frame_names(tree: ast.Module, kind: str) -> Set[str]:
+    frames = set(PREDEFINED_FRAMES.get(kind, set()))
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.Lambda)):
+            frames.update(a.arg for a in node.args.args if FRAME_ARG_PATTERN.match(a.arg))
+    assignments = [node for node in ast.walk(tree) if isinstance(node, ast.Assign)
+                   and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)]
+    for _ in range(2):  # przypisania łańcuchowe (df2 = df.copy(); df3 = df2[...])
+        for node in assignments:
+            if _is_frame_expr(node.value, frames):
+                frames.add(node.targets[0].id)
+    return frames
+
+
+def _is_frame_expr(node: ast.AST, frames: Set[str]) -> bool:
+    """Czy wyrażenie na pewno daje ramkę danych (a nie np. Series po `df['x']` albo skalar po `.mean()`)."""
+    if isinstance(node, ast.Name):
+        return node.id in frames
+    if isinstance(node, ast.Call):
+        if _call_name(node) in FRAME_FACTORIES:
+            return True
+        return isinstance(node.func, ast.Attribute) and node.func.attr in FRAME_METHODS and _is_frame_expr(node.func.value, frames)
+    if isinstance(node, ast.Subscript):
+        value = node.value
+        if isinstance(value, ast.Attribute) and value.attr in ("loc", "iloc"):
+            return not isinstance(node.slice, ast.Tuple) and _is_frame_expr(value.value, frames)
+        is_column = isinstance(node.slice, ast.Constant) and isinstance(node.slice.value, str)
+        return not is_column and _is_frame_expr(value, frames)
+    return False
+
+
+def _string_keys(node: ast.AST) -> List[ast.Constant]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [node]
+    if isinstance(node, ast.List):
+        return [el for el in node.elts if isinstance(el, ast.Constant) and isinstance(el.value, str)]
+    return []
+
+
+def _column_store_key(target: ast.Subscript) -> Optional[ast.AST]:
+    """Klucz kolumny w przypisaniu: `df['x'] = ...` -> 'x', `df.loc[maska, 'x'] = ...` / `df.at[i, 'x'] = ...` -> 'x'."""
+    value = target.value
+    if isinstance(value, ast.Attribute) and value.attr in ("loc", "at"):
+        return target.slice.elts[1] if isinstance(target.slice, ast.Tuple) and len(target.slice.elts) == 2 else None
+    return target.slice
+
+
+def _stored_frame(target: ast.Subscript) -> ast.AST:
+    value = target.value
+    return value.value if isinstance(value, ast.Attribute) and value.attr in ("loc", "at", "iloc", "iat") else value
+
+
+def _created_columns(tree: ast.Module, kind: str) -> Tuple[Set[str], bool]:
+    """
+    Kolumny tworzone przez kod (przypisania, `.loc`/`.at`, insert, assign/agg, rename) i informacja, czy schemat
+    jest dynamiczny - wtedy zbioru kolumn nie da się ustalić statycznie (np. klucz z pętli albo f-stringa).
+    """
+    frames = _frame_names(tree, kind)
+    created, dynamic = set(), False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Subscript) and isinstance(node.ctx, ast.Store):
+            key = _column_store_key(node)
+            keys = _string_keys(key) if key is not None else []
+            created.update(c.value for c in keys)
+            on_frame = _is_frame_expr(_stored_frame(node), frames)
+            if on_frame and not (keys and (not isinstance(key, ast.List) or len(keys) == len(key.elts))):
+                dynamic = True
+        elif isinstance(node, ast.Call):
+            name = _call_name(node)
+            if name in DYNAMIC_COLUMN_OPS:
+                dynamic = True
+            # Ramka spoza danych wejściowych (inny plik, DataFrame z literału) - jej kolumn schemat nie zna
+            reads_input = bool(node.args) and isinstance(node.args[0], ast.Name) and node.args[0].id == "input_path"
+            if name == "DataFrame" or (name in FRAME_FACTORIES or name == SCOPE_READER) and not reads_input:
+                dynamic = True
+            if name in ("assign", "agg", "aggregate", "named_aggregation"):
+                created.update(kw.arg for kw in node.keywords if kw.arg)
+                for kw in node.keywords:
+                    if kw.arg is None:  # assign(**{'x': ...})
+                        if isinstance(kw.value, ast.Dict) and all(isinstance(k, ast.Constant) for k in kw.value.keys):
+                            created.update(k.value for k in kw.value.keys if isinstance(k.value, str))
+                        else:
+                            dynamic = True
+            if name == "insert" and isinstance(node.func, ast.Attribute) and _is_frame_expr(node.func.value, frames):
+                column = node.args[1] if len(node.args) > 1 else next((kw.value for kw in node.keywords if kw.arg == "column"), None)
+                if isinstance(column, ast.Constant) and isinstance(column.value, str):
+                    created.add(column.value)
+                else:
+                    dynamic = True
+            for kw in node.keywords:
+                if kw.arg in ("columns", "name") and name in ("rename", "to_frame", "reset_index", "DataFrame"):
+                    if isinstance(kw.value, ast.Dict):
+                        created.update(v.value for v in kw.value.values if isinstance(v, ast.Constant))
+                    elif isinstance(kw.value, ast.Constant):
+                        created.add(kw.value.value)
+                    else:
+                        dynamic = True
+        elif isinstance(node, ast.Assign) and any(isinstance(t, ast.Attribute) and t.attr == "columns" for t in node.targets):
+            dynamic = True
+    return created, dynamic
+
+
+def column_references(tree: ast.Module, kind: str) -> List[ast.Constant]:
+    """Literały nazw kolumn odczytywanych z ramek danych (`df['x']`, `df[['x', 'y']]`)."""
+    frames = _frame_names(tree, kind)
+    refs = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Subscript) and isinstance(node.ctx, ast.Load) \
+                and isinstance(node.value, ast.Name) and node.value.id in frames:
+            refs += _string_keys(node.slice)
+    return refs
+
+
+def _column_findings(tree: ast.Module, kind: str, known_columns: List[str]) -> List[Finding]:
+    created, dynamic = _created_columns(tree, kind)
+    known = set(map(str, known_columns)) | created
+    findings = []
+    for ref in column_references(tree, kind):
+        if ref.value not in known:
+            findings.append(Finding(check="UNKNOWN_COLUMN", line=ref.lineno, severity="warning" if dynamic else "error",
+                                    message=f"Kolumna '{ref.value}' nie istnieje w danych (dostępne: {sorted(known)[:30]})."))
+    return findings
+
+
+def analyze_code(code: str, kind: str = "processing", known_columns: Optional[List[str]] = None) -> List[Finding]:
+    """Pełna analiza statyczna. `kind`: 'processing' (skrypt process_data), 'duckdb' (ten sam skrypt dla silnika DuckDB) albo 'plot' (kod wykresów)."""
+    try:
+        tree = ast.parse(code)
+        compile(tree, "<generated>", "exec")
+    except SyntaxError as e:
+        return [Finding(check="SYNTAX", message=f"Błąd składni: {e.msg}.", line=e.lineno)]
+    findings = _name_findings(code, tree, kind) + _forbidden_import_findings(tree)
+    if known_columns:
+        findings += _column_findings(tree, kind, known_columns)
+    return sorted(findings, key=lambda f: (f.line or 0, f.check))
+
+
+# --- Poprawki mechaniczne ---
+
+def fix_markdown_fences(code: str, kind: str, known_columns: Optional[List[str]]) -> str:
+    """Usuwa pozostałości bloków markdown (```python / ```), których nie zdjął `extract_python_code`."""
+    return "\n".join(line for line in code.splitlines() if not FENCE_LINE.match(line))
+
+
+def fix_stray_prefixes(code: str, kind: str, known_columns: Optional[List[str]]) -> str:
+    """Usuwa zabłąkane znaki przed komentarzem oraz instrukcje złożone wyłącznie z niezdefiniowanej nazwy."""
+    lines = code.splitlines()
+    # Linię poprawiamy tylko wtedy, gdy to na niej parser zgłasza błąd składni - ten sam tekst
+    # wewnątrz wieloliniowego napisu (docstring, szablon SQL) jest poprawnym kodem i zostaje bez zmian
+    for _ in range(len(lines)):
+        try:
+            tree = ast.parse("\n".join(lines))
+            break
+        except SyntaxError as e:
+            if not e.lineno or e.lineno > len(lines) or not STRAY_PREFIX.match(lines[e.lineno - 1]):
+                return "\n".join(lines)
+            lines[e.lineno - 1] = STRAY_PREFIX.sub(r"\1\2", lines[e.lineno - 1])
+    else:
+        return "\n".join(lines)
+    code = "\n".join(lines)
+    undefined = {f.message.split("`")[1] for f in _name_findings(code, tree, kind) if f.check == "UNDEFINED_NAME"}
+    stray = [node for node in ast.walk(tree) if isinstance(node, ast.Expr) and isinstance(node.value, ast.Name)
+             and node.value.id in undefined and node.lineno == node.end_lineno]
+    for node in sorted(stray, key=lambda n: (n.lineno, n.col_offset), reverse=True):
+        line = lines[node.lineno - 1]
+        rest = line[:node.col_offset] + line[node.end_col_offset:]
+        lines[node.lineno - 1] = rest if rest.strip() else ""
+    return "\n".join(lines)
+
+
+def fix_entry_call(code: str, kind: str, known_columns: Optional[List[str]]) -> str:
+    """Sprowadza zakończenie skryptu do jednej linii `process_data(input_path, output_path)  # noqa: F821`."""
+    if kind == "plot":
+        return code
+    violations = {v.rule_id for v in check_code(code)}
+    if not violations & {"ENDS_WITH_CALL", "NO_MAIN_BLOCK"} or "SYNTAX" in violations:
+        return code
+    tree = ast.parse(code)
+    if not any(isinstance(n, ast.FunctionDef) and n.name == ENTRY_FUNCTION for n in tree.body):
+        return code
+
+    def is_entry_call(node: ast.stmt) -> bool:
+        return isinstance(node, ast.Expr) and isinstance(node.value, ast.Call) and _call_name(node.value) == ENTRY_FUNCTION
+
+    def is_main_block(node: ast.stmt) -> bool:
+        # Blok __main__ usuwamy tylko, gdy nie robi nic poza wywołaniem funkcji (i ewentualnie wypisaniem komunikatu)
+        return (isinstance(node, ast.If) and "__main__" in ast.unparse(node.test) and not node.orelse
+                and all(is_entry_call(s) or isinstance(s, ast.Pass) or
+                        (isinstance(s, ast.Expr) and isinstance(s.value, ast.Call) and _call_name(s.value) == "print")
+                        for s in node.body))
+
+    removable = [node for node in tree.body if is_entry_call(node) or is_main_block(node)]
+    if any(isinstance(n, ast.If) and "__main__" in ast.unparse(n.test) for n in tree.body if n not in removable):
+        return code  # blok __main__ z własną logiką - to już zadanie dla debuggera
+    lines = code.splitlines()
+    for node in sorted(removable, key=lambda n: n.lineno, reverse=True):
+        del lines[node.lineno - 1:node.end_lineno]
+    while lines and not lines[-1].strip():
+        lines.pop()
+    return "\n".join(lines + ["", ENTRY_CALL_LINE]) + "\n"
+
+
+def fix_column_case(code: str, kind: str, known_columns: Optional[List[str]]) -> str:
+    """Poprawia nazwę kolumny różniącą się od istniejącej tylko wielkością liter lub spacjami na brzegach."""
+    if not known_columns:
+        return code
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code
+    created, _ = _created_columns(tree, kind)
+    known = set(map(str, known_columns)) | created
+    normalized: Dict[str, List[str]] = {}
+    for column in known:
+        normalized.setdefault(column.strip().lower(), []).append(column)
+    lines = code.splitlines()
+    refs = [ref for ref in column_references(tree, kind) if ref.value not in known
+            and len(normalized.get(ref.value.strip().lower(), [])) == 1 and ref.lineno == ref.end_lineno]
+    for ref in sorted(refs, key=lambda r: (r.lineno, r.col_offset), reverse=True):
+        line = lines[ref.lineno - 1]
+        replacement = repr(normalized[ref.value.strip().lower()][0])
+        lines[ref.lineno - 1] = line[:ref.col_offset] + replacement + line[ref.end_col_offset:]
+    return "\n".join(lines)
+
+
+def fix_forbidden_imports(code: str, kind: str, known_columns: Optional[List[str]]) -> str:
+    """Usuwa zabronione importy, które nie są nigdzie używane (np. pozostawiony `import argparse`)."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code
+    unused = {f.line for f in _name_findings(code, tree, kind) if f.check == "UNUSED_IMPORT"}
+    lines = code.splitlines()
+    for node in sorted(tree.body, key=lambda n: n.lineno, reverse=True):
+        if isinstance(node, ast.Import) and node.lineno in unused and node.lineno == node.end_lineno \
+                and all(a.name.split(".")[0] in FORBIDDEN_MODULES for a in node.names):
+            del lines[node.lineno - 1]
+    return "\n".join(lines)
+
+
+FIXERS = [fix_markdown_fences, fix_stray_prefixes, fix_entry_call, fix_column_case, fix_forbidden_imports]
+
+
+def apply_fixers(code: str, kind: str = "processing", known_columns: Optional[List[str]] = None,
+                 max_passes: int = 3) -> Tuple[str, List[str]]:
+    """Stosuje poprawki mechaniczne do skutku (maks. `max_passes` przebiegów). Zwraca (kod, nazwy zastosowanych poprawek)."""
+    applied = []
+    for _ in range(max_passes):
+        changed = False
+        for fixer in FIXERS:
+            fixed = fixer(code, kind, known_columns)
+            if fixed.strip() != code.strip():
+                code, changed = fixed, True
+                applied.append(fixer.__name__)
+        if not changed:
+            break
+    return code, applied
@@ -0,0 +1,266 @@
+import os
+import ast
+import time
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, TypedDict
+import pandas as pd
+from .artifacts import detect_format, read_artifact, write_artifact
+from .chunked_exec import strip_entry_call, ENTRY_FUNCTION
+from .execution_cache import ExecutionCache
+from .sandbox import SandboxPool, ExecutionLimits
+
+
+# =================================================================================
+# Wykonanie planu krok po kroku (DAG). Wygenerowany skrypt, obok `process_data`, definiuje
+# po jednej funkcji na każdy numerowany krok planu oraz listę `STEPS` na najwyższym poziomie:
+#   STEPS = [{"name": "step_1_clean", "depends_on": [], "reads": [...], "writes": [...]}, ...]
+#   def step_1_clean(df: pd.DataFrame) -> pd.DataFrame: ...
+# Kroki są wykonywane w procesach-piaskownicach poziomami DAG (kroki niezależne równolegle),
+# a ramka wynikowa każdego kroku trafia do pamięci wykonań jako Parquet, pod kluczem
+# hash(kod kroku + kod wspólny skryptu) + klucze kroków poprzedzających (dla korzeni: odcisk wejścia).
+# Po poprawce jednego kroku klucze kroków wcześniejszych się nie zmieniają - przebieg wznawia się
+# od pierwszego unieważnionego kroku. Kroki równoległe (wspólny poprzednik) nie mogą zmieniać liczby
+# wierszy: ich wyniki są łączone przez dołożenie kolumn z `writes` do ramki pierwszej zależności.
+# Korzenie DAG czytają wejście samą ścieżką - skrypt, którego `process_data` przekazuje do odczytu
+# dodatkowe argumenty (`sep`, `dtype`, `parse_dates`...), wykonywany jest w całości.
+# =================================================================================
+
+STEPS_NAME = "STEPS"
+READ_PREFIX = "read_"
+
+
+class StepSpec(TypedDict):
+    name: str; depends_on: List[str]; reads: List[str]; writes: List[str]
+
+
+def parse_steps(code: str) -> Optional[List[StepSpec]]:
+    """
+    Odczytuje `STEPS` z kodu bez jego wykonywania (literał na najwyższym poziomie). Brak `depends_on`
+    oznacza zależność od poprzedniego kroku. Zwraca None, gdy kod nie definiuje kontraktu kroków.
+    Zgłasza ValueError przy błędnym kontrakcie (brak funkcji kroku, nieznana zależność, cykl).
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    literal = next((node.value for node in tree.body if isinstance(node, ast.Assign)
+                    and any(isinstance(t, ast.Name) and t.id == STEPS_NAME for t in node.targets)), None)
+    if literal is None:
+        return None
+    try:
+        raw = ast.literal_eval(literal)
+    except ValueError:
+        raise ValueError(f"`{STEPS_NAME}` musi być literałem (listą słowników), bez wyrażeń do obliczenia.")
+    functions = {node.name for node in tree.body if isinstance(node, ast.FunctionDef)}
+    steps: List[StepSpec] = []
+    for i, item in enumerate(raw):
+        name = item.get("name") if isinstance(item, dict) else None
+        if name not in functions:
+            raise ValueError(f"Krok nr {i + 1} w `{STEPS_NAME}` wskazuje funkcję `{name}`, której nie zdefiniowano.")
+        default_deps = [steps[-1]["name"]] if steps else []
+        steps.append({"name": name, "depends_on": list(item.get("depends_on", default_deps)),
+                      "reads": list(item.get("reads", [])), "writes": list(item.get("writes", []))})
+    known = set()
+    for step in steps:
+        unknown = [d for d in step["depends_on"] if d not in known]
+        if unknown:
+            raise ValueError(f"Krok `{step['name']}` zależy od {unknown} - zależności muszą być zdefiniowane wcześniej w `{STEPS_NAME}`.")
+        known.add(step["name"])
+    return steps or None
+
+
+def entry_read_options(code: str) -> List[str]:
+    """
+    Argumenty odczytów danych (`pd.read_csv`, `read_optimized`, `pd.read_parquet`...) w `process_data` poza samą ścieżką.
+    Korzeń DAG czyta wejście bez argumentów, więc przy niepustej liście kroki dostałyby inną ramkę niż `process_data`.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    entry = next((node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name == ENTRY_FUNCTION), None)
+    options: List[str] = []
+    for node in ast.walk(entry) if entry is not None else []:
+        if not isinstance(node, ast.Call):
+            continue
+        name = node.func.attr if isinstance(node.func, ast.Attribute) else getattr(node.func, "id", "")
+        if not name.startswith(READ_PREFIX):
+            continue
+        options += [keyword.arg or "**kwargs" for keyword in node.keywords]
+        if len(node.args) > 1:
+            options.append(f"{name}: argumenty pozycyjne")
+    return options
+
+
+def plan_levels(steps: List[StepSpec]) -> List[List[StepSpec]]:
+    """Poziomy DAG: kroki jednego poziomu zależą wyłącznie od kroków z poziomów wcześniejszych."""
+    depth: Dict[str, int] = {}
+    for step in steps:
+        depth[step["name"]] = 1 + max((depth[d] for d in step["depends_on"]), default=-1)
+    levels: List[List[StepSpec]] = [[] for _ in range(max(depth.values()) + 1)]
+    for step in steps:
+        levels[depth[step["name"]]].append(step)
+    return levels
+
+
+def step_sources(code: str, steps: List[StepSpec]) -> Dict[str, str]:
+    """Źródło każdego kroku poprzedzone kodem wspólnym (importy, stałe, funkcje pomocnicze) - materiał klucza kroku."""
+    tree = ast.parse(code)
+    step_names = {step["name"] for step in steps}
+    shared, own = [], {}
+    for node in tree.body:
+        segment = ast.get_source_segment(code, node) or ""
+        if isinstance(node, ast.FunctionDef) and node.name in step_names:
+            own[node.name] = segment
+        elif isinstance(node, ast.FunctionDef) and node.name == ENTRY_FUNCTION:
+            continue  # `process_data` tylko składa kroki - nie wpływa na ich wyniki
+        elif isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == STEPS_NAME for t in node.targets):
+            continue
+        elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Call) and getattr(node.value.func, "id", None) == ENTRY_FUNCTION:
+            continue
+        else:
+            shared.append(segment)
+    prelude = "\n".join(shared)
+    return {name: prelude + "\n" + own[name] for name in step_names}
+
+
+def _merge(frames: List[pd.DataFrame], writes: List[List[str]]) -> pd.DataFrame:
+    """Łączy wyniki kroków równoległych: ramka pierwszej zależności + kolumny `writes` pozostałych."""
+    base = frames[0]
+    for frame, columns in zip(frames[1:], writes[1:]):
+        if len(frame) != len(base):
+            raise ValueError(f"Kroki równoległe zmieniły liczbę wierszy ({len(base)} vs {len(frame)}) - "
+                             f"nie można połączyć ich wyników. Kroki zmieniające liczbę wierszy muszą być sekwencyjne.")
+        base = base.copy(deep=False)
+        for column in columns:
+            base[column] = frame[column].to_numpy()
+    return base
+
+
+# --- Funkcje sterujące wykonywane w procesach-piaskownicach ---
+
+def _read_inputs(scope: Dict[str, Any], input_paths: List[str], input_writes: List[List[str]], root: bool = False) -> pd.DataFrame:
+    # Dane wejściowe (korzeń DAG) przez warstwę optymalizacji typów, jeśli jest włączona; wyniki kroków mają już typy
+    reader = (scope.get("read_optimized") if root else None) or read_artifact
+    return _merge([reader(path) for path in input_paths], input_writes)
+
+
+def run_step(scope: Dict[str, Any], step: StepSpec, input_paths: List[str], input_writes: List[List[str]],
+             output_path: str) -> Dict[str, Any]:
+    """Wykonuje jeden krok na połączonych wynikach zależności i zapisuje jego ramkę jako Parquet."""
+    df = _read_inputs(scope, input_paths, input_writes, root=not step["depends_on"])
+    missing = [c for c in step["reads"] if c not in df.columns]
+    if missing:
+        raise KeyError(f"Krok `{step['name']}` deklaruje odczyt kolumn {missing}, których nie ma na jego wejściu.")
+    result = scope[step["name"]](df)
+    if not isinstance(result, pd.DataFrame):
+        raise TypeError(f"Krok `{step['name']}` musi zwrócić pd.DataFrame, a zwrócił: {type(result).__name__}.")
+    missing = [c for c in step["writes"] if c not in result.columns]
+    if missing:
+        raise KeyError(f"Krok `{step['name']}` deklaruje zapis kolumn {missing}, których nie ma w jego wyniku.")
+    write_artifact(result, output_path, fmt="parquet")
+    return {"rows": len(result), "columns": result.shape[1]}
+
+
+def write_output(scope: Dict[str, Any], input_paths: List[str], input_writes: List[List[str]], output_path: str) -> Dict[str, Any]:
+    """Łączy wyniki kroków końcowych i zapisuje wynik w formacie wynikającym z `output_path`."""
+    df = _read_inputs(scope, input_paths, input_writes)
+    write_artifact(df, output_path)
+    return {"rows": len(df), "columns": df.shape[1]}
+
+
+# --- Wykonanie w procesie nadrzędnym ---
+
+def run_steps(pool: SandboxPool, code: str, input_path: str, output_path: str, work_dir: str,
+              cache: Optional[ExecutionCache] = None, input_signature: Optional[str] = None,
+              max_workers: Optional[int] = None, limits: Optional[ExecutionLimits] = None,
+              dtype_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Wykonuje skrypt krok po kroku. Zwraca słownik w kształcie wyniku `SandboxPool.run()`, zsumowany po krokach;
+    `outputs['steps']` opisuje każdy krok (z pamięci / wykonany, czas, rozmiar), a `outputs['resumed_from']`
+    to pierwszy krok, który trzeba było wykonać.
+    """
+    started = time.perf_counter()
+    steps = parse_steps(code)
+    body = strip_entry_call(code)
+    sources = step_sources(code, steps)
+    by_name = {step["name"]: step for step in steps}
+    os.makedirs(work_dir, exist_ok=True)
+
+    keys: Dict[str, Optional[str]] = {}
+    paths: Dict[str, str] = {}
+    report: List[Dict[str, Any]] = []
+    results: List[Dict[str, Any]] = []
+    failed: Optional[Dict[str, Any]] = None
+    for step in steps:
+        upstream = [keys[d] for d in step["depends_on"]] or [input_signature]
+        keys[step["name"]] = (cache.make_key(sources[step["name"]], upstream, step=step["name"], reads=step["reads"],
+                                             writes=step["writes"], dtype_options=dtype_options)
+                              if cache is not None and None not in upstream else None)
+        paths[step["name"]] = os.path.join(work_dir, f"{step['name']}.parquet")
+
+    def inputs_of(names: List[str]) -> Dict[str, Any]:
+        if not names:
+            return {"input_paths": [input_path], "input_writes": [[]]}
+        return {"input_paths": [paths[n] for n in names], "input_writes": [by_name[n]["writes"] for n in names]}
+
+    def run_one(step: StepSpec) -> Dict[str, Any]:
+        key = keys[step["name"]]
+        if key is not None and cache.get(key) is not None and cache.restore_artifact(key, paths[step["name"]]):
+            return {"name": step["name"], "cached": True}
+        result = pool.run(body, driver="tools.step_dag:run_step", limits=limits, dtype_options=dtype_options,
+                          driver_kwargs={"step": step, "output_path": paths[step["name"]], **inputs_of(step["depends_on"])})
+        if result["ok"] and key is not None:
+            cache.put(key, {"node": "step_dag", "step": step["name"], "exec_s": result["exec_s"]}, artifact_path=paths[step["name"]])
+        return {"name": step["name"], "cached": False, "result": result}
+
+    workers = max_workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for level in plan_levels(steps):
+            if len(level) > 1:
+                pool.ensure_size(min(len(level), workers))
+            for outcome in executor.map(run_one, level):
+                result = outcome.pop("result", None)
+                if result is not None:
+                    results.append(result)
+                    outcome.update({"exec_s": result["exec_s"], **(result["outputs"].get("driver") or {})})
+                    if not result["ok"] and failed is None:
+                        failed = {**result, "traceback": f"[KROK PLANU: {outcome['name']}]\n{result['traceback']}"}
+                report.append(outcome)
+            if failed is not None:
+                break
+
+    if failed is None:
+        dependents = {d for step in steps for d in step["depends_on"]}
+        sinks = [step["name"] for step in steps if step["name"] not in dependents]
+        if os.path.isdir(output_path):
+            shutil.rmtree(output_path)
+        elif os.path.exists(output_path):
+            os.remove(output_path)
+        if len(sinks) == 1 and detect_format(output_path) == "parquet":
+            shutil.copyfile(paths[sinks[0]], output_path)
+        else:
+            result = pool.run(body, driver="tools.step_dag:write_output", limits=limits,
+                              driver_kwargs={"output_path": output_path, **inputs_of(sinks)})
+            results.append(result)
+            if not result["ok"]:
+                failed = {**result, "traceback": f"[KROK PLANU: zapis wyniku]\n{result['traceback']}"}
+
+    executed = [entry["name"] for entry in report if not entry["cached"]]
+    summary = {
+        "ok": failed is None, "traceback": None, "error_type": None, "limit_exceeded": None,
+        "outputs": {"steps": report, "resumed_from": executed[0] if executed else None},
+        "stdout": "".join(r["stdout"] for r in results),
+        "exec_s": sum(r["exec_s"] or 0 for r in results),
+        "usage": {
+            "wall_s": time.perf_counter() - started,
+            "cpu_s": sum((r.get("usage") or {}).get("cpu_s") or 0 for r in results),
+            "peak_rss_bytes": max([(r.get("usage") or {}).get("peak_rss_bytes") or 0 for r in results] or [0]),
+        },
+        "worker": None, "roundtrip_s": time.perf_counter() - started,
+    }
+    if failed is not None:
+        summary.update({"traceback": failed["traceback"], "error_type": failed["error_type"],
+                        "limit_exceeded": failed["limit_exceeded"]})
+    return summary